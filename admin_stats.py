@@ -0,0 +1,171 @@
+# admin_stats.py
+# User and clinic counts for the admin dashboard, the clinic finder and /api/admin/stats.
+#
+# COUNT(*) over user or clinic reads the whole table, so the pages read maintained
+# counters instead: stat_counter holds one row per user type ('users:patient', ...)
+# and one for clinics, adjusted by triggers on every insert, delete and user_type
+# change - whichever code path makes it (forms, the import scripts, raw SQL). The
+# exact per-type counts come from a single COUNT ... GROUP BY user_type query. Both
+# are cached in-process for STATS_TTL_SECONDS.
+#
+#   python admin_stats.py             # print the counters and the exact counts
+#   python admin_stats.py --recount   # reset the counters from the tables (e.g. after drift)
+import os
+import time
+import logging
+import argparse
+import threading
+
+from sqlalchemy import func, text
+
+from database import db
+from models import User, StatCounter
+
+STATS_TTL_SECONDS = float(os.environ.get("ADMIN_STATS_TTL_SECONDS", 15))
+USER_COUNTER_PREFIX = "users:"
+CLINIC_COUNTER = "clinics"
+
+SQLITE_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS user_stat_insert AFTER INSERT ON "user" BEGIN
+        INSERT INTO stat_counter(name, value) VALUES ('users:' || new.user_type, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_stat_delete AFTER DELETE ON "user" BEGIN
+        UPDATE stat_counter SET value = value - 1 WHERE name = 'users:' || old.user_type;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS user_stat_update AFTER UPDATE OF user_type ON "user"
+    WHEN old.user_type IS NOT new.user_type BEGIN
+        UPDATE stat_counter SET value = value - 1 WHERE name = 'users:' || old.user_type;
+        INSERT INTO stat_counter(name, value) VALUES ('users:' || new.user_type, 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clinic_stat_insert AFTER INSERT ON clinic BEGIN
+        INSERT INTO stat_counter(name, value) VALUES ('clinics', 1)
+        ON CONFLICT(name) DO UPDATE SET value = value + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clinic_stat_delete AFTER DELETE ON clinic BEGIN
+        UPDATE stat_counter SET value = value - 1 WHERE name = 'clinics';
+    END""",
+]
+
+POSTGRES_TRIGGERS = [
+    """CREATE OR REPLACE FUNCTION stat_counter_add(counter text, delta integer) RETURNS void AS $$
+        INSERT INTO stat_counter(name, value) VALUES (counter, delta)
+        ON CONFLICT (name) DO UPDATE SET value = stat_counter.value + delta
+    $$ LANGUAGE sql""",
+    """CREATE OR REPLACE FUNCTION user_stat_counters() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP <> 'INSERT' THEN PERFORM stat_counter_add('users:' || OLD.user_type, -1); END IF;
+        IF TG_OP <> 'DELETE' THEN PERFORM stat_counter_add('users:' || NEW.user_type, 1); END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION clinic_stat_counters() RETURNS trigger AS $$
+    BEGIN
+        PERFORM stat_counter_add('clinics', CASE TG_OP WHEN 'INSERT' THEN 1 ELSE -1 END);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql""",
+    'DROP TRIGGER IF EXISTS user_stat_counters ON "user"',
+    """CREATE TRIGGER user_stat_counters AFTER INSERT OR DELETE OR UPDATE OF user_type ON "user"
+        FOR EACH ROW EXECUTE FUNCTION user_stat_counters()""",
+    "DROP TRIGGER IF EXISTS clinic_stat_counters ON clinic",
+    """CREATE TRIGGER clinic_stat_counters AFTER INSERT OR DELETE ON clinic
+        FOR EACH ROW EXECUTE FUNCTION clinic_stat_counters()""",
+]
+
+RECOUNT = [
+    "DELETE FROM stat_counter",
+    """INSERT INTO stat_counter(name, value)
+        SELECT 'users:' || user_type, COUNT(*) FROM "user" GROUP BY user_type""",
+    "INSERT INTO stat_counter(name, value) SELECT 'clinics', COUNT(*) FROM clinic",
+]
+
+
+def setup_stat_counters(connection):
+    """
+    Creates the counter triggers (idempotent) and counts the existing rows.
+    Run by the stat_counters migration on its connection.
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statements = SQLITE_TRIGGERS
+    elif dialect == 'postgresql':
+        statements = POSTGRES_TRIGGERS
+    else:
+        logging.warning(f"No stat counter triggers for {dialect}; admin counts will drift until recounted")
+        statements = []
+    for statement in statements + RECOUNT:
+        connection.execute(text(statement))
+
+
+def recount_stat_counters():
+    """Resets the counters from the tables in one transaction."""
+    for statement in RECOUNT:
+        db.session.execute(text(statement))
+    db.session.commit()
+    clear_stats_cache()
+
+
+# --- Cached reads ---
+
+_cache = {}  # name -> (expires_at, value)
+_cache_lock = threading.Lock()
+
+
+def _cached(name, compute):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(name)
+    if entry and entry[0] > now:
+        return entry[1]
+    value = compute()
+    with _cache_lock:
+        _cache[name] = (now + STATS_TTL_SECONDS, value)
+    return value
+
+
+def clear_stats_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def stat_counters():
+    """{counter name: value} from stat_counter (a handful of rows)."""
+    return _cached("counters", lambda: dict(db.session.query(StatCounter.name, StatCounter.value).all()))
+
+
+def user_type_counts():
+    """Exact {user_type: count}, from one grouped query over user."""
+    return _cached("user_types", lambda: dict(
+        db.session.query(User.user_type, func.count(User.id)).group_by(User.user_type).all()))
+
+
+def clinic_count():
+    return stat_counters().get(CLINIC_COUNTER, 0)
+
+
+def admin_stats():
+    """User totals (overall and per type) and the clinic count, from the counters."""
+    counters = stat_counters()
+    by_type = {name[len(USER_COUNTER_PREFIX):]: value for name, value in counters.items()
+               if name.startswith(USER_COUNTER_PREFIX)}
+    return {
+        'user_count': sum(by_type.values()),
+        'patient_count': by_type.get('patient', 0),
+        'doctor_count': by_type.get('doctor', 0),
+        'admin_count': by_type.get('admin', 0),
+        'clinic_count': counters.get(CLINIC_COUNTER, 0),
+    }
+
+
+if __name__ == "__main__":
+    from migrations import create_app
+
+    parser = argparse.ArgumentParser(description="Admin statistics counters.")
+    parser.add_argument("--recount", action="store_true", help="reset the counters from the user and clinic tables")
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        if args.recount:
+            recount_stat_counters()
+        print(f"Counters: {stat_counters()}")
+        print(f"Users by type (exact): {user_type_counts()}")
@@ -0,0 +1,247 @@
+# ai_cache.py
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import DailyTip, AIResponseCache
+import openai_service
+from openai_service import (
+    request_chatbot_response,
+    request_nutrition_plan,
+    fallback_nutrition_plan,
+    request_yoga_routine,
+    fallback_yoga_routine,
+    request_nutrition_analysis,
+    fallback_nutrition_analysis,
+    run_ai_calls
+)
+
+# AI response cache limits (nutrition plans / yoga routines)
+AI_CACHE_TTL = timedelta(hours=int(os.environ.get("AI_CACHE_TTL_HOURS", 24 * 7)))
+AI_CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", 5000))
+
+DAILY_TIP_PROMPT = "Give me one personalized wellness tip for today."
+
+# Served instantly while the personalized tip is generated in the background
+FALLBACK_TIPS = [
+    "Aim for 7-9 hours of sleep tonight - rest helps regulate the hormones involved in your treatment.",
+    "Take a 10-minute gentle walk today to ease stress and support healthy circulation.",
+    "Keep a water bottle nearby and sip regularly - staying hydrated helps your body respond to medication.",
+    "Try 5 minutes of slow, deep breathing before bed to calm your mind.",
+    "Add a handful of leafy greens to one meal today for a boost of folate.",
+    "Write down one thing you're looking forward to this week - small moments of positivity matter.",
+    "Set a reminder for your medications so you can take them on time without worrying.",
+]
+
+# Small pool: tips are cheap to wait for in the background, and we don't want to flood the API
+_tip_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="daily-tip")
+_pending_tips = set()
+_pending_lock = threading.Lock()
+
+
+def profile_hash(*values):
+    """Stable hash of the profile values that go into a prompt."""
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _tip_profile(user, patient_data):
+    """Snapshot of the fields _build_chat_context reads, safe to hand to another thread."""
+    user_snapshot = SimpleNamespace(first_name=user.first_name, user_type=user.user_type)
+    patient_snapshot = None
+    if patient_data:
+        patient_snapshot = SimpleNamespace(
+            age=patient_data.age,
+            diagnosis=patient_data.diagnosis,
+            previous_ivf_cycles=patient_data.previous_ivf_cycles
+        )
+    return user_snapshot, patient_snapshot
+
+
+def fallback_tip(user_id, tip_date):
+    """Deterministic stored tip, so a user sees the same one all day."""
+    return FALLBACK_TIPS[(user_id + tip_date.toordinal()) % len(FALLBACK_TIPS)]
+
+
+def _generate_daily_tip(app, user_id, tip_date, key_hash, user_snapshot, patient_snapshot):
+    try:
+        tip = request_chatbot_response(DAILY_TIP_PROMPT, user_snapshot, patient_snapshot)
+    except Exception as e:
+        logging.warning(f"Daily tip generation failed for user {user_id}: {e}")
+        return
+    finally:
+        with _pending_lock:
+            _pending_tips.discard((user_id, tip_date, key_hash))
+
+    with app.app_context():
+        try:
+            db.session.add(DailyTip(user_id=user_id, tip_date=tip_date, profile_hash=key_hash, tip=tip))
+            # Older tips for this user are never served again
+            DailyTip.query.filter(DailyTip.user_id == user_id, DailyTip.tip_date < tip_date).delete()
+            db.session.commit()
+        except IntegrityError:
+            # Another worker process stored the same tip first
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+
+def get_daily_tip(app, user, patient_data=None, today_tips=None):
+    """
+    Returns today's tip for the user without blocking on the LLM.
+    On a cache miss a stored fallback tip is returned and generation is queued
+    (if an OpenAI client is configured).
+    today_tips ({profile_hash: tip} of the user's stored tips for today, e.g. from the
+    dashboard summary) saves looking them up.
+    """
+    today = date.today()
+    user_snapshot, patient_snapshot = _tip_profile(user, patient_data)
+    key_hash = profile_hash(vars(user_snapshot), vars(patient_snapshot) if patient_snapshot else None)
+
+    if today_tips is not None:
+        cached_tip = today_tips.get(key_hash)
+    else:
+        cached = DailyTip.query.filter_by(user_id=user.id, tip_date=today, profile_hash=key_hash).first()
+        cached_tip = cached.tip if cached else None
+    if cached_tip:
+        return cached_tip
+    if openai_service.client is None:
+        # Generation could only fail; don't queue a job on every visit
+        return fallback_tip(user.id, today)
+
+    key = (user.id, today, key_hash)
+    with _pending_lock:
+        already_queued = key in _pending_tips
+        _pending_tips.add(key)
+    if not already_queued:
+        _tip_executor.submit(_generate_daily_tip, app, user.id, today, key_hash, user_snapshot, patient_snapshot)
+
+    return fallback_tip(user.id, today)
+
+
+# --- Profile-keyed AI response cache ---
+
+def _nutrition_profile(patient_data):
+    """Fields read by request_nutrition_plan."""
+    if not patient_data:
+        return None
+    return {"age": patient_data.age, "bmi": patient_data.bmi, "diagnosis": patient_data.diagnosis}
+
+
+def _yoga_profile(patient_data):
+    """Fields read by request_yoga_routine."""
+    if not patient_data:
+        return None
+    return {"age": patient_data.age}
+
+
+def _snapshot(profile):
+    """Detached stand-in for PatientData, safe to hand to a worker thread."""
+    return SimpleNamespace(**profile) if profile else None
+
+
+def _response_cache_key(kind, profile):
+    return f"{kind}:{profile_hash(profile)}"
+
+
+def _evict_ai_responses():
+    """Drops expired entries, then the oldest ones beyond the size cap."""
+    cutoff = datetime.now(timezone.utc) - AI_CACHE_TTL
+    AIResponseCache.query.filter(AIResponseCache.created_at < cutoff).delete()
+    overflow = AIResponseCache.query.count() - AI_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = db.session.query(AIResponseCache.id).order_by(AIResponseCache.created_at).limit(overflow).subquery()
+        AIResponseCache.query.filter(AIResponseCache.id.in_(db.select(oldest.c.id))).delete(synchronize_session=False)
+
+
+def lookup_ai_response(kind, profile):
+    """Returns the cached response for this profile if it is younger than the TTL, else None."""
+    cutoff = datetime.now(timezone.utc) - AI_CACHE_TTL
+    cached = AIResponseCache.query.filter(
+        AIResponseCache.cache_key == _response_cache_key(kind, profile),
+        AIResponseCache.created_at >= cutoff
+    ).first()
+    return json.loads(cached.payload) if cached else None
+
+
+def store_ai_response(kind, profile, response):
+    """Stores a fresh AI response for this profile, evicting old entries."""
+    key = _response_cache_key(kind, profile)
+    try:
+        AIResponseCache.query.filter_by(cache_key=key).delete()  # expired copy, if any
+        db.session.add(AIResponseCache(cache_key=key, kind=kind, payload=json.dumps(response)))
+        _evict_ai_responses()
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request stored it first; theirs is just as good
+        db.session.rollback()
+
+
+def cached_ai_response(kind, profile, request_fn, fallback_fn):
+    """
+    Returns the cached response for this profile, otherwise calls the AI
+    and stores the result. Fallbacks are never cached.
+    """
+    cached = lookup_ai_response(kind, profile)
+    if cached is not None:
+        return cached
+
+    try:
+        response = request_fn(_snapshot(profile))
+    except Exception as e:
+        logging.warning(f"AI {kind} request failed, serving fallback: {e}")
+        return fallback_fn()
+
+    store_ai_response(kind, profile, response)
+    return response
+
+
+def get_cached_nutrition_plan(patient_data):
+    return cached_ai_response("nutrition_plan", _nutrition_profile(patient_data),
+                              request_nutrition_plan, fallback_nutrition_plan)
+
+
+def get_cached_yoga_routine(patient_data):
+    return cached_ai_response("yoga_routine", _yoga_profile(patient_data),
+                              request_yoga_routine, fallback_yoga_routine)
+
+
+def get_nutrition_page_ai(patient_data, meal_descriptions=None):
+    """
+    Everything the /nutrition page needs from the AI in one go.
+    Cache hits are served directly; the remaining calls run concurrently,
+    so a full miss costs one round trip instead of three.
+    Returns (nutrition_plan, yoga_routine, nutrition_summary).
+    """
+    cacheable = {
+        "nutrition_plan": (_nutrition_profile(patient_data), request_nutrition_plan, fallback_nutrition_plan),
+        "yoga_routine": (_yoga_profile(patient_data), request_yoga_routine, fallback_yoga_routine),
+    }
+
+    results, calls = {}, {}
+    for kind, (profile, request_fn, fallback_fn) in cacheable.items():
+        cached = lookup_ai_response(kind, profile)
+        if cached is not None:
+            results[kind] = cached
+        else:
+            calls[kind] = (request_fn, (_snapshot(profile),), fallback_fn)
+    if meal_descriptions:
+        calls["nutrition_summary"] = (request_nutrition_analysis, (meal_descriptions,), fallback_nutrition_analysis)
+
+    if calls:
+        fresh, failed = run_ai_calls(calls)
+        results.update(fresh)
+        # Store successful cacheable responses back in this (request) thread
+        for kind in cacheable:
+            if kind in fresh and kind not in failed:
+                store_ai_response(kind, cacheable[kind][0], fresh[kind])
+
+    return results["nutrition_plan"], results["yoga_routine"], results.get("nutrition_summary", {})
@@ -0,0 +1,63 @@
+# benchmark_clinic_geo.py
+# Measures /api/clinics/near index latency on synthetic clinics spread around Indian cities,
+# and checks the results against a brute-force haversine scan.
+#
+#   python benchmark_clinic_geo.py            # 100,000 clinics
+#   python benchmark_clinic_geo.py 500000
+import sys
+import time
+import random
+
+import numpy as np
+
+from clinic_geo import ClinicGeoIndex, EARTH_RADIUS_KM
+
+CITY_CENTRES = [(19.0760, 72.8777), (28.7041, 77.1025), (12.9716, 77.5946), (13.0827, 80.2707),
+                (22.5726, 88.3639), (18.5204, 73.8567), (17.3850, 78.4867), (26.9124, 75.7873)]
+
+def haversine_km(lat, lng, lats, lngs):
+    lat, lng, lats, lngs = map(np.radians, (lat, lng, lats, lngs))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def synthetic_clinics(n, seed=42):
+    rng = np.random.default_rng(seed)
+    centres = np.array(CITY_CENTRES)[rng.integers(0, len(CITY_CENTRES), n)]
+    # Most clinics cluster around a city centre; some are scattered across the country
+    lats = centres[:, 0] + rng.normal(0, 0.3, n)
+    lngs = centres[:, 1] + rng.normal(0, 0.3, n)
+    scattered = rng.random(n) < 0.2
+    lats[scattered] = rng.uniform(8, 34, scattered.sum())
+    lngs[scattered] = rng.uniform(68, 97, scattered.sum())
+    return np.arange(1, n + 1), lats, lngs
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(*q)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    ids, lats, lngs = synthetic_clinics(n)
+    index = ClinicGeoIndex(refresh_seconds=float('inf'))
+    index.load(ids, lats, lngs)
+    print(f"{n} clinics, index built in {index.last_build_ms:.1f}ms")
+
+    random.seed(0)
+    points = [(random.uniform(8, 34), random.uniform(68, 97)) for _ in range(500)]
+    points += [(c[0] + random.uniform(-0.2, 0.2), c[1] + random.uniform(-0.2, 0.2)) for c in CITY_CENTRES for _ in range(60)]
+
+    for label, query in [
+        ("nearest 10", lambda lat, lng: index.nearest(lat, lng, limit=10)),
+        ("within 25km, limit 20", lambda lat, lng: index.nearest(lat, lng, limit=20, radius_km=25)),
+    ]:
+        print(f"  {label:<24} {timed(query, points):.3f} ms/query")
+    print(f"  {'brute-force scan':<24} {timed(lambda lat, lng: np.argsort(haversine_km(lat, lng, lats, lngs))[:10], points[:50]):.3f} ms/query")
+
+    mismatches = 0
+    for lat, lng in points[:200]:
+        expected = ids[np.argsort(haversine_km(lat, lng, lats, lngs))[:10]].tolist()
+        got = [cid for cid, _ in index.nearest(lat, lng, limit=10)]
+        mismatches += got != expected
+    print(f"  nearest-10 mismatches vs brute force: {mismatches}/200")
@@ -0,0 +1,53 @@
+# benchmark_clinic_suggest.py
+# Measures /api/clinics/suggest index latency on synthetic clinics built from the
+# cities in indian_ivf_clinics.csv.
+#
+#   python benchmark_clinic_suggest.py            # 100,000 clinics
+#   python benchmark_clinic_suggest.py 300000
+import csv
+import sys
+import time
+import random
+
+from clinic_suggest import ClinicSuggestIndex
+
+PREFIXES = ["Nova", "Oasis", "Bloom", "Indira", "Cloudnine", "Milann", "Apollo", "Manipal", "Motherhood", "Sunrise",
+            "Lotus", "Genesis", "Hope", "Aastha", "Ankur", "Shree", "Sai", "Kiran", "Jeevan", "Nirmal"]
+SUFFIXES = ["IVF", "Fertility Centre", "Fertility Clinic", "IVF Hospital", "Women's Hospital", "Reproductive Centre"]
+QUERIES = ["Beng", "Bengaluru", "bangalor", "Tiruchi", "trichy", "mumbay", "nova", "bloom iv", "oasis hub",
+           "pun", "gurugram", "hydrabad", "apolo fert", "m", "sunrise ivf del", "chenai"]
+
+def load_cities(path="indian_ivf_clinics.csv"):
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            cities = sorted({(row["City"], row["State"]) for row in csv.DictReader(f) if row.get("City")})
+    except (OSError, KeyError):
+        cities = []
+    # The seeded metros, so the alias queries below have something to find
+    return cities + [("Bangalore", "KA"), ("Mumbai", "MH"), ("Delhi", "DL"), ("Chennai", "TN"), ("Tiruchirappalli", "TN")]
+
+def synthetic_rows(n, seed=7):
+    rnd = random.Random(seed)
+    cities = load_cities()
+    for i in range(1, n + 1):
+        city, state = rnd.choice(cities)
+        name = f"{rnd.choice(PREFIXES)} {rnd.choice(SUFFIXES)}" + (f" {city}" if rnd.random() < 0.3 else "")
+        yield i, name, city, state
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    index = ClinicSuggestIndex()
+    start = time.perf_counter()
+    index.load(list(synthetic_rows(n)))
+    print(f"{n} clinics, index built in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    worst = 0.0
+    for q in QUERIES:
+        start = time.perf_counter()
+        for _ in range(20):
+            results = index.suggest(q)
+        elapsed = (time.perf_counter() - start) / 20 * 1000
+        worst = max(worst, elapsed)
+        top = ", ".join(r["label"] for r in results[:3])
+        print(f"  {q!r:20} {elapsed:6.2f} ms   {top}")
+    print(f"  slowest query: {worst:.2f} ms")
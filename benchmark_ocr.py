@@ -0,0 +1,64 @@
+# benchmark_ocr.py
+# Measures document extraction throughput (pages/second) for different process pool sizes.
+#
+#   python benchmark_ocr.py                       # synthetic 40-page text-layer PDF
+#   python benchmark_ocr.py scan.tiff image/tiff  # your own multi-page scan (needs tesseract)
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+from document_extraction import extract_text_from_file, count_pdf_pages, count_image_frames
+
+def write_sample_pdf(path, pages=40, lines_per_page=45):
+    """Writes a minimal multi-page PDF with a text layer, so no extra libraries are needed."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for p in range(pages):
+        lines = "".join(
+            f"BT /F1 10 Tf 50 {780 - 16 * i} Td (Lab report page {p + 1} line {i + 1}: Hb 12.{i % 10} g/dL, FSH 6.{i % 7} mIU/mL) Tj ET\n"
+            for i in range(lines_per_page)
+        )
+        objects.append(f"<< /Length {len(lines)} >>\nstream\n{lines}endstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R /Resources << /Font << /F1 3 0 R >> >> >>")
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {pages} >>"
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{obj}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n" + "".join(f"{o:010d} 00000 n \n" for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    with open(path, "w", encoding="latin-1") as f:
+        f.write(out)
+
+def benchmark(file_path, file_type, worker_counts):
+    pages = count_pdf_pages(file_path) if file_type == "application/pdf" else count_image_frames(file_path)
+    print(f"{file_path}: {pages} pages")
+    baseline = None
+    for workers in worker_counts:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # Warm up the worker processes so start-up cost isn't counted
+            list(pool.map(abs, range(workers)))
+            start = time.perf_counter()
+            text = extract_text_from_file(file_path, file_type, executor=pool).text
+            elapsed = time.perf_counter() - start
+        rate = pages / elapsed
+        baseline = baseline or rate
+        print(f"  workers={workers:<3} {elapsed:7.2f}s  {rate:8.1f} pages/s  speedup x{rate / baseline:.2f}  ({len(text)} chars)")
+
+if __name__ == "__main__":
+    max_workers = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, 8, max_workers} & set(range(1, max_workers + 1)))
+    if len(sys.argv) > 1:
+        benchmark(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "application/pdf", worker_counts)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            sample = os.path.join(tmp, "sample_report.pdf")
+            write_sample_pdf(sample)
+            benchmark(sample, "application/pdf", worker_counts)
@@ -0,0 +1,124 @@
+# check_dashboard_queries.py
+# Guards the dashboards' query counts in a scratch SQLite database:
+# - the doctor dashboard is rendered for a clinic with few and with many patients (each
+#   with cycles, predictions, logs and activities) and must not grow with the patient count;
+# - the patient dashboard must cost one query once its summary is built, and a new
+#   wellness log must show up on the next visit.
+#
+#   python check_dashboard_queries.py
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), "dashboard_check.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+from sqlalchemy import event
+
+from main import app
+from database import db
+from models import User, PatientData, IVFCycle, Prediction, WellnessLog, MedicalActivity
+from dashboard_service import load_patient_dashboard, patient_dashboard_data
+
+MAX_DASHBOARD_QUERIES = 10  # Session lookup, overview cards, patient page + details, form options
+PATIENT_DASHBOARD_QUERIES = 1
+
+def add_patients(clinic_id, start, count):
+    today = date.today()
+    for i in range(start, start + count):
+        patient = User(username=f"patient{i}", email=f"patient{i}@example.com", first_name=f"Pat{i}",
+                       last_name=f"Ient{i:05d}", user_type="patient", clinic_id=clinic_id, password_hash="x")
+        db.session.add(patient)
+        db.session.flush()
+        db.session.add(PatientData(user_id=patient.id, age=30 + i % 10))
+        for c in range(2):
+            db.session.add(IVFCycle(patient_id=patient.id, start_date=today - timedelta(days=60 - 30 * c),
+                                    status="stimulation", outcome="BFP" if c and i % 2 else None))
+            db.session.add(Prediction(user_id=patient.id, success_probability=0.3 + c / 10,
+                                      prediction_date=datetime.now(timezone.utc) - timedelta(days=10 - c)))
+        for d in range(3):
+            db.session.add(WellnessLog(user_id=patient.id, date=today - timedelta(days=d), mood_rating=3))
+        db.session.add(MedicalActivity(patient_id=patient.id, activity_type="scan", activity_name="Ultrasound"))
+    db.session.commit()
+
+def count_queries(client, url="/doctor_dashboard"):
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    if response.status_code != 200:
+        sys.exit(f"{url} returned HTTP {response.status_code}")
+    return len(statements)
+
+def login(client, user_id, user_type):
+    with client.session_transaction() as sess:
+        sess["user_id"] = user_id
+        sess["user_type"] = user_type
+
+def check_queries():
+    with app.app_context():
+        doctor = User.query.filter_by(user_type="doctor").first()
+        doctor_id, clinic_id = doctor.id, doctor.clinic_id
+        client = app.test_client()
+        login(client, doctor_id, "doctor")
+
+        results = []
+        added = 0
+        for total in (5, 200):
+            add_patients(clinic_id, added, total - added)
+            added = total
+            db.session.remove()
+            results.append((total, count_queries(client)))
+
+    failed = False
+    for total, queries in results:
+        print(f"{total:>4} patients: {queries} queries")
+        failed |= queries > MAX_DASHBOARD_QUERIES
+    if results[0][1] != results[-1][1]:
+        print("FAIL: query count grows with the number of patients")
+        failed = True
+    elif failed:
+        print(f"FAIL: more than {MAX_DASHBOARD_QUERIES} queries per render")
+    else:
+        print("OK: query count is constant")
+    return not failed
+
+def check_patient_dashboard():
+    with app.app_context():
+        patient = User.query.filter_by(user_type="patient").first()
+        patient_id = patient.id
+        client = app.test_client()
+        login(client, patient_id, "patient")
+
+        client.get("/patient_dashboard")  # Builds the summary
+        warm = count_queries(client, "/patient_dashboard")
+
+        db.session.add(WellnessLog(user_id=patient_id, date=date.today() + timedelta(days=1), mood_rating=5))
+        db.session.commit()
+        db.session.remove()
+        client.get("/patient_dashboard")
+        user = load_patient_dashboard(patient_id)
+        refreshed = patient_dashboard_data(user).recent_wellness[0].date == date.today() + timedelta(days=1)
+
+    print(f"patient dashboard: {warm} queries")
+    ok = True
+    if warm != PATIENT_DASHBOARD_QUERIES:
+        print(f"FAIL: expected {PATIENT_DASHBOARD_QUERIES} query")
+        ok = False
+    if not refreshed:
+        print("FAIL: the summary was not rebuilt after a new wellness log")
+        ok = False
+    if ok:
+        print("OK: patient dashboard is one query and refreshes on writes")
+    return ok
+
+if __name__ == "__main__":
+    ok = check_queries()
+    ok = check_patient_dashboard() and ok
+    os.remove(DB_FILE)
+    sys.exit(0 if ok else 1)
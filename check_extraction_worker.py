@@ -0,0 +1,80 @@
+# check_extraction_worker.py
+# Runs a multi-page PDF through an extraction worker process (worker_loop, started the
+# way run_workers starts it) against a scratch database, and checks that the job
+# finishes with every page's text and that the worker stops cleanly when terminated.
+#
+#   python check_extraction_worker.py
+import os
+import sys
+import time
+import socket
+import tempfile
+import multiprocessing
+
+# The spawned worker re-imports this module: it must find the same database
+if "EXTRACTION_CHECK_DB" not in os.environ:
+    os.environ["EXTRACTION_CHECK_DB"] = os.path.join(tempfile.mkdtemp(), "extraction_check.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.environ['EXTRACTION_CHECK_DB']}"
+
+from main import app
+from database import db
+from models import User, MedicalDocument
+from extraction_jobs import enqueue_extraction, worker_loop, JOB_DONE, JOB_FAILED
+from document_extraction import file_sha256
+from benchmark_ocr import write_sample_pdf
+
+PAGES = 3
+JOB_TIMEOUT = 120  # seconds
+
+def check_extraction_worker():
+    filename = f"extraction_check_{os.getpid()}.pdf"
+    path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    write_sample_pdf(path, pages=PAGES, lines_per_page=3)
+    worker = None
+    try:
+        with app.app_context():
+            user = User(username="extract", email="extract@example.com", first_name="Ex", last_name="Tract",
+                        user_type="patient", password_hash="x")
+            db.session.add(user)
+            db.session.flush()
+            document = MedicalDocument(user_id=user.id, filename=filename, original_filename="report.pdf",
+                                       file_type="application/pdf", content_hash=file_sha256(path))
+            db.session.add(document)
+            db.session.commit()
+            document_id, job_id = document.id, enqueue_extraction(document).id
+
+        worker = multiprocessing.get_context("spawn").Process(
+            target=worker_loop, args=(f"{socket.gethostname()}-check", 0.2))
+        worker.start()
+
+        deadline = time.monotonic() + JOB_TIMEOUT
+        with app.app_context():
+            while time.monotonic() < deadline:
+                status = db.session.execute(db.text("SELECT status, error FROM extraction_job WHERE id = :id"),
+                                            {"id": job_id}).first()
+                extracted_text = db.session.get(MedicalDocument, document_id).extracted_text or ""
+                if status.status in (JOB_DONE, JOB_FAILED):
+                    break
+                db.session.remove()
+                time.sleep(0.5)
+
+        ok = status.status == JOB_DONE
+        print(f"[{'ok' if ok else 'FAIL':>4}] {PAGES}-page PDF job: {status.status} {status.error or ''}")
+        if ok:
+            pages_found = sum(f"Lab report page {p + 1} " in extracted_text for p in range(PAGES))
+            ok = pages_found == PAGES
+            print(f"[{'ok' if ok else 'FAIL':>4}] text of {pages_found}/{PAGES} pages extracted")
+    finally:
+        if worker is not None:
+            worker.terminate()
+            worker.join(30)
+            stopped = not worker.is_alive()
+            print(f"[{'ok' if stopped else 'FAIL':>4}] worker stopped on terminate()")
+            if not stopped:
+                worker.kill()
+                ok = False
+        os.remove(path)
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check_extraction_worker() else 1)
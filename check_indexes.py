@@ -0,0 +1,82 @@
+# check_indexes.py
+# Runs EXPLAIN QUERY PLAN for the app's hot filter/order-by queries and fails if any of
+# them scans a whole table or sorts its result in a temporary B-tree instead of reading
+# it in order from an index.
+#
+#   python check_indexes.py                        # fresh scratch database (all migrations)
+#   python check_indexes.py instance/ivf_tracker.db  # an existing (e.g. migrated) database
+import os
+import re
+import sys
+import shutil
+import tempfile
+from datetime import date
+
+SCRATCH_DIR = tempfile.mkdtemp()
+DB_FILE = os.path.join(SCRATCH_DIR, "index_check.db")
+if len(sys.argv) > 1:
+    # Work on a copy so startup (migrations, seeding) never touches the original
+    shutil.copyfile(sys.argv[1], DB_FILE)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_FILE}"
+
+from sqlalchemy import tuple_
+
+from main import app, CLINIC_LIST_ORDER, USER_LIST_ORDER
+from database import db
+from models import (User, Clinic, IVFCycle, CycleNote, WellnessLog, MedicationReminder,
+                    MedicalDocument, Prediction, MedicalActivity)
+from dashboard_service import doctor_patient_filter, PATIENT_LIST_ORDER
+
+FULL_SCAN = re.compile(r"\bSCAN (\w+)$")  # "SCAN table" without "USING ... INDEX"
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+# Queries allowed to sort: their rows are found through an index and the sort is bounded
+# by it (one clinic's patients plus the unassigned ones: an OR can't be read in name order)
+BOUNDED_SORTS = {"clinic patients page"}
+
+def hot_queries():
+    user_id, today = 1, date.today()
+    doctor = User(id=1, clinic_id=1)
+    return {
+        "wellness logs by date": WellnessLog.query.filter_by(user_id=user_id).order_by(WellnessLog.date.desc()).limit(30),
+        "today's wellness log": WellnessLog.query.filter_by(user_id=user_id, date=today),
+        "latest prediction": Prediction.query.filter_by(user_id=user_id).order_by(Prediction.prediction_date.desc()).limit(1),
+        "latest cycle": IVFCycle.query.filter_by(patient_id=user_id).order_by(IVFCycle.start_date.desc()).limit(1),
+        "active medications": MedicationReminder.query.filter_by(user_id=user_id, is_active=True).order_by(MedicationReminder.time_of_day),
+        "documents by upload date": MedicalDocument.query.filter_by(user_id=user_id).order_by(MedicalDocument.uploaded_at.desc()),
+        "doctor's notes": CycleNote.query.filter_by(doctor_id=user_id).order_by(CycleNote.created_at.desc()),
+        "notes on a cycle": CycleNote.query.filter_by(cycle_id=user_id),
+        "recent activities": MedicalActivity.query.order_by(MedicalActivity.performed_date.desc()).limit(10),
+        "patient's last activity": db.session.query(db.func.max(MedicalActivity.performed_date)).filter(MedicalActivity.patient_id == user_id),
+        "clinic list page": Clinic.query.filter(tuple_(*CLINIC_LIST_ORDER) > tuple_("KA", "Bangalore", "A", 1)).order_by(*CLINIC_LIST_ORDER).limit(51),
+        "user list page": User.query.order_by(*[c.desc() for c in USER_LIST_ORDER]).limit(51),
+        "clinic patients page": User.query.filter(doctor_patient_filter(doctor)).order_by(*PATIENT_LIST_ORDER).limit(51),
+    }
+
+def query_plan(query):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return [row[-1] for row in rows]
+
+def check_indexes():
+    failures = 0
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            sys.exit("check_indexes.py reads SQLite query plans")
+        for name, query in hot_queries().items():
+            plan = query_plan(query)
+            problems = [step for step in plan if FULL_SCAN.search(step) or (TEMP_SORT in step and name not in BOUNDED_SORTS)]
+            status = "FAIL" if problems else "ok"
+            print(f"[{status:>4}] {name}: {' | '.join(plan)}")
+            failures += bool(problems)
+
+    if failures:
+        print(f"{failures} hot queries are missing a supporting index")
+    else:
+        print("All hot queries use an index")
+    return failures == 0
+
+if __name__ == "__main__":
+    ok = check_indexes()
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
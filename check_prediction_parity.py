@@ -0,0 +1,61 @@
+import itertools
+from types import SimpleNamespace
+
+from prediction_service import (
+    COHORT_COLUMNS,
+    calculate_ivf_success_prediction,
+    calculate_embryo_quality_score,
+    generate_personalized_protocol,
+    score_cohort
+)
+
+# Values straddle every threshold used by the rules, plus missing/zero values
+AGES = [None, 0, 25, 30, 31, 35, 36, 37, 38, 40, 41, 42, 43, 48]
+BMIS = [None, 0, 17.0, 18.5, 22.0, 24.9, 25.0, 29.9, 30.0, 35.0]
+AMHS = [None, 0, 0.5, 0.99, 1.0, 1.5, 1.99, 2.0, 4.0]
+FSHS = [None, 7.0]
+PREVIOUS = [None, 0, 1, 2, 5]
+PARTNER_AGES = [None, 30, 35, 40, 45, 50]
+DIAGNOSES = [None, "PCOS"]
+LIFESTYLES = [None, "Non-smoker, active", "no smoking", "Smoking", "regular exercise"]
+
+def build_patients():
+    patients = []
+    for combo in itertools.product(AGES, BMIS, AMHS, FSHS, PREVIOUS, PARTNER_AGES, DIAGNOSES, LIFESTYLES):
+        patients.append(SimpleNamespace(**dict(zip(COHORT_COLUMNS, combo))))
+    return patients
+
+def check_parity():
+    patients = build_patients()
+    frame = {col: [getattr(p, col) for p in patients] for col in COHORT_COLUMNS}
+    cohort = score_cohort(frame)
+
+    mismatches = 0
+    for i, p in enumerate(patients):
+        success = calculate_ivf_success_prediction(p)
+        embryo = calculate_embryo_quality_score(p)
+        protocol = generate_personalized_protocol(p)
+        expected = {
+            "success_rate": success["success_rate"],
+            "confidence": success["confidence"],
+            "interpretation": success["interpretation"],
+            "quality_score": embryo["quality_score"],
+            "grade": embryo["grade"],
+            "development_probability": embryo["development_probability"],
+            "implantation_potential": embryo["implantation_potential"],
+            "protocol_name": protocol["protocol_name"],
+            "expected_response": protocol["expected_response"],
+            "stimulation_duration": protocol["timing_recommendations"]["stimulation_duration"],
+            "personalization_score": protocol["personalization_score"],
+        }
+        for key, value in expected.items():
+            if cohort[key][i] != value:
+                mismatches += 1
+                if mismatches <= 10:
+                    print(f"Mismatch for {vars(p)} on {key}: scalar={value!r} cohort={cohort[key][i]!r}")
+
+    print(f"Checked {len(patients)} patients: {mismatches} mismatches")
+    return mismatches == 0
+
+if __name__ == "__main__":
+    raise SystemExit(0 if check_parity() else 1)
@@ -0,0 +1,105 @@
+# check_replica_routing.py
+# Checks read-replica routing (read_replicas.py) against scratch SQLite databases: a
+# primary, two copies of it standing in for replicas (each holding a different mood
+# rating for the same wellness log, so a response shows where it was read), and a
+# replica URL that can't be opened.
+# - @replica_reads requests read from the replicas in turn, skipping the broken one,
+#   and all reads of one request come from the same replica;
+# - other code, writes, and reads after a write in the same request use the primary;
+# - a browser session that just wrote reads from the primary on its next requests.
+#
+#   python check_replica_routing.py
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import date
+
+SCRATCH_DIR = tempfile.mkdtemp()
+PRIMARY, REPLICAS = os.path.join(SCRATCH_DIR, "primary.db"), [os.path.join(SCRATCH_DIR, f"replica{i}.db") for i in range(2)]
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URLS"] = ",".join(
+    [f"sqlite:///{path}" for path in REPLICAS] + [f"sqlite:///{SCRATCH_DIR}/missing/replica.db"])
+
+from flask import g, session
+
+from main import app
+from database import db
+from models import User, WellnessLog
+from read_replicas import replica_router, PRIMARY_UNTIL_KEY
+
+PRIMARY_MOOD, REPLICA_MOODS = 10, (1, 2)
+
+def set_up_databases():
+    with app.app_context():
+        user = User(username="replica", email="replica@example.com", first_name="Re", last_name="Plica",
+                    user_type="patient", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(WellnessLog(user_id=user.id, date=date.today(), mood_rating=PRIMARY_MOOD))
+        db.session.commit()
+        user_id = user.id
+        db.engine.dispose()
+    source = sqlite3.connect(PRIMARY)
+    for path, mood in zip(REPLICAS, REPLICA_MOODS):
+        replica = sqlite3.connect(path)
+        source.backup(replica)
+        replica.execute("UPDATE wellness_log SET mood_rating = ?", (mood,))
+        replica.commit()
+        replica.close()
+    source.close()
+    return user_id
+
+def served_moods(client, requests=6):
+    return [client.get("/api/wellness_data").get_json()["mood"][-1] for _ in range(requests)]
+
+def check_replica_routing():
+    failures = []
+    def check(condition, message):
+        print(f"[{'ok' if condition else 'FAIL':>4}] {message}")
+        if not condition:
+            failures.append(message)
+
+    user_id = set_up_databases()
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = user_id
+
+    moods = served_moods(client)
+    alternating = all(a != b for a, b in zip(moods, moods[1:]))
+    check(set(moods) == set(REPLICA_MOODS) and alternating, f"requests alternate between the healthy replicas: {moods}")
+    check(replica_router.stats()["replicas"].get("replica_2") is False, "the unreachable replica is skipped")
+
+    with client.session_transaction() as s:
+        s[PRIMARY_UNTIL_KEY] = time.time() + 60
+    moods = served_moods(client, 2)
+    check(moods == [PRIMARY_MOOD] * 2, f"a session that just wrote reads from the primary: {moods}")
+
+    with app.test_request_context():
+        check(WellnessLog.query.filter_by(user_id=user_id).first().mood_rating == PRIMARY_MOOD, "routes without @replica_reads read from the primary")
+        db.session.remove()
+
+        g.replica_reads = True
+        query = WellnessLog.query.filter_by(user_id=user_id)
+        moods = [query.first().mood_rating for _ in range(4)]
+        check(moods[0] in REPLICA_MOODS, "@replica_reads routes read from a replica")
+        check(len(set(moods)) == 1, f"every read of a request uses the same replica: {moods}")
+        db.session.add(WellnessLog(user_id=user_id, date=date(2000, 1, 1), mood_rating=PRIMARY_MOOD))
+        db.session.flush()
+        check(query.filter_by(date=date(2000, 1, 1)).count() == 1, "reads after a flush use the primary")
+        check(session.get(PRIMARY_UNTIL_KEY, 0) > time.time(), "a write marks the browser session for the primary")
+        db.session.rollback()
+        db.session.remove()
+
+    if failures:
+        print(f"{len(failures)} replica routing checks failed")
+    else:
+        print("Replica routing OK")
+    return not failures
+
+if __name__ == "__main__":
+    ok = check_replica_routing()
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+    sys.exit(0 if ok else 1)
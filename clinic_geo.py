@@ -0,0 +1,117 @@
+# clinic_geo.py
+# In-memory spatial index over Clinic.latitude/longitude for "nearest clinics" searches.
+#
+# Coordinates are kept in a ball tree using the haversine metric, so radius and
+# nearest-N queries only visit nearby clinics instead of scanning the table.
+# The tree is rebuilt lazily: committing a clinic insert/update/delete in this process
+# marks it stale, and changes made by other processes (or bulk UPDATEs) are picked up
+# after CLINIC_GEO_REFRESH_SECONDS.
+import os
+import time
+import logging
+import threading
+from itertools import chain
+
+import numpy as np
+from sklearn.neighbors import BallTree
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import db
+from models import Clinic
+
+EARTH_RADIUS_KM = 6371.0088
+CLINIC_GEO_REFRESH_SECONDS = float(os.environ.get("CLINIC_GEO_REFRESH_SECONDS", 300))
+
+
+class ClinicGeoIndex:
+    def __init__(self, refresh_seconds=CLINIC_GEO_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._ids = None
+        self._tree = None
+        self._built_at = 0.0
+        self._stale = False
+        self.builds = 0
+        self.last_build_ms = 0.0
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _needs_build(self):
+        return self._stale or self._ids is None or time.monotonic() - self._built_at > self.refresh_seconds
+
+    def build(self):
+        """Loads every clinic with coordinates and rebuilds the tree. Needs an app context."""
+        rows = db.session.query(Clinic.id, Clinic.latitude, Clinic.longitude).filter(
+            Clinic.latitude.isnot(None), Clinic.longitude.isnot(None)
+        ).all()
+        self.load([r.id for r in rows], [r.latitude for r in rows], [r.longitude for r in rows])
+
+    def load(self, ids, latitudes, longitudes):
+        """Builds the tree from parallel sequences of clinic ids and coordinates in degrees."""
+        start = time.perf_counter()
+        ids = np.asarray(ids, dtype=np.int64)
+        coords = np.radians(np.column_stack([np.asarray(latitudes, dtype=np.float64), np.asarray(longitudes, dtype=np.float64)]))
+        tree = BallTree(coords, metric="haversine") if len(ids) else None
+        # Swap in the finished index in one step so concurrent readers never see a half-built one
+        self._ids, self._tree = ids, tree
+        self._built_at = time.monotonic()
+        self.builds += 1
+        self.last_build_ms = (time.perf_counter() - start) * 1000
+        logging.info(f"Clinic geo index built: {len(ids)} clinics in {self.last_build_ms:.1f}ms")
+
+    def _current(self):
+        if self._needs_build():
+            with self._lock:
+                if self._needs_build():
+                    self._stale = False
+                    self.build()
+        return self._ids, self._tree
+
+    def nearest(self, lat, lng, limit=10, radius_km=None):
+        """
+        Returns [(clinic_id, distance_km), ...] sorted by great-circle distance,
+        at most `limit` long and, if radius_km is given, within that radius.
+        """
+        ids, tree = self._current()
+        if tree is None or limit <= 0:
+            return []
+        point = np.radians([[lat, lng]])
+        k = min(limit, len(ids))
+        # k-nearest then a radius cut: a radius query would collect (and sort) every clinic
+        # inside the radius, which in a dense city is far more than `limit`
+        dist, idx = tree.query(point, k=k)
+        results = [(int(ids[i]), float(d * EARTH_RADIUS_KM)) for i, d in zip(idx[0], dist[0])]
+        if radius_km is not None:
+            results = [(clinic_id, km) for clinic_id, km in results if km <= radius_km]
+        return results
+
+    def stats(self):
+        return {
+            "clinics": 0 if self._ids is None else int(len(self._ids)),
+            "builds": self.builds,
+            "last_build_ms": round(self.last_build_ms, 2),
+            "stale": self._stale,
+        }
+
+
+clinic_geo_index = ClinicGeoIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_clinic_changes(session, flush_context):
+    if any(isinstance(obj, Clinic) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["clinics_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clinics_committed(session):
+    # Only after commit, so a rebuild can't race ahead and miss the new rows
+    if session.info.pop("clinics_changed", False):
+        clinic_geo_index.mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clinics_rolled_back(session):
+    session.info.pop("clinics_changed", None)
@@ -0,0 +1,153 @@
+# clinic_search.py
+# Full-text clinic search over name, city, state and description.
+#
+# SQLite: an external-content FTS5 table (clinic_fts) kept in sync with the clinic
+# table by triggers, so admin add/edit/delete and the import scripts all update it.
+# PostgreSQL: a generated, weighted tsvector column on clinic with a GIN index.
+# Other databases fall back to the old case-insensitive LIKE search.
+import re
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from database import db
+from models import Clinic
+
+MAX_SEARCH_RESULTS = 200
+# Relative importance of a match in each column (name, city, state, description)
+COLUMN_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+SQLITE_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS clinic_fts USING fts5(
+        name, city, state, description,
+        content='clinic', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS clinic_fts_insert AFTER INSERT ON clinic BEGIN
+        INSERT INTO clinic_fts(rowid, name, city, state, description)
+        VALUES (new.id, new.name, new.city, new.state, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clinic_fts_delete AFTER DELETE ON clinic BEGIN
+        INSERT INTO clinic_fts(clinic_fts, rowid, name, city, state, description)
+        VALUES ('delete', old.id, old.name, old.city, old.state, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clinic_fts_update AFTER UPDATE ON clinic BEGIN
+        INSERT INTO clinic_fts(clinic_fts, rowid, name, city, state, description)
+        VALUES ('delete', old.id, old.name, old.city, old.state, old.description);
+        INSERT INTO clinic_fts(rowid, name, city, state, description)
+        VALUES (new.id, new.name, new.city, new.state, new.description);
+    END""",
+]
+
+POSTGRES_SETUP = [
+    """ALTER TABLE clinic ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(city, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(state, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'D')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_clinic_search_vector ON clinic USING GIN (search_vector)",
+]
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def setup_clinic_search(connection):
+    """
+    Creates the search index (idempotent) and fills it on first creation.
+    Run by the clinic_full_text_search migration on its connection.
+    """
+    dialect = connection.dialect.name
+    try:
+        # Savepoint, so a database without FTS5 only loses the index, not the migration's transaction
+        with connection.begin_nested():
+            if dialect == 'sqlite':
+                created = not connection.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clinic_fts'"
+                )).first()
+                for statement in SQLITE_SETUP:
+                    connection.execute(text(statement))
+                if created:
+                    # Index the clinics that existed before the FTS table
+                    connection.execute(text("INSERT INTO clinic_fts(clinic_fts) VALUES ('rebuild')"))
+            elif dialect == 'postgresql':
+                for statement in POSTGRES_SETUP:
+                    connection.execute(text(statement))
+    except DBAPIError as e:
+        logging.error(f"Could not set up clinic full-text search, using LIKE search instead: {e}")
+
+
+def rebuild_clinic_search():
+    """Re-indexes every clinic (e.g. after bulk edits made with triggers disabled)."""
+    if _dialect() == 'sqlite':
+        db.session.execute(text("INSERT INTO clinic_fts(clinic_fts) VALUES ('rebuild')"))
+        db.session.commit()
+
+
+def search_terms(query):
+    """Splits free text like 'Bangalore, KA' into lowercase word tokens."""
+    return re.findall(r"\w+", (query or '').lower())
+
+
+def _fts5_match(terms, operator):
+    # Quote each token so user input can't inject FTS syntax; '*' makes it a prefix match
+    return f" {operator} ".join(f'"{t}"*' for t in terms)
+
+
+def _sqlite_search(terms, operator, limit):
+    rows = db.session.execute(text(
+        "SELECT rowid FROM clinic_fts WHERE clinic_fts MATCH :match "
+        f"ORDER BY bm25(clinic_fts, {', '.join(str(w) for w in COLUMN_WEIGHTS)}) LIMIT :limit"
+    ), {"match": _fts5_match(terms, operator), "limit": limit})
+    return [row[0] for row in rows]
+
+
+def _postgres_search(terms, operator, limit):
+    tsquery = f" {'&' if operator == 'AND' else '|'} ".join(f"{t}:*" for t in terms)
+    rows = db.session.execute(text(
+        "SELECT id FROM clinic WHERE search_vector @@ to_tsquery('simple', :q) "
+        "ORDER BY ts_rank(search_vector, to_tsquery('simple', :q)) DESC, id LIMIT :limit"
+    ), {"q": tsquery, "limit": limit})
+    return [row[0] for row in rows]
+
+
+def like_search(query, limit=MAX_SEARCH_RESULTS):
+    """The original substring search: 'city, state' parts or the whole query in the name."""
+    parts = [p.strip() for p in query.split(',')]
+    city = parts[0] if len(parts) > 0 else ''
+    state = parts[1] if len(parts) > 1 else ''
+
+    conditions = []
+    if city:
+        conditions.append(db.func.lower(Clinic.city).like(f"%{city.lower()}%"))
+    if state:
+        conditions.append(db.func.lower(Clinic.state).like(f"%{state.lower()}%"))
+    conditions.append(db.func.lower(Clinic.name).like(f"%{query.lower()}%"))
+    return Clinic.query.filter(db.or_(*conditions)).limit(limit).all()
+
+
+def search_clinics(query, limit=MAX_SEARCH_RESULTS):
+    """
+    Ranked clinic search. Every word is a prefix match; clinics matching all words
+    come first, and if none do, clinics matching any word are returned instead.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    dialect = _dialect()
+    if dialect not in ('sqlite', 'postgresql'):
+        return like_search(query, limit)
+    search = _sqlite_search if dialect == 'sqlite' else _postgres_search
+    try:
+        ids = search(terms, 'AND', limit) or (search(terms, 'OR', limit) if len(terms) > 1 else [])
+    except DBAPIError as e:
+        db.session.rollback()
+        logging.error(f"Clinic full-text search failed, using LIKE search: {e}")
+        return like_search(query, limit)
+
+    clinics = {c.id: c for c in Clinic.query.filter(Clinic.id.in_(ids)).all()} if ids else {}
+    return [clinics[i] for i in ids if i in clinics]
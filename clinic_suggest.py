@@ -0,0 +1,365 @@
+# clinic_suggest.py
+# In-memory autocomplete index for the clinic search box (/api/clinics/suggest).
+#
+# Suggestions are cities and clinic names. Every distinct word is kept in a sorted
+# vocabulary (prefix lookups by bisection, i.e. a flattened trie) and in a trigram
+# index (typo-tolerant lookups), and common alternate city names (Bengaluru/Bangalore,
+# Trichy/Tiruchirappalli, ...) are indexed as aliases.
+#
+# The index is built at startup and updated incrementally when clinic changes are
+# committed in this process; a full rebuild runs in the background every
+# CLINIC_SUGGEST_REFRESH_SECONDS to pick up changes made by other processes.
+# Changes committed while a rebuild runs are replayed onto the new index before it
+# replaces the old one, so they aren't lost to a snapshot read before they landed.
+import os
+import re
+import time
+import bisect
+import logging
+import threading
+import unicodedata
+from itertools import chain, islice
+from collections import namedtuple, defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import db
+from models import Clinic
+
+CLINIC_SUGGEST_REFRESH_SECONDS = float(os.environ.get("CLINIC_SUGGEST_REFRESH_SECONDS", 300))
+MAX_PREFIX_WORDS = 200  # Vocabulary words considered per prefix (short prefixes match many)
+MIN_SIMILARITY = 0.45  # Trigram similarity needed for a fuzzy word match
+MAX_CANDIDATES = 300  # Clinic entries scored per query
+CITY_MATCH_WEIGHT = 0.9  # A clinic matched only through its city ranks below the city itself
+
+# Alternate spellings and renamed cities, keyed by the name most likely stored in the data
+CITY_ALIASES = {
+    "bangalore": ["bengaluru"],
+    "mumbai": ["bombay"],
+    "chennai": ["madras"],
+    "kolkata": ["calcutta"],
+    "mysore": ["mysuru"],
+    "mangalore": ["mangaluru"],
+    "belgaum": ["belagavi"],
+    "gulbarga": ["kalaburagi"],
+    "hubli": ["hubballi"],
+    "shivamogga": ["shimoga"],
+    "bellary": ["ballari"],
+    "bijapur": ["vijayapura"],
+    "tumkur": ["tumakuru"],
+    "tiruchirappalli": ["trichy", "tiruchi"],
+    "thiruvananthapuram": ["trivandrum"],
+    "kochi": ["cochin"],
+    "kozhikode": ["calicut"],
+    "puducherry": ["pondicherry"],
+    "visakhapatnam": ["vizag"],
+    "vadodara": ["baroda"],
+    "pune": ["poona"],
+    "gurgaon": ["gurugram"],
+    "allahabad": ["prayagraj"],
+    "varanasi": ["benares", "banaras"],
+    "thane": ["thana"],
+    "kanpur": ["cawnpore"],
+}
+
+# Every name in a group finds the others, whichever one the clinic was saved under
+CITY_NAME_GROUPS = {}
+for _canonical, _aliases in CITY_ALIASES.items():
+    for _name in [_canonical, *_aliases]:
+        CITY_NAME_GROUPS[_name] = frozenset([_canonical, *_aliases])
+
+# words: the entry's own words; context_words: extra words it can be found by (a clinic's city)
+Suggestion = namedtuple("Suggestion", "kind label detail clinic_id words context_words")
+
+
+def normalize(value):
+    """Lowercase, accent-free, punctuation-free form used for matching."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"[a-z0-9]+", value.lower()))
+
+
+def trigrams(word, prefix=False):
+    """Trigrams of a word padded at the start (and at the end, unless it's a prefix still being typed)."""
+    padded = f"  {word}" if prefix else f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ClinicSuggestIndex:
+    def __init__(self, refresh_seconds=CLINIC_SUGGEST_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._app = None
+        self._refreshing = False
+        self._built_at = 0.0
+        self._change_logs = []  # One list per rebuild in progress, collecting changes to replay
+        self._reset()
+
+    def _reset(self):
+        self._entries = {}  # key -> Suggestion; key is ('clinic', id) or ('city', normalized city)
+        self._city_counts = defaultdict(int)
+        self._clinic_cities = {}  # clinic id -> city key
+        self._word_cities = defaultdict(set)  # word -> city entry keys
+        self._word_clinics = defaultdict(set)  # word -> clinic entry keys
+        self._vocabulary = []  # sorted words, for prefix search
+        self._trigram_words = defaultdict(set)  # trigram -> words
+
+    # --- Building and incremental updates ---
+
+    def init_app(self, app):
+        """Remembers the app for background refreshes and builds the index. Call inside an app context."""
+        self._app = app
+        self.build()
+
+    def build(self):
+        """Rebuilds the index from the clinic table. Needs an app context."""
+        changes = []
+        with self._lock:
+            self._change_logs.append(changes)
+        try:
+            self.load(db.session.query(Clinic.id, Clinic.name, Clinic.city, Clinic.state).all(), changes)
+        finally:
+            with self._lock:
+                self._change_logs.remove(changes)
+
+    def load(self, rows, changes=None):
+        """
+        Rebuilds the index from (id, name, city, state) rows, then replays `changes`
+        (a list apply_changes keeps extending until the new index is in place).
+        """
+        start = time.perf_counter()
+        # Build off to the side so suggestions keep being served from the old index meanwhile
+        staging = ClinicSuggestIndex()
+        for clinic_id, name, city, state in rows:
+            staging._add_clinic(clinic_id, name, city, state)
+        with self._lock:
+            if changes:
+                # Removing and re-adding is idempotent: replaying a change the rows already include is harmless
+                staging.apply_changes(changes)
+            self._entries, self._city_counts, self._clinic_cities = staging._entries, staging._city_counts, staging._clinic_cities
+            self._word_cities, self._word_clinics = staging._word_cities, staging._word_clinics
+            self._vocabulary, self._trigram_words = staging._vocabulary, staging._trigram_words
+            self._built_at = time.monotonic()
+        logging.info(f"Clinic suggest index built: {len(rows)} clinics in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def _postings(self, key):
+        return self._word_cities if key[0] == "city" else self._word_clinics
+
+    def _index_word(self, word, key):
+        if word not in self._word_cities and word not in self._word_clinics:
+            bisect.insort(self._vocabulary, word)
+            for gram in trigrams(word):
+                self._trigram_words[gram].add(word)
+        self._postings(key)[word].add(key)
+
+    def _unindex_word(self, word, key):
+        postings = self._postings(key)
+        keys = postings.get(word)
+        if keys is None:
+            return
+        keys.discard(key)
+        if keys:
+            return
+        del postings[word]
+        if word not in self._word_cities and word not in self._word_clinics:
+            i = bisect.bisect_left(self._vocabulary, word)
+            if i < len(self._vocabulary) and self._vocabulary[i] == word:
+                del self._vocabulary[i]
+            for gram in trigrams(word):
+                self._trigram_words[gram].discard(word)
+
+    def _add_entry(self, key, suggestion):
+        self._entries[key] = suggestion
+        for word in suggestion.words | suggestion.context_words:
+            self._index_word(word, key)
+
+    def _remove_entry(self, key):
+        suggestion = self._entries.pop(key, None)
+        if suggestion:
+            for word in suggestion.words | suggestion.context_words:
+                self._unindex_word(word, key)
+
+    def _add_clinic(self, clinic_id, name, city, state):
+        city_norm = normalize(city)
+        city_words = frozenset(city_norm.split()) | CITY_NAME_GROUPS.get(city_norm, frozenset())
+        # Clinic entries match on their city too, so "nova bangalore" finds Nova IVF in Bangalore
+        self._add_entry(("clinic", clinic_id), Suggestion(
+            "clinic", name, f"{city}, {state}", clinic_id, frozenset(normalize(name).split()), city_words))
+        if city_norm:
+            city_key = ("city", city_norm)
+            self._city_counts[city_key] += 1
+            self._clinic_cities[clinic_id] = city_key
+            if city_key not in self._entries:
+                self._add_entry(city_key, Suggestion("city", city, state, None, city_words, frozenset()))
+
+    def _remove_clinic(self, clinic_id):
+        self._remove_entry(("clinic", clinic_id))
+        city_key = self._clinic_cities.pop(clinic_id, None)
+        if city_key:
+            self._city_counts[city_key] -= 1
+            if self._city_counts[city_key] <= 0:
+                del self._city_counts[city_key]
+                self._remove_entry(city_key)
+
+    def apply_changes(self, changes):
+        """Applies committed clinic changes: [(clinic_id, name, city, state) or (clinic_id, None, None, None) for deletes]."""
+        with self._lock:
+            for log in self._change_logs:
+                log.extend(changes)
+            for clinic_id, name, city, state in changes:
+                self._remove_clinic(clinic_id)
+                if name is not None:
+                    self._add_clinic(clinic_id, name, city, state)
+
+    def _refresh_in_background(self):
+        def refresh():
+            try:
+                with self._app.app_context():
+                    self.build()
+            except Exception as e:
+                logging.error(f"Clinic suggest index refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _maybe_refresh(self):
+        if self._app is None:
+            return
+        with self._lock:
+            # Checked and claimed under the lock, so concurrent requests start one refresh
+            if self._refreshing or time.monotonic() - self._built_at <= self.refresh_seconds:
+                return
+            self._refreshing = True
+        self._refresh_in_background()
+
+    # --- Querying ---
+
+    def _prefix_words(self, token):
+        start = bisect.bisect_left(self._vocabulary, token)
+        words = []
+        for word in self._vocabulary[start:start + MAX_PREFIX_WORDS]:
+            if not word.startswith(token):
+                break
+            words.append(word)
+        return words
+
+    def _fuzzy_words(self, token, prefix):
+        """Vocabulary words sharing enough trigrams with the token (Dice coefficient)."""
+        grams = trigrams(token, prefix=prefix)
+        shared = defaultdict(int)
+        for gram in grams:
+            for word in self._trigram_words.get(gram, ()):
+                shared[word] += 1
+        matches = {}
+        for word, count in shared.items():
+            # A prefix still being typed is compared against the same-length start of the word;
+            # a word of n letters has n + 1 padded trigrams (ignoring repeats)
+            other = len(token) if prefix else len(word) + 1
+            similarity = 2 * count / (len(grams) + other)
+            if similarity >= MIN_SIMILARITY:
+                matches[word] = similarity
+        return matches
+
+    def _token_matches(self, token, is_last):
+        """Scores for vocabulary words matching one query token: exact > prefix > fuzzy."""
+        matches = {}
+        if len(token) >= 3:
+            for word, similarity in self._fuzzy_words(token, prefix=is_last).items():
+                matches[word] = 0.6 * similarity
+        for word in self._prefix_words(token):
+            matches[word] = 0.8 + 0.2 * len(token) / len(word)
+        return matches
+
+    def _candidates(self, token_matches):
+        """
+        Entries worth scoring: every city matching any token, plus clinics matching
+        the most selective token, best-matching words first, up to MAX_CANDIDATES.
+        """
+        candidates = set()
+        for matches in token_matches:
+            for word in matches:
+                candidates.update(self._word_cities.get(word, ()))
+
+        driver = min(
+            (m for m in token_matches if m),
+            key=lambda m: sum(len(self._word_clinics.get(word, ())) for word in m),
+            default={},
+        )
+        clinics = set()
+        for word in sorted(driver, key=driver.get, reverse=True):
+            clinics.update(islice(self._word_clinics.get(word, ()), MAX_CANDIDATES - len(clinics)))
+            if len(clinics) >= MAX_CANDIDATES:
+                break
+        return candidates | clinics
+
+    def _score(self, entry, token_matches):
+        total = 0.0
+        for matches in token_matches:
+            own = max((matches.get(word, 0.0) for word in entry.words), default=0.0)
+            context = max((matches.get(word, 0.0) for word in entry.context_words), default=0.0)
+            total += max(own, CITY_MATCH_WEIGHT * context)
+        return total / len(token_matches)
+
+    def suggest(self, query, limit=8):
+        self._maybe_refresh()
+        tokens = normalize(query).split()
+        if not tokens:
+            return []
+
+        with self._lock:
+            token_matches = [self._token_matches(token, is_last=(i == len(tokens) - 1)) for i, token in enumerate(tokens)]
+            scored = []
+            for key in self._candidates(token_matches):
+                entry = self._entries[key]
+                score = self._score(entry, token_matches)
+                if score > 0:
+                    # Cities before clinics on equal scores, bigger cities first, then shorter names
+                    scored.append((-score, key[0] != "city", -self._city_counts.get(key, 0), len(entry.label), entry.label, key))
+            scored.sort()
+
+            results, seen = [], set()
+            for neg_score, _, _, _, _, key in scored:
+                entry = self._entries[key]
+                if (entry.label, entry.detail) in seen:
+                    continue  # Same-named branches in one city: suggest once
+                seen.add((entry.label, entry.detail))
+                results.append({
+                    "type": entry.kind,
+                    "label": entry.label,
+                    "detail": entry.detail,
+                    "clinic_id": entry.clinic_id,
+                    "clinic_count": self._city_counts.get(key) if entry.kind == "city" else None,
+                    "score": round(-neg_score, 3),
+                })
+                if len(results) == limit:
+                    break
+            return results
+
+
+clinic_suggest_index = ClinicSuggestIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_clinic_changes(session, flush_context):
+    changes = session.info.setdefault("clinic_suggest_changes", [])
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, Clinic):
+            changes.append((obj.id, obj.name, obj.city, obj.state))
+    for obj in session.deleted:
+        if isinstance(obj, Clinic):
+            changes.append((obj.id, None, None, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_clinic_changes(session):
+    changes = session.info.pop("clinic_suggest_changes", None)
+    if changes:
+        clinic_suggest_index.apply_changes(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_clinic_changes(session):
+    session.info.pop("clinic_suggest_changes", None)
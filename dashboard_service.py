@@ -0,0 +1,281 @@
+# dashboard_service.py
+# Read-side queries behind the dashboards.
+#
+# The doctor dashboard used to load every patient and let the template walk
+# patient_data, ivf_cycles, predictions and wellness_logs lazily, row by row - several
+# queries per patient. Here a page of patients costs two queries whatever its size:
+# one keyset-paginated query for the patient rows, and one for their latest cycle and
+# prediction (picked with ROW_NUMBER() windows) and last activity (grouped MAX()es).
+#
+# The patient dashboard reads a per-patient PatientDashboard summary row, loaded
+# together with the user and their PatientData in one query. Flushing a change to a
+# patient's cycles, predictions, medications, wellness logs or daily tips clears the
+# summary and bumps the row's generation in the same transaction, and the next
+# dashboard visit rebuilds it. A rebuilt summary is only stored if the generation is
+# still the one read before the rebuild's queries, so a write committed while a
+# summary was being built can't be overwritten by that (stale) summary.
+import json
+from collections import namedtuple
+from datetime import date, datetime, time, timezone
+from itertools import chain
+from types import SimpleNamespace
+
+from sqlalchemy import event, func, or_, and_, select, Date, DateTime, Time
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+
+from database import db
+from models import (User, PatientData, IVFCycle, Prediction, WellnessLog, MedicalActivity,
+                    MedicationReminder, DailyTip, PatientDashboard)
+from pagination import keyset_page, DEFAULT_PAGE_SIZE
+
+PATIENT_LIST_ORDER = (User.last_name, User.first_name, User.id)
+RECENT_CYCLES = 10  # Cycles behind the dashboard's "Active Cycles" / success-rate cards
+RECENT_ACTIVITIES = 5
+RECENT_WELLNESS_LOGS = 7
+PATIENT_OPTIONS_LIMIT = 20  # Patients offered by a form's patient picker; the rest are found by searching
+# Writes to these models change a patient's dashboard summary; value is the patient id column
+SUMMARY_SOURCES = {
+    IVFCycle: 'patient_id',
+    Prediction: 'user_id',
+    MedicationReminder: 'user_id',
+    WellnessLog: 'user_id',
+    DailyTip: 'user_id',
+}
+# INSERT ... ON CONFLICT, to bump the generation of summaries that haven't been built yet too
+UPSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+PatientSummary = namedtuple("PatientSummary", [
+    "id", "first_name", "last_name", "email", "age",
+    "cycle_id", "cycle_status", "cycle_outcome", "cycle_protocol",
+    "success_probability", "last_log_date", "last_activity_at",
+])
+
+
+def doctor_patient_filter(doctor):
+    """Patients a doctor may see: their clinic's, plus patients not yet assigned to any clinic."""
+    unassigned = User.clinic_id.is_(None)
+    clinic = unassigned if doctor.clinic_id is None else or_(User.clinic_id == doctor.clinic_id, unassigned)
+    return and_(User.user_type == 'patient', clinic)
+
+
+def _latest(columns, partition, order_by, patient_ids):
+    """Subquery of `columns` for the first row per `partition` (by `order_by`) among patient_ids."""
+    rank = func.row_number().over(partition_by=partition, order_by=order_by).label("rank")
+    return select(*columns, rank).where(partition.in_(patient_ids)).subquery()
+
+
+def patient_summaries(patient_ids):
+    """{patient_id: (cycle/prediction/activity columns)} for the given patients, in one query."""
+    if not patient_ids:
+        return {}
+    cycle = _latest(
+        [IVFCycle.patient_id, IVFCycle.id, IVFCycle.status, IVFCycle.outcome, IVFCycle.protocol],
+        IVFCycle.patient_id, (IVFCycle.start_date.desc(), IVFCycle.id.desc()), patient_ids)
+    prediction = _latest(
+        [Prediction.user_id, Prediction.success_probability],
+        Prediction.user_id, (Prediction.prediction_date.desc(), Prediction.id.desc()), patient_ids)
+    last_log = select(WellnessLog.user_id, func.max(WellnessLog.date).label("last_date")).where(
+        WellnessLog.user_id.in_(patient_ids)).group_by(WellnessLog.user_id).subquery()
+    last_activity = select(MedicalActivity.patient_id, func.max(MedicalActivity.performed_date).label("last_at")).where(
+        MedicalActivity.patient_id.in_(patient_ids)).group_by(MedicalActivity.patient_id).subquery()
+
+    rows = db.session.query(
+        User.id,
+        cycle.c.id, cycle.c.status, cycle.c.outcome, cycle.c.protocol,
+        prediction.c.success_probability,
+        last_log.c.last_date,
+        last_activity.c.last_at,
+    ).select_from(User).outerjoin(
+        cycle, and_(cycle.c.patient_id == User.id, cycle.c.rank == 1)
+    ).outerjoin(
+        prediction, and_(prediction.c.user_id == User.id, prediction.c.rank == 1)
+    ).outerjoin(
+        last_log, last_log.c.user_id == User.id
+    ).outerjoin(
+        last_activity, last_activity.c.patient_id == User.id
+    ).filter(User.id.in_(patient_ids)).all()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def doctor_patient_page(doctor, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Returns ([PatientSummary, ...], next_cursor) for one alphabetical page of the
+    doctor's patients. Raises pagination.InvalidCursor for a bad cursor.
+    """
+    query = db.session.query(
+        User.id, User.first_name, User.last_name, User.email, PatientData.age
+    ).outerjoin(PatientData, PatientData.user_id == User.id).filter(doctor_patient_filter(doctor))
+    patients, next_cursor = keyset_page(query, PATIENT_LIST_ORDER, cursor=cursor, limit=limit)
+
+    details = patient_summaries([p.id for p in patients])
+    empty = (None,) * (len(PatientSummary._fields) - 5)
+    return [PatientSummary(*p, *details.get(p.id, empty)) for p in patients], next_cursor
+
+
+def doctor_dashboard_overview(doctor):
+    """Patient count, recent cycle outcomes and recent activities for the dashboard cards."""
+    scope = doctor_patient_filter(doctor)
+    patient_count = db.session.query(func.count(User.id)).filter(scope).scalar()
+    recent_outcomes = [row.outcome for row in db.session.query(IVFCycle.outcome).join(
+        User, IVFCycle.patient_id == User.id
+    ).filter(scope).order_by(IVFCycle.created_at.desc()).limit(RECENT_CYCLES)]
+    recent_activities = MedicalActivity.query.join(
+        User, MedicalActivity.patient_id == User.id
+    ).options(joinedload(MedicalActivity.patient)).filter(scope).order_by(
+        MedicalActivity.performed_date.desc()
+    ).limit(RECENT_ACTIVITIES).all()
+    return {
+        'patient_count': patient_count,
+        'recent_cycle_count': len(recent_outcomes),
+        'recent_successes': recent_outcomes.count('BFP'),
+        'recent_activities': recent_activities,
+    }
+
+
+def _like_prefix(term):
+    escaped = term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def doctor_patient_options(doctor, search=None, limit=PATIENT_OPTIONS_LIMIT):
+    """
+    (id, first_name, last_name) of up to `limit` patients the doctor may pick in a form,
+    alphabetically. With a search, every word must start the first name, last name or email.
+    """
+    query = db.session.query(User.id, User.first_name, User.last_name).filter(doctor_patient_filter(doctor))
+    for term in (search or "").split():
+        pattern = _like_prefix(term)
+        query = query.filter(or_(*(func.lower(column).like(pattern, escape="\\")
+                                   for column in (User.first_name, User.last_name, User.email))))
+    return query.order_by(*PATIENT_LIST_ORDER).limit(limit).all()
+
+
+# --- Patient dashboard read model ---
+
+def _dump_row(obj):
+    """Column values of a model instance, JSON-ready."""
+    if obj is None:
+        return None
+    values = {}
+    for column in obj.__table__.columns:
+        value = getattr(obj, column.key)
+        values[column.key] = value.isoformat() if isinstance(value, (date, time)) else value
+    return values
+
+
+def _load_row(model, values):
+    """Detached stand-in for a `model` instance from _dump_row output, with date/time columns parsed."""
+    if values is None:
+        return None
+    columns = model.__table__.columns
+    parsed = {}
+    for key, value in values.items():
+        column_type = columns[key].type if key in columns else None
+        if value is not None and isinstance(column_type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and isinstance(column_type, Date):
+            value = date.fromisoformat(value)
+        elif value is not None and isinstance(column_type, Time):
+            value = time.fromisoformat(value)
+        parsed[key] = value
+    return SimpleNamespace(**parsed)
+
+
+def build_patient_summary(user_id):
+    """Runs the dashboard's queries for one patient. Returns the JSON-ready summary dict."""
+    today = date.today()
+    latest_cycle = IVFCycle.query.filter_by(patient_id=user_id).order_by(
+        IVFCycle.start_date.desc(), IVFCycle.id.desc()).first()
+    latest_prediction = Prediction.query.filter_by(user_id=user_id).order_by(
+        Prediction.prediction_date.desc(), Prediction.id.desc()).first()
+    active_medications = MedicationReminder.query.filter_by(user_id=user_id, is_active=True).order_by(
+        MedicationReminder.time_of_day).all()
+    recent_wellness = WellnessLog.query.filter_by(user_id=user_id).order_by(
+        WellnessLog.date.desc()).limit(RECENT_WELLNESS_LOGS).all()
+    tips = DailyTip.query.filter_by(user_id=user_id, tip_date=today).all()
+    return {
+        'latest_cycle': _dump_row(latest_cycle),
+        'latest_prediction': _dump_row(latest_prediction),
+        'active_medications': [_dump_row(m) for m in active_medications],
+        'recent_wellness': [_dump_row(log) for log in recent_wellness],
+        'tip_date': today.isoformat(),
+        'tips': {tip.profile_hash: tip.tip for tip in tips},
+    }
+
+
+def load_patient_dashboard(user_id):
+    """The patient with patient_data and their dashboard summary row, in one query."""
+    return User.query.options(joinedload(User.patient_data), joinedload(User.dashboard)).filter(
+        User.id == user_id).first()
+
+
+def patient_dashboard_data(user):
+    """
+    Dashboard data for a user loaded by load_patient_dashboard: latest_cycle,
+    latest_prediction, active_medications, recent_wellness, today_wellness_log_exists
+    and today_tips ({profile_hash: tip}, or None if the summary predates today).
+    Builds and stores the summary first if a write invalidated it.
+    """
+    dashboard = user.dashboard
+    if dashboard is not None and dashboard.summary is not None:
+        summary = json.loads(dashboard.summary)
+    else:
+        # Read with the user, before build_patient_summary's queries
+        generation = dashboard.generation if dashboard is not None else None
+        summary = build_patient_summary(user.id)
+        store_patient_summary(user.id, summary, generation)
+
+    today = date.today()
+    recent_wellness = [_load_row(WellnessLog, log) for log in summary['recent_wellness']]
+    return SimpleNamespace(
+        latest_cycle=_load_row(IVFCycle, summary['latest_cycle']),
+        latest_prediction=_load_row(Prediction, summary['latest_prediction']),
+        active_medications=[_load_row(MedicationReminder, m) for m in summary['active_medications']],
+        recent_wellness=recent_wellness,
+        today_wellness_log_exists=any(log.date == today for log in recent_wellness),
+        today_tips=summary['tips'] if summary['tip_date'] == today.isoformat() else None,
+    )
+
+
+def store_patient_summary(user_id, summary, generation):
+    """
+    Stores a freshly built summary, unless the sources changed since `generation` (None:
+    there was no row) was read; the summary is then left for the next visit to rebuild.
+    """
+    try:
+        if generation is None:
+            db.session.add(PatientDashboard(user_id=user_id, summary=json.dumps(summary)))
+        else:
+            PatientDashboard.query.filter_by(user_id=user_id, generation=generation).update(
+                {'summary': json.dumps(summary), 'built_at': datetime.now(timezone.utc)}, synchronize_session=False)
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request or write created the row first
+        db.session.rollback()
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_patient_dashboards(session, flush_context):
+    user_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        column = SUMMARY_SOURCES.get(type(obj))
+        if column and getattr(obj, column) is not None:
+            user_ids.add(getattr(obj, column))
+    # Deleting a user deletes their summary row along with the sources
+    user_ids -= {obj.id for obj in session.deleted if isinstance(obj, User)}
+    if not user_ids:
+        return
+    # Same connection and transaction as the flush, so a rollback keeps the old summary
+    connection = session.connection()
+    table = PatientDashboard.__table__
+    upsert = UPSERTS.get(connection.dialect.name)
+    if upsert is None:
+        connection.execute(table.update().where(table.c.user_id.in_(user_ids)).values(
+            summary=None, generation=table.c.generation + 1))
+        return
+    statement = upsert(table).values([{'user_id': user_id, 'summary': None, 'generation': 1}
+                                      for user_id in sorted(user_ids)])
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.user_id], set_={'summary': None, 'generation': table.c.generation + 1}))
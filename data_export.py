@@ -0,0 +1,366 @@
+# data_export.py
+# Columnar export of wellness logs, IVF cycles and predictions for offline analytics.
+#
+# Each table is streamed from the database in EXPORT_BATCH_SIZE chunks (yield_per, a
+# server-side cursor on PostgreSQL), in watermark order, and every chunk is split by
+# partition and appended to that partition's file - so memory holds one chunk plus
+# the open writers, never a table. The output is Hive-style partitioned by month and
+# by the patient's clinic:
+#
+#   <out>/wellness_log/month=2025-01/clinic_id=3/part-<run>-0.parquet
+#
+# clinic_id is the patient's clinic at export time, not when the row was written.
+# Patients are assigned a clinic when their first cycle starts, so incremental
+# exports put a patient's earlier rows under clinic_id=__HIVE_DEFAULT_PARTITION__
+# and later ones under their clinic; to analyse one patient's history, select by
+# user_id/patient_id across all clinic partitions (or rewrite with --full, which
+# partitions every row by the current clinic).
+#
+# Exports are incremental: <out>/_watermarks.json records, per table, the latest
+# change time exported, and the next run only exports rows changed after it (up to
+# EXPORT_SETTLE_SECONDS ago, so rows of transactions still in flight aren't skipped).
+# Wellness logs are tracked by updated_at, so an edited log is exported again: readers
+# keep the row with the latest updated_at per id. IVF cycles and predictions are never
+# edited by the app and are tracked by their creation time.
+# Files are written under a .tmp name and renamed, and the watermarks saved, only when
+# the whole table has been exported, so a failed run leaves nothing behind. A full
+# export (or a table's first) is written to a hidden directory that then replaces
+# <out>/<table>, so it doesn't add a second copy of every row next to the old files.
+# Only one export writes to an output directory at a time, across processes: each
+# run holds an exclusive lock on <out>/.export.lock.
+#
+# Needs pyarrow (in requirements.txt); without it the export reports itself unavailable.
+#
+#   python data_export.py                        # incremental Parquet export to exports/
+#   python data_export.py --full --format arrow  # everything again, as Arrow IPC files
+#   python data_export.py --tables wellness_log --out /data/ivf
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import argparse
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import Integer, Float, Boolean, Date, DateTime, select, or_
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: exports are then only serialized within a process
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from database import db
+from models import User, WellnessLog, IVFCycle, Prediction
+
+EXPORT_DIR = os.environ.get("EXPORT_DIR", "exports")
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 5000))
+EXPORT_MAX_OPEN_FILES = int(os.environ.get("EXPORT_MAX_OPEN_FILES", 64))
+EXPORT_SETTLE_SECONDS = int(os.environ.get("EXPORT_SETTLE_SECONDS", 60))
+WATERMARK_FILE = "_watermarks.json"
+LOCK_FILE = ".export.lock"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"  # Hive's (and pyarrow's) name for a NULL partition value
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# watermark: change-time column for incremental exports; partition_date: column the month comes from
+ExportTable = namedtuple("ExportTable", "model patient_column watermark partition_date")
+EXPORT_TABLES = {
+    'wellness_log': ExportTable(WellnessLog, WellnessLog.user_id, WellnessLog.updated_at, WellnessLog.date),
+    'ivf_cycle': ExportTable(IVFCycle, IVFCycle.patient_id, IVFCycle.created_at, IVFCycle.start_date),
+    # A prediction's date is when it was made
+    'prediction': ExportTable(Prediction, Prediction.user_id, Prediction.prediction_date, Prediction.prediction_date),
+}
+
+
+class ExportUnavailable(RuntimeError):
+    pass
+
+
+class ExportInProgress(RuntimeError):
+    pass
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _schema(spec):
+    # month and clinic_id are not stored in the files: readers take them from the partition paths
+    return pa.schema([pa.field(c.key, _arrow_type(c.type)) for c in spec.model.__table__.columns])
+
+
+class PartitionWriters:
+    """
+    One open file per partition, at most max_open at a time (the least recently used
+    one is closed; later rows for it go to a new part file). Files get their final
+    names in commit(); abort() removes them.
+    """
+
+    def __init__(self, table_dir, schema, file_format, run_id, max_open=EXPORT_MAX_OPEN_FILES):
+        self.table_dir, self.schema, self.format, self.run_id = table_dir, schema, file_format, run_id
+        self.max_open = max_open
+        self._open = OrderedDict()  # partition -> (writer, sink)
+        self._parts = {}  # partition -> part files started
+        self.paths = []  # temporary paths written
+        self.rows = 0
+
+    def _new_writer(self, partition):
+        month, clinic_id = partition
+        directory = os.path.join(self.table_dir, f"month={month}", f"clinic_id={clinic_id}")
+        os.makedirs(directory, exist_ok=True)
+        part = self._parts.get(partition, 0)
+        self._parts[partition] = part + 1
+        path = os.path.join(directory, f"part-{self.run_id}-{part}{FORMATS[self.format]}.tmp")
+        self.paths.append(path)
+        if self.format == "parquet":
+            return pq.ParquetWriter(path, self.schema), None
+        sink = pa.OSFile(path, "wb")
+        return pa.ipc.new_file(sink, self.schema), sink
+
+    def write(self, partition, columns):
+        if partition in self._open:
+            self._open.move_to_end(partition)
+        else:
+            if len(self._open) >= self.max_open:
+                self._close(*self._open.popitem(last=False))
+            self._open[partition] = self._new_writer(partition)
+        writer, _ = self._open[partition]
+        writer.write_batch(pa.record_batch(columns, schema=self.schema))
+        self.rows += len(columns[0])
+
+    @staticmethod
+    def _close(partition, entry):
+        writer, sink = entry
+        writer.close()
+        if sink is not None:
+            sink.close()
+
+    def close_all(self):
+        while self._open:
+            self._close(*self._open.popitem(last=False))
+
+    def commit(self):
+        self.close_all()
+        for path in self.paths:
+            os.replace(path, path[:-len(".tmp")])
+
+    def abort(self):
+        try:
+            self.close_all()
+        finally:
+            for path in self.paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def load_watermarks(out_dir):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {table: datetime.fromisoformat(value) for table, value in json.load(f).items()}
+
+
+def save_watermarks(out_dir, watermarks):
+    path = os.path.join(out_dir, WATERMARK_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump({table: value.isoformat() for table, value in watermarks.items()}, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def acquire_export_lock(out_dir):
+    """
+    Takes the output directory's export lock and returns the open lock file; closing
+    it releases the lock. Raises ExportInProgress if another export holds it.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    lock_file = open(os.path.join(out_dir, LOCK_FILE), "w")
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise ExportInProgress(f"Another export is writing to {out_dir}")
+    return lock_file
+
+
+def _replace_table_dir(new_dir, table_dir):
+    """Puts a fully exported table in place of the previous export's files."""
+    old_dir = f"{new_dir}.old"
+    if os.path.exists(table_dir):
+        os.replace(table_dir, old_dir)
+    if os.path.isdir(new_dir):
+        os.replace(new_dir, table_dir)
+    else:
+        os.makedirs(table_dir)  # No rows
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def export_table(name, out_dir, since=None, until=None, file_format="parquet", batch_size=EXPORT_BATCH_SIZE):
+    """
+    Streams the rows of one table changed after `since` (everything if None, replacing
+    the table's earlier files) and up to `until` into partitioned files.
+    Returns (rows exported, new watermark or None).
+    """
+    spec = EXPORT_TABLES[name]
+    columns = list(spec.model.__table__.columns)
+    schema = _schema(spec)
+    keys = [c.key for c in columns]
+    watermark_index, date_index = keys.index(spec.watermark.key), keys.index(spec.partition_date.key)
+
+    query = select(*columns, User.clinic_id).join(User, User.id == spec.patient_column)
+    if since is not None:
+        query = query.where(spec.watermark > since)
+    if until is not None:
+        # Rows from before the watermark column existed (NULL) only go out in full exports
+        query = query.where(spec.watermark <= until if since is not None else
+                            or_(spec.watermark <= until, spec.watermark.is_(None)))
+    query = query.order_by(spec.watermark, spec.model.id).execution_options(yield_per=batch_size)
+
+    run_id = uuid.uuid4().hex[:12]
+    table_dir = os.path.join(out_dir, name)
+    # Dot-prefixed, so dataset readers skip it until it is renamed into place
+    target_dir = table_dir if since is not None else os.path.join(out_dir, f".{name}-{run_id}")
+    writers = PartitionWriters(target_dir, schema, file_format, run_id)
+    watermark = None
+    try:
+        for batch in db.session.execute(query).partitions():
+            by_partition = {}
+            for row in batch:
+                day = row[date_index]
+                month = day.strftime("%Y-%m") if day is not None else NULL_PARTITION
+                clinic_id = row[-1] if row[-1] is not None else NULL_PARTITION
+                by_partition.setdefault((month, clinic_id), []).append(row[:-1])
+                if row[watermark_index] is not None:
+                    watermark = row[watermark_index] if watermark is None else max(watermark, row[watermark_index])
+            for partition, rows in by_partition.items():
+                writers.write(partition, [list(values) for values in zip(*rows)])
+            del batch, by_partition
+        writers.commit()
+        if since is None:
+            _replace_table_dir(target_dir, table_dir)
+    except BaseException:
+        writers.abort()
+        if since is None:
+            shutil.rmtree(target_dir, ignore_errors=True)
+        raise
+    finally:
+        db.session.rollback()  # Ends the long read transaction
+    return writers.rows, watermark
+
+
+def run_export(out_dir=EXPORT_DIR, tables=None, full=False, file_format="parquet"):
+    """
+    Exports each table (incrementally unless full) and saves the new watermarks. Returns {table: rows}.
+    Raises ExportInProgress if another export is writing to out_dir.
+    """
+    if pa is None:
+        raise ExportUnavailable("Data export needs the pyarrow package (pip install pyarrow)")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r} (choose from {', '.join(FORMATS)})")
+    with acquire_export_lock(out_dir):
+        return _export(out_dir, tables, full, file_format)
+
+
+def _export(out_dir, tables, full, file_format):
+    watermarks = {} if full else load_watermarks(out_dir)
+    # Naive UTC, like the stored timestamps
+    until = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+
+    exported = {}
+    for name in tables or EXPORT_TABLES:
+        start = time.perf_counter()
+        rows, watermark = export_table(name, out_dir, since=watermarks.get(name), until=until, file_format=file_format)
+        if watermark is not None:
+            watermarks[name] = watermark
+            save_watermarks(out_dir, watermarks)
+        exported[name] = rows
+        logging.info(f"Exported {rows} {name} rows in {time.perf_counter() - start:.1f}s")
+    return exported
+
+
+# --- Background exports for the admin endpoint ---
+
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="data-export")
+_export_lock = threading.Lock()
+_export_status = {'state': 'idle'}
+
+
+def _run_in_background(app, lock_file, out_dir, tables, full, file_format):
+    with app.app_context():
+        try:
+            exported = _export(out_dir, tables, full, file_format)
+            status = {'state': 'done', 'rows': exported}
+        except Exception as e:
+            logging.error(f"Data export failed: {e}")
+            status = {'state': 'failed', 'error': str(e)}
+        finally:
+            lock_file.close()
+            db.session.remove()
+    with _export_lock:
+        _export_status.update(status, finished_at=datetime.now(timezone.utc).isoformat())
+
+
+def start_export(app, out_dir=EXPORT_DIR, tables=None, full=False, file_format="parquet"):
+    """
+    Queues an export like run_export on a background thread. Returns False if one is
+    already running, in this process or any other writing to out_dir.
+    """
+    if pa is None:
+        raise ExportUnavailable("Data export needs the pyarrow package (pip install pyarrow)")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r} (choose from {', '.join(FORMATS)})")
+    with _export_lock:
+        if _export_status['state'] == 'running':
+            return False
+        try:
+            # Taken here, so a second request is refused right away; the export releases it
+            lock_file = acquire_export_lock(out_dir)
+        except ExportInProgress:
+            return False
+        _export_status.clear()
+        _export_status.update(state='running', started_at=datetime.now(timezone.utc).isoformat())
+    _export_executor.submit(_run_in_background, app, lock_file, out_dir, tables, full, file_format)
+    return True
+
+
+def export_status():
+    with _export_lock:
+        return dict(_export_status)
+
+
+if __name__ == "__main__":
+    from migrations import create_app
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(message)s')
+    parser = argparse.ArgumentParser(description="Export wellness logs, IVF cycles and predictions as partitioned columnar files.")
+    parser.add_argument("--out", default=EXPORT_DIR, help="output directory")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), help="tables to export (default: all)")
+    parser.add_argument("--format", choices=list(FORMATS), default="parquet", help="file format")
+    parser.add_argument("--full", action="store_true", help="export every row, ignoring the saved watermarks")
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        try:
+            print(run_export(args.out, args.tables, args.full, args.format))
+        except (ExportUnavailable, ExportInProgress) as e:
+            raise SystemExit(str(e))
@@ -1,7 +1,130 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import QueuePool
+
+from read_replicas import RoutingSession
 
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
\ No newline at end of file
+# RoutingSession sends the reads of @replica_reads routes to read replicas, if configured
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
+
+# SQLite: WAL lets readers run alongside the (single) writer, and writers wait up to
+# the busy timeout for the lock instead of failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHED_STATEMENTS = int(os.environ.get("SQLITE_CACHED_STATEMENTS", 256))  # Prepared statements kept per connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",  # Safe with WAL: a power loss can only drop the last transactions
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
+
+# Server databases (PostgreSQL): connections per process
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # Replace connections older than this (seconds)
+SLOW_CHECKOUT_MS = float(os.environ.get("DB_SLOW_CHECKOUT_MS", 100))
+
+def database_url():
+    """DATABASE_URL, or for development the SQLite file ivf_tracker.db (in the app's instance folder)."""
+    url = os.environ.get("DATABASE_URL", "").strip()
+    return url or "sqlite:///ivf_tracker.db"
+
+
+class PoolStats:
+    """How long requests wait to check a connection out of the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.slow_checkouts = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.slow_checkouts += seconds * 1000 >= SLOW_CHECKOUT_MS
+
+    def stats(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "slow_checkouts": self.slow_checkouts,
+                "slow_checkout_ms": SLOW_CHECKOUT_MS,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records each checkout's wait (including opening a new connection) in pool_stats."""
+
+    def connect(self):
+        start = time.perf_counter()
+        connection = super().connect()
+        pool_stats.record(time.perf_counter() - start)
+        return connection
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URL."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        if not url.database or url.database == ":memory:":
+            return {}  # Flask-SQLAlchemy sets up in-memory databases itself
+        return {
+            "poolclass": TimedQueuePool,
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "connect_args": {
+                "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+                "cached_statements": SQLITE_CACHED_STATEMENTS,
+            },
+        }
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,  # Replace connections the server (or a proxy) closed while idle
+        "pool_use_lifo": True,  # Reuse warm connections so idle extras can time out server-side
+    }
+
+
+@event.listens_for(Engine, "connect")
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    except sqlite3.DatabaseError as e:
+        # e.g. WAL on a read-only or network file system; the database still works without it
+        logging.warning(f"Could not apply SQLite pragmas: {e}")
+    finally:
+        cursor.close()
@@ -0,0 +1,173 @@
+# document_extraction.py
+import os
+import atexit
+import hashlib
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pytesseract
+from pdfminer.high_level import extract_text as pdf_extract_text
+from pdfminer.pdfpage import PDFPage
+from PIL import Image
+
+# Bump whenever extraction output changes, so cached text gets re-extracted
+EXTRACTOR_VERSION = "3"
+WORD_MIME_TYPES = ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']
+PAGE_SEPARATOR = '\x0c' # Form feed, as pdfminer puts between pages
+OCR_DPI = 300
+# Pages are processed in parallel across this many processes per page pool. Unset, the
+# cores are shared between the pools of all extraction workers (see page_pool_size)
+OCR_PROCESSES = int(os.environ.get("OCR_PROCESSES", 0))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# complete is False when text is a placeholder message or misses pages that couldn't be
+# read (e.g. a scanned page without the OCR dependencies); such results aren't cached
+Extraction = namedtuple("Extraction", "text complete")
+
+_page_pool = None
+_page_pool_size = None
+_page_pool_lock = threading.Lock()
+
+
+def page_pool_size(pools=1):
+    """Processes per page pool when `pools` processes each run one: OCR_PROCESSES, or a share of the cores."""
+    return OCR_PROCESSES or max(1, (os.cpu_count() or 1) // pools)
+
+
+def set_page_pool_size(processes):
+    """Sizes the page pool this process creates on first use (call before extracting)."""
+    global _page_pool_size
+    with _page_pool_lock:
+        _page_pool_size = processes
+
+
+def get_page_pool():
+    """Shared process pool for per-page extraction, created on first use."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # 'spawn' so workers never inherit DB connections or threads from the caller
+            _page_pool = ProcessPoolExecutor(max_workers=_page_pool_size or page_pool_size(),
+                                             mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_page_pool.shutdown, wait=False, cancel_futures=True)
+        return _page_pool
+
+
+def shutdown_page_pool():
+    """Stops the page pool's processes (atexit doesn't run in multiprocessing children)."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False, cancel_futures=True)
+            _page_pool = None
+
+
+def file_sha256(file_path):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- Per-page work (runs in the pool's worker processes) ---
+
+def _ocr_pdf_page(file_path, page_index):
+    """Renders one PDF page and OCRs it, or returns None without the optional pdf2image package (and poppler)."""
+    try:
+        from pdf2image import convert_from_path
+    except ImportError:
+        return None
+    images = convert_from_path(file_path, dpi=OCR_DPI, first_page=page_index + 1, last_page=page_index + 1)
+    return pytesseract.image_to_string(images[0]) + PAGE_SEPARATOR if images else ""
+
+
+def _pdf_page_text(file_path, page_index):
+    """
+    Text of one PDF page: the embedded text layer if it has one, otherwise OCR of the
+    rendered page. None if the page has no text layer and can't be OCR'd.
+    """
+    text = pdf_extract_text(file_path, page_numbers=[page_index])
+    if text.strip():
+        return text
+    ocr_text = _ocr_pdf_page(file_path, page_index)
+    if ocr_text is None:
+        return None
+    return ocr_text or text
+
+
+def _image_frame_text(file_path, frame_index):
+    """OCR of one frame of a (possibly multi-page) image such as a TIFF scan."""
+    with Image.open(file_path) as image:
+        image.seek(frame_index)
+        return pytesseract.image_to_string(image)
+
+
+# --- Page splitting and reassembly ---
+
+def count_pdf_pages(file_path):
+    with open(file_path, 'rb') as f:
+        return sum(1 for _ in PDFPage.get_pages(f))
+
+
+def count_image_frames(file_path):
+    with Image.open(file_path) as image:
+        return getattr(image, 'n_frames', 1)
+
+
+def _map_pages(page_fn, file_path, page_count, executor=None):
+    """Runs page_fn over every page, in parallel when there is more than one, and returns results in page order."""
+    # Daemon processes can't start a pool of their own, so they work through the pages serially
+    if page_count <= 1 or (executor is None and multiprocessing.current_process().daemon):
+        return [page_fn(file_path, i) for i in range(page_count)]
+    executor = executor or get_page_pool()
+    return list(executor.map(page_fn, [file_path] * page_count, range(page_count)))
+
+
+def extract_pdf_text(file_path, executor=None):
+    """Extracts a PDF page by page across the process pool; OCR only runs for pages without a text layer."""
+    pages = _map_pages(_pdf_page_text, file_path, count_pdf_pages(file_path), executor)
+    return Extraction(''.join(page or '' for page in pages), all(page is not None for page in pages))
+
+
+def extract_image_text(file_path, executor=None):
+    """OCRs every frame of an image (multi-page TIFFs) across the process pool."""
+    pages = _map_pages(_image_frame_text, file_path, count_image_frames(file_path), executor)
+    return Extraction(PAGE_SEPARATOR.join(pages), True)
+
+
+def extract_text_from_file(file_path, file_type, executor=None):
+    """
+    Extract text from an uploaded document based on its MIME type. Returns an Extraction.
+    PDFs go through pdfminer, images through Tesseract OCR, one page per process.
+    Raises on PDF/image processing errors; Word and plain-text problems
+    are reported in the returned text, as before, with complete=False.
+    """
+    file_type = file_type or ''
+    if file_type == 'application/pdf':
+        # Extract text from PDF
+        return extract_pdf_text(file_path, executor)
+    elif file_type.startswith('image/'):
+        # Extract text from image using OCR
+        return extract_image_text(file_path, executor)
+    elif file_type in WORD_MIME_TYPES:
+        # Handle DOC and DOCX files
+        try:
+            from docx import Document
+            doc = Document(file_path)
+            return Extraction('\n'.join([paragraph.text for paragraph in doc.paragraphs]), True)
+        except ImportError:
+            return Extraction("DOCX processing not available. Please install python-docx library.", False)
+        except Exception as e:
+            return Extraction(f"Error processing Word document: {str(e)}", False)
+    else:
+        # For other files, try to read as text
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return Extraction(f.read(), True)
+        except UnicodeDecodeError:
+            return Extraction("This file appears to be binary and cannot be analyzed as text.", False)
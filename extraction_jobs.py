@@ -0,0 +1,248 @@
+# extraction_jobs.py
+# Background OCR/PDF extraction queue.
+#
+# The web app only enqueues jobs (on upload and on /analyze_document) and polls their
+# status; the extraction itself runs in separate worker processes:
+#
+#   python extraction_jobs.py --workers 4
+#
+# Each worker handles one job at a time, so the number of worker processes
+# (--workers or EXTRACTION_WORKERS) bounds the number of concurrent extractions.
+# Each worker splits a document's pages over its own page pool; the pools share the
+# cores between them (OCR_PROCESSES sets a fixed size per pool instead).
+import os
+import time
+import signal
+import socket
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+
+from database import db
+from sqlalchemy.exc import IntegrityError
+
+from models import ExtractionJob, MedicalDocument, ExtractionCache
+from document_extraction import (extract_text_from_file, page_pool_size, set_page_pool_size, shutdown_page_pool,
+                                 EXTRACTOR_VERSION)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+ACTIVE_STATUSES = (JOB_QUEUED, JOB_RUNNING)
+
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", 2))
+POLL_INTERVAL = float(os.environ.get("EXTRACTION_POLL_INTERVAL", 1.0))
+MAX_ATTEMPTS = 3
+# A running job older than this is assumed to belong to a crashed worker
+STALE_JOB_AFTER = timedelta(minutes=int(os.environ.get("EXTRACTION_JOB_TIMEOUT_MINUTES", 15)))
+
+
+# --- Content-addressed extraction cache ---
+
+def cached_extraction(content_hash):
+    """Text previously extracted from a file with this content by the current extractor, or None."""
+    if not content_hash:
+        return None
+    entry = ExtractionCache.query.filter_by(content_hash=content_hash, extractor_version=EXTRACTOR_VERSION).first()
+    return entry.extracted_text if entry else None
+
+
+def store_extraction(content_hash, extracted_text):
+    """Adds extracted text to the cache; call before committing the document update."""
+    if not content_hash or cached_extraction(content_hash) is not None:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(ExtractionCache(content_hash=content_hash, extractor_version=EXTRACTOR_VERSION, extracted_text=extracted_text))
+    except IntegrityError:
+        pass  # Another worker cached the same content first
+
+
+def has_current_text(document):
+    """True if extracted_text was produced by the current extractor version."""
+    return document.extracted_text is not None and document.extractor_version == EXTRACTOR_VERSION
+
+
+def apply_cached_extraction(document):
+    """Fills the document from the cache if this content was extracted before. Returns True on a hit."""
+    text = cached_extraction(document.content_hash)
+    if text is None:
+        return False
+    document.extracted_text = text
+    document.extractor_version = EXTRACTOR_VERSION
+    db.session.commit()
+    return True
+
+
+# --- Queue API used by the web app ---
+
+def active_job(document_id):
+    """Returns the queued or running job for a document, if any."""
+    return ExtractionJob.query.filter(
+        ExtractionJob.document_id == document_id,
+        ExtractionJob.status.in_(ACTIVE_STATUSES)
+    ).order_by(ExtractionJob.id.desc()).first()
+
+
+def latest_job(document_id):
+    return ExtractionJob.query.filter_by(document_id=document_id).order_by(ExtractionJob.id.desc()).first()
+
+
+def enqueue_extraction(document):
+    """Queues text extraction for a document unless a job is already pending. Returns the job."""
+    job = active_job(document.id)
+    if job:
+        return job
+    job = ExtractionJob(document_id=document.id, status=JOB_QUEUED)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def extraction_status(document):
+    """Status payload for the polling endpoint."""
+    job = latest_job(document.id)
+    if (job is None and has_current_text(document)) or (job is not None and job.status == JOB_DONE):
+        # complete is False for an incomplete extraction, which is retried on the next analysis
+        return {"status": JOB_DONE, "extracted_text": document.extracted_text or "",
+                "complete": has_current_text(document)}
+    if job is None:
+        return {"status": "not_started"}
+    payload = {"status": job.status, "attempts": job.attempts}
+    if job.status == JOB_FAILED:
+        payload["error"] = job.error
+    return payload
+
+
+# --- Worker side ---
+
+def claim_next_job(worker_name):
+    """
+    Atomically moves the oldest queued job to 'running' for this worker.
+    The conditional UPDATE makes sure two workers can never claim the same job.
+    """
+    while True:
+        candidate = db.session.query(ExtractionJob.id).filter_by(status=JOB_QUEUED).order_by(ExtractionJob.id).first()
+        if candidate is None:
+            return None
+        claimed = ExtractionJob.query.filter_by(id=candidate.id, status=JOB_QUEUED).update({
+            "status": JOB_RUNNING,
+            "worker": worker_name,
+            "started_at": datetime.now(timezone.utc),
+            "attempts": ExtractionJob.attempts + 1
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(ExtractionJob, candidate.id)
+        # Lost the race to another worker; try the next job
+
+
+def requeue_stale_jobs():
+    """Gives jobs abandoned by a crashed worker another try (or fails them after MAX_ATTEMPTS)."""
+    cutoff = datetime.now(timezone.utc) - STALE_JOB_AFTER
+    stale = ExtractionJob.query.filter(ExtractionJob.status == JOB_RUNNING, ExtractionJob.started_at < cutoff).all()
+    for job in stale:
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = JOB_FAILED
+            job.error = "Extraction timed out."
+            job.finished_at = datetime.now(timezone.utc)
+        else:
+            job.status = JOB_QUEUED
+    if stale:
+        db.session.commit()
+
+
+def run_job(job, upload_dir):
+    """Extracts text for the job's document and stores it on MedicalDocument.extracted_text."""
+    document = db.session.get(MedicalDocument, job.document_id)
+    try:
+        if document is None:
+            raise FileNotFoundError("Document no longer exists.")
+        file_path = os.path.join(upload_dir, document.filename)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError("Document file not found.")
+
+        text, complete = cached_extraction(document.content_hash), True
+        if text is None:
+            text, complete = extract_text_from_file(file_path, document.file_type)
+            if complete:
+                store_extraction(document.content_hash, text)
+        # Placeholder messages and partial text are shown, but neither cached nor stamped with
+        # the extractor version: has_current_text() stays False and the next analysis retries
+        document.extracted_text = text
+        document.extractor_version = EXTRACTOR_VERSION if complete else None
+        job.status = JOB_DONE
+        job.error = None
+    except Exception as e:
+        logging.error(f"Extraction job {job.id} failed: {e}")
+        job.status = JOB_QUEUED if job.attempts < MAX_ATTEMPTS and not isinstance(e, FileNotFoundError) else JOB_FAILED
+        job.error = str(e)
+    job.finished_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+
+def worker_loop(worker_name, poll_interval=POLL_INTERVAL, ocr_processes=None):
+    from main import app  # Imported here so each worker process builds its own app and DB engine
+
+    set_page_pool_size(ocr_processes)
+    # terminate() sends SIGTERM: stop like on Ctrl-C, so the worker's page pool is shut down too
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    logging.info(f"Extraction worker {worker_name} started")
+    try:
+        with app.app_context():
+            upload_dir = app.config['UPLOAD_FOLDER']
+            while True:
+                requeue_stale_jobs()
+                job = claim_next_job(worker_name)
+                if job is None:
+                    db.session.remove()
+                    time.sleep(poll_interval)
+                    continue
+                run_job(job, upload_dir)
+    except KeyboardInterrupt:
+        logging.info(f"Extraction worker {worker_name} stopping")
+    finally:
+        shutdown_page_pool()
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_workers(num_workers=EXTRACTION_WORKERS, poll_interval=POLL_INTERVAL):
+    """Starts num_workers extraction processes and waits for them; SIGTERM/Ctrl-C stops them all."""
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    # 'spawn' so no DB connections are inherited from the parent process
+    ctx = multiprocessing.get_context("spawn")
+    host = socket.gethostname()
+    # Not daemon processes: those can't start the page pool that splits multi-page documents.
+    # So they are always stopped (terminated and joined) here instead of dying with us
+    ocr_processes = page_pool_size(num_workers)
+    processes = [
+        ctx.Process(target=worker_loop, args=(f"{host}-{i}", poll_interval, ocr_processes))
+        for i in range(num_workers)
+    ]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        logging.info("Stopping extraction workers...")
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+        for p in processes:
+            p.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background document extraction workers.")
+    parser.add_argument("--workers", type=int, default=EXTRACTION_WORKERS, help="number of worker processes")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="seconds between queue polls when idle")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(message)s')
+    run_workers(args.workers, args.poll_interval)
@@ -0,0 +1,47 @@
+# fake_openai_server.py
+# Minimal stand-in for the OpenAI chat completions API, for local latency testing.
+#
+#   python fake_openai_server.py            # listens on 127.0.0.1:5055
+#   OPENAI_API_KEY=test OPENAI_BASE_URL=http://127.0.0.1:5055/v1 gunicorn main:app
+#
+# FAKE_OPENAI_DELAY sets the simulated round-trip time in seconds.
+import os
+import json
+import time
+from flask import Flask, request, jsonify
+
+from openai_service import fallback_nutrition_plan, fallback_yoga_routine, fallback_nutrition_analysis
+
+app = Flask(__name__)
+DELAY = float(os.environ.get("FAKE_OPENAI_DELAY", 1.0))
+
+def _fake_content(messages):
+    """Returns content shaped like what the real prompt would produce."""
+    system = messages[0]["content"].lower() if messages else ""
+    if "nutrition specialist" in system:
+        return json.dumps(fallback_nutrition_plan())
+    if "yoga specialist" in system:
+        return json.dumps(fallback_yoga_routine())
+    if "nutrition analysis" in system:
+        return json.dumps(fallback_nutrition_analysis())
+    return "Take a few minutes today for slow, deep breathing - it helps lower stress."
+
+@app.route("/v1/chat/completions", methods=["POST"])
+def chat_completions():
+    body = request.get_json()
+    time.sleep(DELAY)
+    return jsonify({
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": _fake_content(body.get("messages", []))},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    })
+
+if __name__ == "__main__":
+    app.run(host="127.0.0.1", port=int(os.environ.get("FAKE_OPENAI_PORT", 5055)), threaded=True)
@@ -0,0 +1,207 @@
+# geocoding.py
+# Deterministic geocoding of clinic locations against a local gazetteer.
+#
+# The bundled india_gazetteer.csv (name, state, latitude, longitude and optionally
+# the head post office's pincode) is loaded into the indexed gazetteer_place table.
+# A (city, state) pair is resolved by PIN code found in the address, exact name, known
+# alternate name (Bangalore/Bengaluru, ...) or fuzzy name match; failing those, by the
+# PIN's sorting district (its first 3 digits, e.g. 400xxx -> Mumbai) and finally by
+# the centroid of the state's places, so a clinic is placed approximately rather than
+# not at all. Every result - misses included - is kept in geocode_cache, so the same
+# place always gets the same coordinates.
+#
+#   python geocoding.py --reload-gazetteer   # (re)load the CSV and clear the cache
+#   python geocoding.py --backfill           # re-geocode every clinic already in the database
+import os
+import re
+import csv
+import time
+import difflib
+import hashlib
+import argparse
+from collections import namedtuple, defaultdict
+
+from sqlalchemy import insert, update
+
+from database import db
+from models import GazetteerPlace, GeocodeCache, Clinic
+from clinic_suggest import normalize, CITY_NAME_GROUPS
+
+GAZETTEER_FILE = os.environ.get("GAZETTEER_FILE", "india_gazetteer.csv")
+FUZZY_CUTOFF = 0.85  # Minimum difflib similarity for a fuzzy city-name match
+# Clinics in the same locality are spread (deterministically) within this many degrees,
+# about 500m, so their map markers don't sit exactly on top of each other
+MARKER_SPREAD_DEGREES = 0.005
+PINCODE_RE = re.compile(r"\b(\d{3})\s?(\d{3})\b")
+
+GeocodeResult = namedtuple("GeocodeResult", "latitude longitude matched_name method score")
+NO_MATCH = GeocodeResult(None, None, None, "none", 0.0)
+
+
+def load_gazetteer(path=GAZETTEER_FILE, replace=False):
+    """Loads the gazetteer CSV into gazetteer_place unless it is already loaded. Returns the number of places loaded."""
+    if not replace and db.session.query(GazetteerPlace.id).first():
+        return 0
+    with open(path, encoding="utf-8", newline="") as f:
+        places = [{
+            "name": row["name"].strip(),
+            "normalized_name": normalize(row["name"]),
+            "state": (row.get("state") or "").strip() or None,
+            "pincode": (row.get("pincode") or "").strip() or None,
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+        } for row in csv.DictReader(f)]
+
+    GazetteerPlace.query.delete()
+    GeocodeCache.query.delete()  # Cached results may refer to the old gazetteer
+    if places:
+        db.session.execute(insert(GazetteerPlace), places)
+    db.session.commit()
+    return len(places)
+
+
+def marker_position(latitude, longitude, seed):
+    """Offsets a locality's coordinates by a small, stable amount derived from `seed` (e.g. the clinic name)."""
+    digest = hashlib.sha256(seed.encode("utf-8")).digest()
+    dx = int.from_bytes(digest[:4], "big") / 0xFFFFFFFF * 2 - 1
+    dy = int.from_bytes(digest[4:8], "big") / 0xFFFFFFFF * 2 - 1
+    return latitude + dy * MARKER_SPREAD_DEGREES, longitude + dx * MARKER_SPREAD_DEGREES
+
+
+class Geocoder:
+    """
+    Resolves places against the gazetteer table, loaded into memory once per instance.
+    New results are added to the session as GeocodeCache rows; the caller commits them.
+    """
+
+    def __init__(self):
+        self._by_name = defaultdict(list)
+        self._by_pincode = {}
+        self._by_pin_area = {}  # First 3 PIN digits -> the place with the lowest PIN there
+        self._names_by_state = defaultdict(list)
+        state_coordinates = defaultdict(list)
+        for place in GazetteerPlace.query.order_by(GazetteerPlace.pincode, GazetteerPlace.id).all():
+            self._by_name[place.normalized_name].append(place)
+            if place.pincode:
+                self._by_pincode[place.pincode] = place
+                self._by_pin_area.setdefault(place.pincode[:3], place)
+            self._names_by_state[normalize(place.state)].append(place.normalized_name)
+            state_coordinates[normalize(place.state)].append((place.latitude, place.longitude))
+        self._all_names = list(self._by_name)
+        self._state_centroids = {
+            state: (sum(lat for lat, _ in points) / len(points), sum(lng for _, lng in points) / len(points))
+            for state, points in state_coordinates.items() if state
+        }
+        self._results = {}
+
+    def geocode(self, city, state=None, address=None):
+        city_norm, state_norm = normalize(city), normalize(state)
+        pin = PINCODE_RE.search(address or "")
+        pincode = "".join(pin.groups()) if pin and self._by_pincode else ""
+        key = f"{city_norm}|{state_norm}|{pincode}" if pincode else f"{city_norm}|{state_norm}"
+
+        result = self._results.get(key)
+        if result is None:
+            cached = GeocodeCache.query.filter_by(query_key=key).first()
+            if cached:
+                result = GeocodeResult(cached.latitude, cached.longitude, cached.matched_name, cached.method, cached.score)
+            else:
+                result = self._resolve(city_norm, state_norm, pincode)
+                db.session.add(GeocodeCache(query_key=key, **result._asdict()))
+            self._results[key] = result
+        return result
+
+    def _pick(self, places, state_norm):
+        """Prefers the place in the given state when a name exists in several."""
+        for place in places:
+            if state_norm and normalize(place.state) == state_norm:
+                return place
+        return places[0]
+
+    def _resolve(self, city_norm, state_norm, pincode):
+        if pincode in self._by_pincode:
+            place = self._by_pincode[pincode]
+            return GeocodeResult(place.latitude, place.longitude, place.name, "pincode", 1.0)
+        return self._resolve_city(city_norm, state_norm) or self._resolve_area(state_norm, pincode)
+
+    def _resolve_area(self, state_norm, pincode):
+        """Approximate position when the city is unknown: the PIN's sorting district, else the state's centroid."""
+        place = self._by_pin_area.get(pincode[:3]) if pincode else None
+        if place is not None:
+            return GeocodeResult(place.latitude, place.longitude, place.name, "pincode_area", 0.5)
+        if state_norm in self._state_centroids:
+            latitude, longitude = self._state_centroids[state_norm]
+            return GeocodeResult(round(latitude, 4), round(longitude, 4), None, "state", 0.1)
+        return NO_MATCH
+
+    def _resolve_city(self, city_norm, state_norm):
+        if not city_norm:
+            return None
+
+        if city_norm in self._by_name:
+            place = self._pick(self._by_name[city_norm], state_norm)
+            return GeocodeResult(place.latitude, place.longitude, place.name, "exact", 1.0)
+
+        for alias in sorted(CITY_NAME_GROUPS.get(city_norm, ())):
+            if alias in self._by_name:
+                place = self._pick(self._by_name[alias], state_norm)
+                return GeocodeResult(place.latitude, place.longitude, place.name, "alias", 1.0)
+
+        # Misspellings: search the state's localities if we know the state, otherwise all of them
+        pool = self._names_by_state.get(state_norm) or self._all_names
+        match = difflib.get_close_matches(city_norm, pool, n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            place = self._pick(self._by_name[match[0]], state_norm)
+            score = difflib.SequenceMatcher(None, city_norm, match[0]).ratio()
+            return GeocodeResult(place.latitude, place.longitude, place.name, "fuzzy", round(score, 3))
+        return None
+
+    def clinic_position(self, name, city, state=None, address=None):
+        """(latitude, longitude) for a clinic's map marker, or (None, None) if neither its city nor state is known."""
+        result = self.geocode(city, state, address)
+        if result.latitude is None:
+            return None, None
+        return marker_position(result.latitude, result.longitude, f"{name}|{address or ''}")
+
+
+def backfill_clinic_coordinates(chunk_size=5000):
+    """Re-geocodes every clinic (e.g. to replace old randomly jittered coordinates). Returns (updated, unresolved)."""
+    load_gazetteer()
+    geocoder = Geocoder()
+    updated = unresolved = 0
+    last_id = 0
+    while True:
+        clinics = db.session.query(Clinic.id, Clinic.name, Clinic.city, Clinic.state, Clinic.address).filter(
+            Clinic.id > last_id
+        ).order_by(Clinic.id).limit(chunk_size).all()
+        if not clinics:
+            break
+        last_id = clinics[-1].id
+        changes = []
+        for clinic in clinics:
+            lat, lng = geocoder.clinic_position(clinic.name, clinic.city, clinic.state, clinic.address)
+            unresolved += lat is None
+            changes.append({"id": clinic.id, "latitude": lat, "longitude": lng})
+        db.session.execute(update(Clinic), changes)
+        db.session.commit()
+        updated += len(changes)
+    return updated, unresolved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gazetteer-based clinic geocoding.")
+    parser.add_argument("--reload-gazetteer", action="store_true", help="reload the gazetteer CSV and clear the geocode cache")
+    parser.add_argument("--gazetteer", default=GAZETTEER_FILE, help="gazetteer CSV path")
+    parser.add_argument("--backfill", action="store_true", help="re-geocode all existing clinics")
+    args = parser.parse_args()
+
+    from main import app
+
+    with app.app_context():
+        loaded = load_gazetteer(args.gazetteer, replace=args.reload_gazetteer)
+        if loaded:
+            print(f"Loaded {loaded} gazetteer places from {args.gazetteer}")
+        if args.backfill:
+            start = time.perf_counter()
+            updated, unresolved = backfill_clinic_coordinates()
+            print(f"Re-geocoded {updated} clinics in {time.perf_counter() - start:.2f}s ({unresolved} not located)")
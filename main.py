@@ -1,19 +1,22 @@
 # main.py
 import os
 import json
+import math
+import uuid
 import logging
 import numpy as np
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
 from collections import defaultdict
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
 from werkzeug.middleware.proxy_fix import ProxyFix
 from functools import wraps
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import joinedload
+from sqlalchemy.pool import QueuePool
 import joblib
-from database import db
-import pytesseract
-from pdfminer.high_level import extract_text as pdf_extract_text
-from PIL import Image
+from database import db, database_url, engine_options, pool_stats
+from read_replicas import replica_reads, replica_binds, replica_urls, replica_router
+from model_registry import ivf_registry, all_stats as model_registry_stats
 
 # Configure logging to see important startup messages
 logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(message)s')
@@ -24,16 +27,21 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
-# Configure the database
-database_url = os.environ.get("DATABASE_URL")
-if not database_url or database_url.strip() == "":
-    # Use SQLite file named ivf_tracker.db in the project folder
-    database_url = "sqlite:///ivf_tracker.db"
-    
-app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+# Configure the database (DATABASE_URL, or a SQLite file named ivf_tracker.db)
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url()
+# Connection pooling, and WAL/busy-timeout pragmas for SQLite (see database.py)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(database_url())
+# Read replicas (DATABASE_REPLICA_URLS) for the reads of @replica_reads routes
+app.config["SQLALCHEMY_BINDS"] = replica_binds(replica_urls(), engine_options)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["UPLOAD_FOLDER"] = "uploads"
-app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
+# Uploads are streamed to disk, so the limit can be large without growing memory use
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_MB", 500)) * 1024 * 1024
+UPLOAD_SESSION_TTL = timedelta(hours=int(os.environ.get("UPLOAD_SESSION_TTL_HOURS", 24)))  # Idle time before a resumable upload is dropped
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+MAX_BATCH_PREDICTIONS = 1000  # Upper bound on users per /api/predict_ivf_ml/batch call
+MAX_NEAREST_CLINICS = 100  # Upper bound on results per /api/clinics/near call
+MAX_CLINIC_SUGGESTIONS = 20  # Upper bound on results per /api/clinics/suggest call
 
 # Initialize the app with the extension
 db.init_app(app)
@@ -43,15 +51,56 @@ os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 os.makedirs("models", exist_ok=True)
 
 # --- Import Models ---
-from models import User, PatientData, IVFCycle, WellnessLog, MedicationReminder, ChatMessage, MedicalDocument, Prediction, CycleNote, Clinic, MedicalActivity
+from models import User, PatientData, IVFCycle, WellnessLog, ChatMessage, MedicalDocument, Prediction, CycleNote, Clinic, MedicalActivity, UploadSession
 
 # --- Import AI and Prediction Services ---
 from openai_service import (
     get_chatbot_response,
-    generate_medical_image,
-    get_nutrition_plan,
-    get_yoga_routine,
-    get_nutrition_analysis
+    generate_medical_image
+)
+from document_extraction import file_sha256
+from upload_streaming import (
+    stream_to_file,
+    partial_path,
+    upload_lock,
+    append_chunk,
+    finish_hash,
+    drop_running_hash,
+    forget_upload,
+    discard_partial,
+    stale_partials,
+    UploadTooLarge,
+    CLIENT_CHUNK_SIZE
+)
+from extraction_jobs import (
+    enqueue_extraction,
+    active_job,
+    latest_job,
+    extraction_status,
+    has_current_text,
+    apply_cached_extraction,
+    JOB_DONE,
+    JOB_FAILED
+)
+from clinic_geo import clinic_geo_index
+from clinic_search import search_clinics
+from admin_stats import admin_stats, clinic_count, user_type_counts, STATS_TTL_SECONDS
+from data_export import start_export, export_status, ExportUnavailable, EXPORT_TABLES, FORMATS as EXPORT_FORMATS
+from wellness_analytics import parse_request as parse_analytics_request, wellness_analytics, invalidate_wellness_analytics, InvalidAnalyticsRequest
+from migrations import upgrade as upgrade_schema, pending_migrations
+from clinic_suggest import clinic_suggest_index
+from pagination import keyset_page, page_size, InvalidCursor, MAX_PAGE_SIZE
+from dashboard_service import (
+    doctor_patient_page,
+    doctor_dashboard_overview,
+    doctor_patient_options,
+    load_patient_dashboard,
+    patient_dashboard_data,
+    doctor_patient_filter
+)
+from ai_cache import (
+    get_daily_tip,
+    get_nutrition_page_ai
 )
 from prediction_service import (
     calculate_ivf_success_prediction,
@@ -61,7 +110,8 @@ from prediction_service import (
 
 # --- Load ML Models ---
 try:
-    ivf_model = joblib.load("models/ivf_success_model.pkl")
+    # The IVF model lives in the shared registry so predict.py reuses the same loaded instance
+    ivf_model, _ = ivf_registry.get()
     mood_model = joblib.load("models/mood_trend_model.pkl")
     emotion_model = joblib.load("models/emotion_model.pkl")
     vectorizer = joblib.load("models/emotion_vectorizer.pkl")
@@ -76,10 +126,18 @@ except FileNotFoundError as e:
 except Exception as e:
     logging.error(f"An error occurred while loading ML models: {e}")
 
+# Schema changes are versioned migrations, applied at deploy time with `python migrations.py upgrade`.
+# Local SQLite databases are migrated on startup unless AUTO_MIGRATE=0.
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "1" if database_url().startswith("sqlite") else "0") == "1"
+
 with app.app_context():
-    # This command creates the database file and all tables from models.py
-    db.create_all()
-    logging.info("Database tables created successfully")
+    if AUTO_MIGRATE:
+        upgrade_schema()
+    else:
+        pending = pending_migrations()
+        if pending:
+            raise RuntimeError(f"Database schema is out of date ({len(pending)} pending migrations). "
+                               "Run `python migrations.py upgrade` before starting the app.")
 
     # --- Data Seeding for Demonstration ---
     # This runs once when the app starts if the database is empty.
@@ -165,6 +223,9 @@ with app.app_context():
         db.session.commit()
         logging.info("Initial data seeded successfully.")
 
+    # Autocomplete index for the clinic search box, kept up to date as clinics change
+    clinic_suggest_index.init_app(app)
+
 # --- Routes ---
 
 # Utility functions
@@ -347,8 +408,8 @@ def register_doctor():
             app.logger.error(f"Doctor registration failed: {e}")
             flash('Registration failed due to a server error.', 'error')
 
-    # Fetch clinics for the dropdown
-    clinics_query = Clinic.query.order_by(Clinic.state, Clinic.city, Clinic.name).all()
+    # Fetch the first page of clinics for the dropdown; the rest are found through its search box
+    clinics_query, _ = keyset_page(Clinic.query, CLINIC_LIST_ORDER, limit=MAX_PAGE_SIZE)
     
     # Group clinics by state for a more organized dropdown
     grouped_clinics = defaultdict(list)
@@ -371,7 +432,8 @@ def logout():
 @app.route('/patient_dashboard')
 @login_required
 def patient_dashboard():
-    user = User.query.get(session['user_id'])
+    # The user, their patient data and their dashboard summary in one query
+    user = load_patient_dashboard(session['user_id'])
     
     # Add a check to handle invalid sessions (e.g., after a database reset)
     if user is None:
@@ -389,37 +451,27 @@ def patient_dashboard():
             return redirect(url_for('admin_dashboard'))
         return redirect(url_for('logout')) # Fallback to logout
     
-    patient_data = PatientData.query.filter_by(user_id=user.id).first()
-    
-    # Get latest cycle for progress tracking
-    latest_cycle = IVFCycle.query.filter_by(patient_id=user.id).order_by(IVFCycle.start_date.desc()).first()
-    
-    # Get the latest prediction for the stat card
-    latest_prediction = Prediction.query.filter_by(user_id=user.id).order_by(Prediction.prediction_date.desc()).first()
-    
-    # Get active medications
-    active_medications = MedicationReminder.query.filter_by(user_id=user.id, is_active=True).order_by(MedicationReminder.time_of_day).all()
-    
-    # Get recent wellness logs for the stat card and list
-    recent_wellness = WellnessLog.query.filter_by(user_id=user.id).order_by(WellnessLog.date.desc()).limit(7).all()
-    # Check if today's wellness log exists
-    today_wellness_log = WellnessLog.query.filter_by(user_id=user.id, date=date.today()).first()
-    
-    # Get a personalized AI tip (mocked for now)
-    ai_tip = get_chatbot_response("Give me one personalized wellness tip for today.", user, patient_data)
-    
+    patient_data = user.patient_data
+    # Latest cycle and prediction, active medications and the last 7 wellness logs,
+    # precomputed and rebuilt only after they change
+    dashboard = patient_dashboard_data(user)
+
+    # Get a personalized AI tip from the daily cache (never waits on the LLM)
+    ai_tip = get_daily_tip(app, user, patient_data, today_tips=dashboard.today_tips)
+
     return render_template('patient_dashboard.html', 
                           user=user, 
                           patient_data=patient_data,
-                          latest_cycle=latest_cycle,
-                          latest_prediction=latest_prediction,
-                          recent_wellness=recent_wellness,
-                          active_medications=active_medications,
-                          today_wellness_log_exists=(today_wellness_log is not None),
+                          latest_cycle=dashboard.latest_cycle,
+                          latest_prediction=dashboard.latest_prediction,
+                          recent_wellness=dashboard.recent_wellness,
+                          active_medications=dashboard.active_medications,
+                          today_wellness_log_exists=dashboard.today_wellness_log_exists,
                           ai_tip=ai_tip)
 
 @app.route('/doctor_dashboard')
 @login_required
+@replica_reads
 def doctor_dashboard():
     user = User.query.get(session['user_id'])
     
@@ -433,24 +485,56 @@ def doctor_dashboard():
         flash('Access denied. This dashboard is for doctors only.', 'error')
         return redirect(url_for('patient_dashboard')) # Redirect non-doctors to the patient dashboard
 
-    # Get all patients
-    patients = User.query.filter_by(user_type='patient').all()
-
-    # Get recent cycles
-    recent_cycles = IVFCycle.query.order_by(IVFCycle.created_at.desc()).limit(10).all()
-
-    # Get recent medical activities
-    recent_activities = MedicalActivity.query.join(User, MedicalActivity.patient_id == User.id).order_by(MedicalActivity.performed_date.desc()).limit(10).all()
+    # One page of the doctor's patients with their latest cycle, prediction and activity
+    try:
+        patients, next_cursor = doctor_patient_page(user, cursor=request.args.get('cursor'),
+                                                    limit=page_size(request.args.get('limit')))
+    except InvalidCursor:
+        return redirect(url_for('doctor_dashboard'))
 
     return render_template('doctor_dashboard.html',
                           user=user,
                           patients=patients,
-                          recent_cycles=recent_cycles,
-                          recent_activities=recent_activities)
+                          next_cursor=next_cursor,
+                          patient_options=doctor_patient_options(user),
+                          **doctor_dashboard_overview(user))
+
+@app.route('/api/doctor/patients')
+@login_required
+@replica_reads
+def doctor_patients_page():
+    user = User.query.get(session['user_id'])
+    if user is None or user.user_type != 'doctor':
+        return jsonify({'error': 'Access denied'}), 403
+    try:
+        patients, next_cursor = doctor_patient_page(user, cursor=request.args.get('cursor'),
+                                                    limit=page_size(request.args.get('limit')))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'patients': [{
+            **p._asdict(),
+            'last_log_date': p.last_log_date.isoformat() if p.last_log_date else None,
+            'last_activity_at': p.last_activity_at.isoformat() if p.last_activity_at else None
+        } for p in patients],
+        'next_cursor': next_cursor
+    })
+
+# Patient picker search for the dashboard's forms, e.g. /api/doctor/patient_options?q=pri
+@app.route('/api/doctor/patient_options')
+@login_required
+@replica_reads
+def doctor_patient_options_api():
+    user = User.query.get(session['user_id'])
+    if user is None or user.user_type != 'doctor':
+        return jsonify({'error': 'Access denied'}), 403
+    patients = doctor_patient_options(user, search=request.args.get('q', '').strip())
+    return jsonify({'patients': [{'id': p.id, 'name': f"{p.first_name} {p.last_name}"} for p in patients]})
 
 # Doctor's personal notes page
 @app.route('/my_notes')
 @login_required
+@replica_reads
 def my_notes():
     user = User.query.get(session['user_id'])
     if user.user_type != 'doctor':
@@ -474,7 +558,6 @@ def my_cycle_notes():
 
     # Query for all notes related to the patient's cycles
     # Eager load related cycle and doctor info for efficiency
-    from sqlalchemy.orm import joinedload
     notes = CycleNote.query.join(IVFCycle).filter(IVFCycle.patient_id == user.id).options(
         joinedload(CycleNote.cycle),
         joinedload(CycleNote.doctor)
@@ -482,6 +565,34 @@ def my_cycle_notes():
 
     return render_template('view_notes.html', user=user, notes=notes)
 
+# Sort keys for keyset-paginated listings; each ends in the primary key so it is unique
+CLINIC_LIST_ORDER = (Clinic.state, Clinic.city, Clinic.name, Clinic.id)
+USER_LIST_ORDER = (User.created_at, User.id)
+
+def clinic_summary(clinic):
+    return {
+        'id': clinic.id,
+        'name': clinic.name,
+        'city': clinic.city,
+        'state': clinic.state,
+        'address': clinic.address,
+        'phone': clinic.phone,
+        'website': clinic.website,
+        'description': clinic.description,
+        'latitude': clinic.latitude,
+        'longitude': clinic.longitude,
+        'url': url_for('clinic_detail', clinic_id=clinic.id)
+    }
+
+def doctor_counts(clinic_ids):
+    """Number of doctors per clinic for one page of clinics, in a single grouped query."""
+    if not clinic_ids:
+        return {}
+    rows = db.session.query(User.clinic_id, db.func.count(User.id)).filter(
+        User.clinic_id.in_(clinic_ids)
+    ).group_by(User.clinic_id).all()
+    return dict(rows)
+
 # Find a Clinic/Doctor page
 @app.route('/find_clinic', methods=['GET', 'POST'])
 @login_required
@@ -489,32 +600,85 @@ def find_clinic():
     clinics = []
     query = None
     all_clinics = []
-    total_clinics = Clinic.query.count()
+    next_cursor = None
+    total_clinics = clinic_count()
 
     if request.method == 'POST':
         query = request.form.get('location', '').strip()
 
         if query:
-            # Split by comma to allow "city, state"
-            parts = [p.strip() for p in query.split(',')]
-            city = parts[0] if len(parts) > 0 else ''
-            state = parts[1] if len(parts) > 1 else ''
-
-            # Build search conditions dynamically (case-insensitive for SQLite)
-            conditions = []
-            if city:
-                conditions.append(db.func.lower(Clinic.city).like(f"%{city.lower()}%"))
-            if state:
-                conditions.append(db.func.lower(Clinic.state).like(f"%{state.lower()}%"))
-            conditions.append(db.func.lower(Clinic.name).like(f"%{query.lower()}%"))
-
-            # Search if any condition matches
-            clinics = Clinic.query.filter(db.or_(*conditions)).all()
+            # Ranked full-text search over name, city, state and description ("city, state" works too)
+            clinics = search_clinics(query)
     else:
-        # If no search query, show all clinics (paginated or limited)
-        all_clinics = Clinic.query.order_by(Clinic.state, Clinic.city, Clinic.name).limit(50).all()
+        # If no search query, browse clinics a page at a time (more are lazy-loaded from /api/clinics)
+        try:
+            all_clinics, next_cursor = keyset_page(Clinic.query, CLINIC_LIST_ORDER, cursor=request.args.get('cursor'),
+                                                   limit=page_size(request.args.get('limit')))
+        except InvalidCursor:
+            all_clinics, next_cursor = keyset_page(Clinic.query, CLINIC_LIST_ORDER, limit=page_size(None))
+
+    return render_template('find_clinic.html', clinics=clinics, query=query, all_clinics=all_clinics,
+                           total_clinics=total_clinics, next_cursor=next_cursor)
+
+# Clinic listing for lazy loading and dropdown search, e.g. /api/clinics?cursor=...&limit=50 or /api/clinics?q=pune
+# Public, since doctors pick their clinic from it before they have an account
+@app.route('/api/clinics')
+def list_clinics():
+    limit = page_size(request.args.get('limit'))
+    query = request.args.get('q', '').strip()
+    if query:
+        return jsonify({'clinics': [clinic_summary(c) for c in search_clinics(query, limit=limit)], 'next_cursor': None})
+
+    clinics_query = Clinic.query
+    if request.args.get('state'):
+        clinics_query = clinics_query.filter(Clinic.state == request.args['state'])
+    try:
+        clinics, next_cursor = keyset_page(clinics_query, CLINIC_LIST_ORDER, cursor=request.args.get('cursor'), limit=limit)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'clinics': [clinic_summary(c) for c in clinics], 'next_cursor': next_cursor})
 
-    return render_template('find_clinic.html', clinics=clinics, query=query, all_clinics=all_clinics, total_clinics=total_clinics)
+# Search box autocomplete, e.g. /api/clinics/suggest?q=bengal
+@app.route('/api/clinics/suggest')
+@login_required
+def clinics_suggest():
+    query = request.args.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.args.get('limit', 8)), MAX_CLINIC_SUGGESTIONS))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    suggestions = clinic_suggest_index.suggest(query, limit=limit) if query else []
+    for suggestion in suggestions:
+        if suggestion['clinic_id'] is not None:
+            suggestion['url'] = url_for('clinic_detail', clinic_id=suggestion['clinic_id'])
+    return jsonify({'query': query, 'suggestions': suggestions})
+
+# Nearest clinics, e.g. /api/clinics/near?lat=12.97&lng=77.59&radius_km=25&limit=10
+@app.route('/api/clinics/near')
+@login_required
+def clinics_near():
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        limit = int(request.args.get('limit', 10))
+        radius_km = float(request.args['radius_km']) if request.args.get('radius_km') else None
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lng are required; limit and radius_km must be numbers'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat/lng out of range'}), 400
+    if radius_km is not None and not (math.isfinite(radius_km) and radius_km > 0):
+        return jsonify({'error': 'radius_km must be a positive number'}), 400
+    limit = max(1, min(limit, MAX_NEAREST_CLINICS))
+
+    nearest = clinic_geo_index.nearest(lat, lng, limit=limit, radius_km=radius_km)
+    clinics = {c.id: c for c in Clinic.query.filter(Clinic.id.in_([cid for cid, _ in nearest])).all()} if nearest else {}
+    results = []
+    for clinic_id, distance_km in nearest:
+        clinic = clinics.get(clinic_id)
+        if clinic is None:
+            continue  # Deleted by another process since the index was built
+        results.append(dict(clinic_summary(clinic), distance_km=round(distance_km, 2)))
+    return jsonify({'clinics': results, 'count': len(results)})
 
 # Clinic Detail page
 @app.route('/clinic/<int:clinic_id>')
@@ -526,23 +690,39 @@ def clinic_detail(clinic_id):
 # --- Admin Routes ---
 @app.route('/admin')
 @admin_required
+@replica_reads
 def admin_dashboard():
     user = User.query.get(session['user_id'])
-    user_count = User.query.count()
-    patient_count = User.query.filter_by(user_type='patient').count()
-    doctor_count = User.query.filter_by(user_type='doctor').count()
-    clinic_count = Clinic.query.count()
-    return render_template('admin_dashboard.html', 
-                           user=user, user_count=user_count, 
-                           clinic_count=clinic_count, patient_count=patient_count,
-                           doctor_count=doctor_count)
+    # Maintained counters (cached briefly) instead of COUNT(*) over user and clinic
+    return render_template('admin_dashboard.html', user=user, **admin_stats())
 
 @app.route('/admin/clinics')
 @admin_required
 def admin_clinics():
     user = User.query.get(session['user_id'])
-    clinics = Clinic.query.order_by(Clinic.name).all()
-    return render_template('admin_clinics.html', user=user, clinics=clinics)
+    try:
+        clinics, next_cursor = keyset_page(Clinic.query, CLINIC_LIST_ORDER, cursor=request.args.get('cursor'),
+                                           limit=page_size(request.args.get('limit')))
+    except InvalidCursor:
+        return redirect(url_for('admin_clinics'))
+    counts = doctor_counts([c.id for c in clinics])
+    return render_template('admin_clinics.html', user=user, clinics=clinics, doctor_counts=counts, next_cursor=next_cursor)
+
+@app.route('/api/admin/clinics')
+@admin_required
+def admin_clinics_page():
+    try:
+        clinics, next_cursor = keyset_page(Clinic.query, CLINIC_LIST_ORDER, cursor=request.args.get('cursor'),
+                                           limit=page_size(request.args.get('limit')))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    counts = doctor_counts([c.id for c in clinics])
+    return jsonify({
+        'clinics': [dict(clinic_summary(c), doctor_count=counts.get(c.id, 0),
+                         edit_url=url_for('edit_clinic', clinic_id=c.id),
+                         delete_url=url_for('delete_clinic', clinic_id=c.id)) for c in clinics],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/admin/clinic/add', methods=['GET', 'POST'])
 @admin_required
@@ -554,7 +734,6 @@ def add_clinic():
             address=request.form.get('address'),
             city=request.form.get('city'),
             state=request.form.get('state'),
-            zip_code=request.form.get('zip_code'),
             phone=request.form.get('phone'),
             website=request.form.get('website'),
             latitude=float(request.form.get('latitude')) if request.form.get('latitude') else None,
@@ -606,8 +785,38 @@ def delete_clinic(clinic_id):
 @admin_required
 def admin_users():
     user = User.query.get(session['user_id'])
-    users = User.query.order_by(User.created_at.desc()).all()
-    return render_template('admin_users.html', user=user, users=users)
+    try:
+        users, next_cursor = keyset_page(User.query.options(joinedload(User.clinic)), USER_LIST_ORDER,
+                                         cursor=request.args.get('cursor'), limit=page_size(request.args.get('limit')),
+                                         descending=True)
+    except InvalidCursor:
+        return redirect(url_for('admin_users'))
+    return render_template('admin_users.html', user=user, users=users, next_cursor=next_cursor)
+
+@app.route('/api/admin/users')
+@admin_required
+def admin_users_page():
+    try:
+        users, next_cursor = keyset_page(User.query.options(joinedload(User.clinic)), USER_LIST_ORDER,
+                                         cursor=request.args.get('cursor'), limit=page_size(request.args.get('limit')),
+                                         descending=True)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'users': [{
+            'id': u.id,
+            'username': u.username,
+            'first_name': u.first_name,
+            'last_name': u.last_name,
+            'email': u.email,
+            'user_type': u.user_type,
+            'clinic': u.clinic.name if u.clinic else None,
+            'created_at': u.created_at.isoformat() if u.created_at else None,
+            'edit_url': url_for('edit_user', user_id=u.id),
+            'delete_url': url_for('delete_user', user_id=u.id)
+        } for u in users],
+        'next_cursor': next_cursor
+    })
 
 @app.route('/admin/user/edit/<int:user_id>', methods=['GET', 'POST'])
 @admin_required
@@ -748,6 +957,7 @@ def wellness():
         wellness_log.meal_snacks = request.form.get('meal_snacks')
         
         db.session.commit()
+        invalidate_wellness_analytics(user.id)
         flash(flash_message, 'success')
         return redirect(url_for('wellness'))
     
@@ -763,13 +973,9 @@ def nutrition():
     user = User.query.get(session['user_id'])
     patient_data = PatientData.query.filter_by(user_id=user.id).first()
     
-    # Get AI-generated guidance
-    nutrition_plan = get_nutrition_plan(patient_data)
-    yoga_routine = get_yoga_routine(patient_data)
-
-    # Get today's meal log and generate nutrition summary
+    # Get today's meal log
     today_log = WellnessLog.query.filter_by(user_id=user.id, date=date.today()).first()
-    nutrition_summary = {}
+    meal_descriptions = {}
 
     if today_log and (today_log.meal_breakfast or today_log.meal_lunch or today_log.meal_dinner or today_log.meal_snacks):
         meal_descriptions = {
@@ -780,9 +986,10 @@ def nutrition():
         }
         # Remove empty meals before sending to AI
         meal_descriptions = {k: v for k, v in meal_descriptions.items() if v}
-        
-        if meal_descriptions:
-            nutrition_summary = get_nutrition_analysis(meal_descriptions)
+
+    # Get AI-generated guidance and nutrition summary; plan/routine are cached per
+    # profile and any remaining AI calls run concurrently (see ai_cache.py)
+    nutrition_plan, yoga_routine, nutrition_summary = get_nutrition_page_ai(patient_data, meal_descriptions)
     
     return render_template('nutrition.html', 
                           user=user, 
@@ -857,6 +1064,30 @@ def update_profile():
     return render_template('update_profile.html', user=user, patient_data=patient_data)
 
 # File upload
+def stored_upload_name(original_filename):
+    """Timestamped, sanitized name under which an upload is kept in UPLOAD_FOLDER."""
+    return datetime.now().strftime('%Y%m%d_%H%M%S_') + secure_filename(original_filename)
+
+def create_uploaded_document(user_id, filename, original_filename, file_type, file_size, content_hash, description):
+    """Records a fully written upload and gets its text: from the cache for known content, otherwise via the extraction queue."""
+    document = MedicalDocument(
+        user_id=user_id,
+        filename=filename,
+        original_filename=original_filename,
+        file_type=file_type,
+        file_size=file_size,
+        content_hash=content_hash,
+        description=description
+    )
+
+    db.session.add(document)
+    db.session.commit()
+
+    # Re-uploads of a known file reuse its text; anything new is extracted (OCR/PDF) by the background workers
+    if not apply_cached_extraction(document):
+        enqueue_extraction(document)
+    return document
+
 @app.route('/upload_document', methods=['POST'])
 @login_required
 def upload_document():
@@ -870,34 +1101,170 @@ def upload_document():
         return redirect(request.referrer)
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        filename = timestamp + filename
+        filename = stored_upload_name(file.filename)
 
         # Ensure the uploads folder exists (done in main.py, but good to ensure)
         upload_dir = app.config['UPLOAD_FOLDER']
         os.makedirs(upload_dir, exist_ok=True)
 
+        # Copy in fixed-size chunks, measuring and hashing on the way instead of re-reading the file
         file_path = os.path.join(upload_dir, filename)
-        file.save(file_path)
-
-        document = MedicalDocument(
-            user_id=session['user_id'],
-            filename=filename,
-            original_filename=file.filename,
-            file_type=file.content_type,
-            file_size=os.path.getsize(file_path),
-            description=request.form.get('description')
-        )
+        try:
+            file_size, hasher = stream_to_file(file.stream, file_path, max_bytes=MAX_UPLOAD_BYTES)
+        except UploadTooLarge:
+            flash(f'File is too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)}MB).', 'error')
+            return redirect(request.referrer)
+        except Exception as e:
+            # stream_to_file has removed the partial file
+            app.logger.error(f"Upload of {file.filename} failed: {e}")
+            flash('Upload failed. Please try again.', 'error')
+            return redirect(request.referrer)
 
-        db.session.add(document)
-        db.session.commit()
+        create_uploaded_document(session['user_id'], filename, file.filename, file.content_type,
+                                 file_size, hasher.hexdigest(), request.form.get('description'))
         flash('Document uploaded successfully!', 'success')
     else:
         flash('Invalid file type.', 'error')
 
     return redirect(request.referrer)
 
+# Resumable chunked uploads, for large scan bundles:
+#   POST /api/uploads                 {"filename", "content_type", "total_size", "description"} -> upload_id
+#   PUT  /api/uploads/<upload_id>     raw bytes, starting at X-Upload-Offset (or Content-Range)
+#   GET  /api/uploads/<upload_id>     current offset, to resume after a dropped connection
+def upload_session_payload(upload):
+    payload = {
+        'upload_id': upload.id,
+        'offset': upload.received_bytes,
+        'total_size': upload.total_size,
+        'chunk_size': CLIENT_CHUNK_SIZE,
+        'complete': upload.document_id is not None
+    }
+    if upload.document_id is not None:
+        payload['document_id'] = upload.document_id
+    return payload
+
+def get_own_upload(upload_id):
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != session['user_id']:
+        return None
+    return upload
+
+def expire_upload_sessions():
+    """
+    Deletes resumable uploads idle for longer than UPLOAD_SESSION_TTL, with their partial
+    files, and partial files left without a session. Run when a new upload starts.
+    """
+    upload_dir = app.config['UPLOAD_FOLDER']
+    cutoff = datetime.now(timezone.utc) - UPLOAD_SESSION_TTL
+    expired = UploadSession.query.filter(UploadSession.updated_at < cutoff)
+    for upload_id, document_id in expired.with_entities(UploadSession.id, UploadSession.document_id).all():
+        if document_id is None:
+            discard_partial(upload_dir, upload_id)
+    expired.delete(synchronize_session=False)
+    db.session.commit()
+    for upload_id in stale_partials(upload_dir, UPLOAD_SESSION_TTL.total_seconds()):
+        if db.session.get(UploadSession, upload_id) is None:
+            discard_partial(upload_dir, upload_id)
+
+def requested_chunk_offset():
+    """Start offset of a chunk, from X-Upload-Offset or a 'Content-Range: bytes start-end/total' header."""
+    content_range = request.headers.get('Content-Range', '')
+    if content_range.startswith('bytes ') and '-' in content_range:
+        return int(content_range[len('bytes '):].split('-', 1)[0])
+    return int(request.headers.get('X-Upload-Offset', 0))
+
+@app.route('/api/uploads', methods=['POST'])
+@login_required
+def start_upload():
+    data = request.get_json(silent=True) or {}
+    original_filename = data.get('filename') or ''
+    if not allowed_file(original_filename):
+        return jsonify({'error': 'Invalid file type.'}), 400
+    try:
+        total_size = int(data.get('total_size'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'total_size is required.'}), 400
+    if total_size <= 0:
+        return jsonify({'error': 'total_size must be positive.'}), 400
+    if total_size > MAX_UPLOAD_BYTES:
+        return jsonify({'error': f'File is too large (max {MAX_UPLOAD_BYTES // (1024 * 1024)}MB).'}), 413
+
+    expire_upload_sessions()
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=session['user_id'],
+        original_filename=original_filename,
+        file_type=data.get('content_type'),
+        description=data.get('description'),
+        total_size=total_size,
+        received_bytes=0
+    )
+    db.session.add(upload)
+    db.session.commit()
+    # Start with an empty partial file; each chunk is written into it at its offset
+    open(partial_path(app.config['UPLOAD_FOLDER'], upload.id), 'wb').close()
+    return jsonify(upload_session_payload(upload)), 201
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    upload = get_own_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(upload_session_payload(upload))
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    upload = get_own_upload(upload_id)
+    if upload is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    try:
+        offset = requested_chunk_offset()
+    except ValueError:
+        return jsonify({'error': 'Invalid upload offset.'}), 400
+
+    upload_dir = app.config['UPLOAD_FOLDER']
+    part_path = partial_path(upload_dir, upload.id)
+    with upload_lock(upload.id):
+        db.session.refresh(upload)
+        # The client must continue exactly where the stored bytes end; tell it where that is
+        if upload.document_id is not None or offset != upload.received_bytes:
+            return jsonify(dict(upload_session_payload(upload), error='Offset mismatch')), 409
+
+        # Bytes past received_bytes aren't part of the upload yet: a failed chunk needs no cleanup,
+        # the client resends it at the same offset and it is overwritten
+        try:
+            written = append_chunk(request.stream, part_path, offset, max_bytes=upload.total_size - offset)
+        except UploadTooLarge:
+            return jsonify(dict(upload_session_payload(upload), error='Chunk exceeds the declared total_size.')), 413
+        except Exception as e:
+            app.logger.error(f"Chunk upload {upload.id} failed at offset {offset}: {e}")
+            return jsonify(dict(upload_session_payload(upload), error='Chunk upload failed.')), 400
+
+        # Only advance from the offset this chunk was written at: if a request in another
+        # process stored a chunk there first, this one is rejected
+        advanced = UploadSession.query.filter_by(id=upload.id, received_bytes=offset, document_id=None).update(
+            {'received_bytes': offset + written}, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(upload)
+        if not advanced:
+            drop_running_hash(part_path)
+            return jsonify(dict(upload_session_payload(upload), error='Offset mismatch')), 409
+
+        if upload.received_bytes == upload.total_size:
+            filename = stored_upload_name(upload.original_filename)
+            content_hash = finish_hash(part_path, upload.total_size)
+            os.replace(part_path, os.path.join(upload_dir, filename))
+            document = create_uploaded_document(upload.user_id, filename, upload.original_filename, upload.file_type,
+                                                upload.total_size, content_hash, upload.description)
+            upload.document_id = document.id
+            db.session.commit()
+            forget_upload(upload.id, part_path)
+
+    return jsonify(upload_session_payload(upload))
+
 # My Documents page
 @app.route('/my_documents')
 @login_required
@@ -915,7 +1282,8 @@ def my_documents():
         return redirect(url_for('index'))
 
     documents = MedicalDocument.query.filter_by(user_id=user.id).order_by(MedicalDocument.uploaded_at.desc()).all()
-    return render_template('my_documents.html', user=user, documents=documents)
+    return render_template('my_documents.html', user=user, documents=documents,
+                           max_upload_mb=MAX_UPLOAD_BYTES // (1024 * 1024), chunk_size=CLIENT_CHUNK_SIZE)
 
 # Download document
 @app.route('/download_document/<int:doc_id>')
@@ -945,42 +1313,31 @@ def analyze_document(doc_id):
         flash('Document file not found.', 'error')
         return redirect(url_for('my_documents'))
 
-    extracted_text = ""
+    # Older uploads have no content hash yet
+    if not document.content_hash:
+        document.content_hash = file_sha256(file_path)
+        db.session.commit()
 
-    try:
-        if document.file_type == 'application/pdf':
-            # Extract text from PDF
-            extracted_text = pdf_extract_text(file_path)
-        elif document.file_type.startswith('image/'):
-            # Extract text from image using OCR
-            image = Image.open(file_path)
-            extracted_text = pytesseract.image_to_string(image)
-        elif document.file_type in ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
-            # Handle DOC and DOCX files
-            try:
-                from docx import Document
-                doc = Document(file_path)
-                extracted_text = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
-            except ImportError:
-                extracted_text = "DOCX processing not available. Please install python-docx library."
-            except Exception as e:
-                extracted_text = f"Error processing Word document: {str(e)}"
-        else:
-            # For other files, try to read as text
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    extracted_text = f.read()
-            except UnicodeDecodeError:
-                extracted_text = "This file appears to be binary and cannot be analyzed as text."
-    except Exception as e:
-        flash(f'Error analyzing document: {str(e)}', 'error')
-        return redirect(url_for('my_documents'))
+    # Text already extracted by the current extractor (or cached for identical content): show it straight away
+    if active_job(document.id) is None and (has_current_text(document) or apply_cached_extraction(document)):
+        return render_template('document_analysis.html', document=document, extracted_text=document.extracted_text, job_status='done')
 
-    # Store the extracted text in the document record
-    document.extracted_text = extracted_text
-    db.session.commit()
+    # Otherwise queue extraction (or reuse the pending job) and let the page poll for the result.
+    # A finished job without current text was incomplete (or ran an older extractor): retry it
+    job = latest_job(document.id)
+    if job is None or job.status == JOB_DONE or (job.status == JOB_FAILED and request.args.get('retry')):
+        job = enqueue_extraction(document)
+
+    return render_template('document_analysis.html', document=document, extracted_text='', job_status=job.status, job_error=job.error)
 
-    return render_template('document_analysis.html', document=document, extracted_text=extracted_text)
+# Extraction status for the document analysis page to poll
+@app.route('/api/documents/<int:doc_id>/extraction')
+@login_required
+def document_extraction_status(doc_id):
+    document = MedicalDocument.query.get_or_404(doc_id)
+    if document.user_id != session['user_id']:
+        return jsonify({'error': 'Access denied'}), 403
+    return jsonify(extraction_status(document))
 
 # Add Doctor's Note to Cycle
 @app.route('/add_cycle_note/<int:cycle_id>', methods=['POST'])
@@ -1034,10 +1391,14 @@ def create_cycle():
 
     # Check if patient exists and is a patient
     patient = User.query.get(patient_id)
-    if not patient or patient.user_type != 'patient':
+    if not patient or patient.user_type != 'patient' or patient.clinic_id not in (None, user.clinic_id):
         flash('Invalid patient selected.', 'error')
         return redirect(url_for('doctor_dashboard'))
 
+    # A patient not yet at a clinic joins the clinic of the doctor starting their first cycle
+    if patient.clinic_id is None:
+        patient.clinic_id = user.clinic_id
+
     new_cycle = IVFCycle(
         patient_id=patient.id,
         protocol=protocol,
@@ -1078,7 +1439,7 @@ def schedule_appointment():
 
     # Check if patient exists
     patient = User.query.get(patient_id)
-    if not patient or patient.user_type != 'patient':
+    if not patient or patient.user_type != 'patient' or patient.clinic_id not in (None, user.clinic_id):
         flash('Invalid patient selected.', 'error')
         return redirect(url_for('doctor_dashboard'))
 
@@ -1153,22 +1514,38 @@ def welcome():
 # API endpoint for wellness data
 @app.route('/api/wellness_data')
 @login_required
+@replica_reads
 def wellness_data():
     user_id = session['user_id']
-    logs = WellnessLog.query.filter_by(user_id=user_id).order_by(WellnessLog.date.desc()).limit(30).all()
-    
-    data = {
-        'dates': [log.date.strftime('%Y-%m-%d') for log in reversed(logs)],
-        'mood': [log.mood_rating or 0 for log in reversed(logs)],
-        'stress': [log.stress_level or 0 for log in reversed(logs)],
-        'sleep_hours': [log.sleep_hours or 0 for log in reversed(logs)],
-        'sleep_quality': [log.sleep_quality or 0 for log in reversed(logs)],
-        'energy': [log.energy_level or 0 for log in reversed(logs)],
-        'detected_emotions': [log.detected_emotion for log in reversed(logs)] # Add detected emotions
-    }
-    
+    # Only the charted columns, oldest first
+    rows = db.session.query(
+        WellnessLog.date, WellnessLog.mood_rating, WellnessLog.stress_level, WellnessLog.sleep_hours,
+        WellnessLog.sleep_quality, WellnessLog.energy_level, WellnessLog.detected_emotion
+    ).filter_by(user_id=user_id).order_by(WellnessLog.date.desc()).limit(30).all()[::-1]
+
+    data = {'dates': [], 'mood': [], 'stress': [], 'sleep_hours': [], 'sleep_quality': [], 'energy': [], 'detected_emotions': []}
+    for log_date, mood, stress, sleep_hours, sleep_quality, energy, emotion in rows:
+        data['dates'].append(log_date.strftime('%Y-%m-%d'))
+        data['mood'].append(mood or 0)
+        data['stress'].append(stress or 0)
+        data['sleep_hours'].append(sleep_hours or 0)
+        data['sleep_quality'].append(sleep_quality or 0)
+        data['energy'].append(energy or 0)
+        data['detected_emotions'].append(emotion)
+
     return jsonify(data)
 
+# Wellness trends, e.g. /api/wellness/analytics?window=7&metrics=mood,sleep_hours&start=2025-01-01&end=2025-03-31
+@app.route('/api/wellness/analytics')
+@login_required
+@replica_reads
+def wellness_analytics_api():
+    try:
+        start, end, window, metrics = parse_analytics_request(request.args)
+    except InvalidAnalyticsRequest as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(wellness_analytics(session['user_id'], start, end, window, metrics))
+
 # Generate AI image
 @app.route('/api/generate_image', methods=['POST'])
 @login_required
@@ -1209,11 +1586,94 @@ def api_predict_ivf_ml():
     except Exception as e:
         app.logger.error(f"Prediction error for user {user_id}: {str(e)}")
         return jsonify({"status": "error", "message": "An internal error occurred during prediction."}), 500
+# Batch version for scoring a clinic's patient list in one model call
+@app.route("/api/predict_ivf_ml/batch", methods=["POST"])
+@login_required
+def api_predict_ivf_ml_batch():
+    from predict import predict_many # Import here to prevent circular dependency
+
+    if session.get('user_type') not in ('doctor', 'admin'):
+        return jsonify({"status": "error", "message": "Only doctors and admins can run batch predictions."}), 403
+
+    data = request.get_json(silent=True) or {}
+    user_ids = data.get('user_ids')
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({"status": "error", "message": "Provide a non-empty 'user_ids' list."}), 400
+    if len(user_ids) > MAX_BATCH_PREDICTIONS:
+        return jsonify({"status": "error", "message": f"At most {MAX_BATCH_PREDICTIONS} users per batch."}), 400
+
+    try:
+        user_ids = [int(u) for u in user_ids]
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "'user_ids' must be integers."}), 400
+
+    # Doctors may only score their own clinic's (and unassigned) patients, as on the single-patient pages
+    if session.get('user_type') == 'doctor':
+        doctor = User.query.get(session['user_id'])
+        in_scope = {row.id for row in db.session.query(User.id).filter(
+            User.id.in_(user_ids), doctor_patient_filter(doctor))}
+        out_of_scope = [u for u in user_ids if u not in in_scope]
+        if out_of_scope:
+            return jsonify({"status": "error", "message": "Some patients are not in your clinic.",
+                            "forbidden_user_ids": out_of_scope}), 403
+
+    try:
+        res = predict_many(user_ids)
+        return jsonify({"status": "ok", **res})
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Batch prediction error: {str(e)}")
+        return jsonify({"status": "error", "message": "An internal error occurred during prediction."}), 500
+
 # --- ML Model API Endpoints ---
 
+@app.route("/api/admin/model_stats")
+@admin_required
+def model_stats():
+    return jsonify({"registries": model_registry_stats()})
+
+@app.route("/api/admin/stats")
+@admin_required
+@replica_reads
+def admin_stats_api():
+    return jsonify({**admin_stats(), 'user_types': user_type_counts(), 'ttl_seconds': STATS_TTL_SECONDS})
+
+# Columnar export of wellness logs, cycles and predictions (see data_export.py).
+# POST {"full": false, "format": "parquet", "tables": [...]} starts one in the background; GET reports its status
+@app.route("/api/admin/export", methods=["GET", "POST"])
+@admin_required
+def admin_data_export():
+    if request.method == "GET":
+        return jsonify(export_status())
+    data = request.get_json(silent=True) or {}
+    tables = data.get("tables") or None
+    file_format = data.get("format", "parquet")
+    if file_format not in EXPORT_FORMATS or (tables and not set(tables) <= set(EXPORT_TABLES)):
+        return jsonify({"error": f"format must be one of {list(EXPORT_FORMATS)} and tables among {list(EXPORT_TABLES)}"}), 400
+    try:
+        started = start_export(app, tables=tables, full=bool(data.get("full")), file_format=file_format)
+    except ExportUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    if not started:
+        return jsonify({"error": "An export is already running", **export_status()}), 409
+    return jsonify(export_status()), 202
+
+@app.route("/api/admin/db_stats")
+@admin_required
+def db_stats():
+    pool = db.engine.pool
+    stats = {"checkout": pool_stats.stats(), "pool": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    stats["replicas"] = replica_router.stats()
+    return jsonify(stats)
+
 @app.route("/predict_ivf", methods=["POST"])
 def predict_ivf():
-    if not ivf_model:
+    try:
+        ivf_model, _ = ivf_registry.get()
+    except FileNotFoundError:
         return jsonify({"error": "IVF prediction model not loaded."}), 503
 
     data = request.json
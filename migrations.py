@@ -0,0 +1,330 @@
+# migrations.py
+# Versioned schema migrations.
+#
+# Each migration has a version number and is applied once; applied versions are
+# recorded in the schema_version table. Migrations only use online-friendly steps:
+# CREATE TABLE/INDEX IF NOT EXISTS (CONCURRENTLY on PostgreSQL), ALTER TABLE ADD
+# COLUMN, and backfills that update rows in small committed batches - never the old
+# copy-the-table-and-swap rewrites. Every step checks whether it is already done, so a
+# migration interrupted part way (e.g. during a backfill) can simply be run again.
+#
+# Run at deploy time, before the app starts:
+#   python migrations.py upgrade            # apply all pending migrations
+#   python migrations.py upgrade --to 3     # apply up to and including version 3
+#   python migrations.py status             # list applied and pending migrations
+#   python migrations.py reset --yes        # development only: drop everything and re-create
+#
+# Adding a migration: write a function taking an Operations object and append it to
+# MIGRATIONS with the next version number. Never renumber or edit an applied migration.
+import os
+import sys
+import time
+import logging
+import argparse
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from sqlalchemy import (Table, Column, Integer, String, DateTime, MetaData, inspect, select, insert, text)
+
+from database import db, database_url, engine_options
+import models  # noqa: F401 - registers every table on db.metadata
+from clinic_search import setup_clinic_search
+from admin_stats import setup_stat_counters
+from document_extraction import file_sha256
+
+UPLOAD_FOLDER = "uploads"
+BACKFILL_BATCH_SIZE = int(os.environ.get("MIGRATION_BATCH_SIZE", 1000))
+
+# Kept off db.metadata so db.create_all()/drop_all() never touch it
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+Migration = namedtuple("Migration", "version name upgrade")
+
+
+class Operations:
+    """Idempotent schema operations on one connection, handed to each migration."""
+
+    def __init__(self, connection):
+        self.conn = connection
+        self.dialect = connection.dialect.name
+
+    def _inspector(self):
+        # A fresh inspector each time: its reflection cache would miss our own changes
+        return inspect(self.conn)
+
+    def quote(self, name):
+        return self.conn.dialect.identifier_preparer.quote(name)
+
+    def has_table(self, table):
+        return self._inspector().has_table(table)
+
+    def has_column(self, table, column):
+        return any(c["name"] == column for c in self._inspector().get_columns(table))
+
+    def has_unique(self, table, columns):
+        inspector = self._inspector()
+        constraints = inspector.get_unique_constraints(table)
+        indexes = [i for i in inspector.get_indexes(table) if i.get("unique")]
+        return any(list(c["column_names"]) == list(columns) for c in constraints + indexes)
+
+    def execute(self, sql, params=None):
+        return self.conn.execute(text(sql), params or {})
+
+    def create_tables(self):
+        """Creates every model table that doesn't exist yet (with its indexes)."""
+        db.metadata.create_all(self.conn, checkfirst=True)
+
+    def add_column(self, table, column, ddl):
+        """ALTER TABLE ADD COLUMN - a metadata-only change on SQLite and PostgreSQL (no table rewrite)."""
+        if not self.has_column(table, column):
+            logging.info(f"Adding column {table}.{column}")
+            self.execute(f"ALTER TABLE {self.quote(table)} ADD COLUMN {self.quote(column)} {ddl}")
+
+    def create_index(self, name, table, columns, unique=False):
+        columns_sql = ", ".join(self.quote(c) for c in columns)
+        unique_sql = "UNIQUE " if unique else ""
+        if self.dialect == "postgresql":
+            # CONCURRENTLY builds without blocking writes, but can't run inside a transaction
+            self.conn.commit()
+            with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+                autocommit.execute(text(
+                    f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {self.quote(name)} "
+                    f"ON {self.quote(table)} ({columns_sql})"
+                ))
+        else:
+            self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {self.quote(name)} ON {self.quote(table)} ({columns_sql})")
+
+    def backfill(self, label, select_batch, update_batch, batch_size=BACKFILL_BATCH_SIZE):
+        """
+        Runs select_batch(after_id, batch_size) -> [(id, ...), ...] (ordered by id) and
+        update_batch(rows) repeatedly, committing after every batch so locks stay short
+        and an interrupted backfill resumes where it left off. Returns the rows processed.
+        """
+        done, after_id, start = 0, 0, time.perf_counter()
+        while True:
+            rows = select_batch(after_id, batch_size)
+            if not rows:
+                break
+            update_batch(rows)
+            self.conn.commit()
+            done += len(rows)
+            after_id = rows[-1][0]
+            logging.info(f"{label}: {done} rows ({done / (time.perf_counter() - start):.0f} rows/s)")
+        return done
+
+
+# --- Migrations ---
+
+def initial_schema(ops):
+    """Every table in models.py. On an existing database this only adds the missing ones."""
+    ops.create_tables()
+
+
+def document_extraction_columns(ops):
+    """Columns added to medical_document after it was first created."""
+    ops.add_column("medical_document", "extracted_text", "TEXT")
+    ops.add_column("medical_document", "extractor_version", "VARCHAR(20)")
+    ops.add_column("medical_document", "content_hash", "VARCHAR(64)")
+    ops.create_index("ix_medical_document_content_hash", "medical_document", ["content_hash"])
+
+
+def listing_indexes(ops):
+    """Keyset pagination for the clinic and user lists and the doctor dashboard."""
+    ops.create_index("ix_clinic_state_city_name_id", "clinic", ["state", "city", "name", "id"])
+    ops.create_index("ix_user_created_at_id", "user", ["created_at", "id"])
+    ops.create_index("ix_user_clinic_patients", "user", ["clinic_id", "user_type", "last_name", "first_name", "id"])
+
+
+def hot_path_indexes(ops):
+    """Composite indexes for the per-user filter/order-by queries (see check_indexes.py)."""
+    ops.create_index("ix_ivf_cycle_patient_id_start_date", "ivf_cycle", ["patient_id", "start_date"])
+    ops.create_index("ix_cycle_note_doctor_id_created_at", "cycle_note", ["doctor_id", "created_at"])
+    ops.create_index("ix_cycle_note_cycle_id", "cycle_note", ["cycle_id"])
+    ops.create_index("ix_medication_reminder_user_active_time", "medication_reminder", ["user_id", "is_active", "time_of_day"])
+    ops.create_index("ix_medical_document_user_id_uploaded_at", "medical_document", ["user_id", "uploaded_at"])
+    ops.create_index("ix_prediction_user_id_date", "prediction", ["user_id", "prediction_date"])
+    ops.create_index("ix_medical_activity_performed_date", "medical_activity", ["performed_date"])
+    ops.create_index("ix_medical_activity_patient_id_performed_date", "medical_activity", ["patient_id", "performed_date"])
+
+    # One wellness log per user and day; older databases were created without the constraint
+    if not ops.has_unique("wellness_log", ["user_id", "date"]):
+        removed = ops.execute(
+            "DELETE FROM wellness_log WHERE id NOT IN (SELECT MAX(id) FROM wellness_log GROUP BY user_id, date)"
+        ).rowcount
+        if removed:
+            logging.info(f"Removed {removed} duplicate wellness logs (same user and day), keeping the newest")
+        ops.create_index("_user_date_uc", "wellness_log", ["user_id", "date"], unique=True)
+
+
+def clinic_full_text_search(ops):
+    """FTS5 table and triggers on SQLite, a generated tsvector column on PostgreSQL."""
+    setup_clinic_search(ops.conn)
+
+
+def document_content_hashes(ops):
+    """Fills medical_document.content_hash for documents uploaded before it existed."""
+    def select_batch(after_id, limit):
+        return ops.execute(
+            "SELECT id, filename FROM medical_document WHERE content_hash IS NULL AND id > :after "
+            "ORDER BY id LIMIT :limit", {"after": after_id, "limit": limit}
+        ).all()
+
+    def update_batch(rows):
+        hashes = []
+        for doc_id, filename in rows:
+            path = os.path.join(UPLOAD_FOLDER, filename)
+            if os.path.exists(path):
+                hashes.append({"id": doc_id, "hash": file_sha256(path)})
+        if hashes:
+            ops.execute("UPDATE medical_document SET content_hash = :hash WHERE id = :id", hashes)
+
+    ops.backfill("medical_document.content_hash", select_batch, update_batch)
+
+
+def stat_counters(ops):
+    """stat_counter table, the triggers that maintain it, and the initial counts."""
+    ops.create_tables()
+    setup_stat_counters(ops.conn)
+
+
+def export_watermarks(ops):
+    """wellness_log.created_at, and indexes for finding rows created since the last data export."""
+    ops.add_column("wellness_log", "created_at", "DATETIME" if ops.dialect == "sqlite" else "TIMESTAMP")
+    ops.create_index("ix_wellness_log_created_at", "wellness_log", ["created_at"])
+    ops.create_index("ix_ivf_cycle_created_at", "ivf_cycle", ["created_at"])
+    ops.create_index("ix_prediction_date", "prediction", ["prediction_date"])
+
+
+def patient_dashboard_generations(ops):
+    """
+    patient_dashboard.generation, and summary made nullable. The table only holds
+    summaries that are rebuilt on demand, so it is dropped and re-created, not copied.
+    """
+    if not ops.has_column("patient_dashboard", "generation"):
+        ops.execute("DROP TABLE IF EXISTS patient_dashboard")
+        ops.create_tables()
+
+
+def wellness_log_updated_at(ops):
+    """wellness_log.updated_at, so edits to a log can be detected (NULL for logs saved before)."""
+    ops.add_column("wellness_log", "updated_at", "DATETIME" if ops.dialect == "sqlite" else "TIMESTAMP")
+
+
+def wellness_log_export_watermark(ops):
+    """
+    Data exports track wellness logs by updated_at instead of created_at: fill it from
+    created_at for logs saved before it existed, and index it.
+    """
+    def select_batch(after_id, limit):
+        return ops.execute(
+            "SELECT id FROM wellness_log WHERE updated_at IS NULL AND created_at IS NOT NULL AND id > :after "
+            "ORDER BY id LIMIT :limit", {"after": after_id, "limit": limit}
+        ).all()
+
+    def update_batch(rows):
+        ops.execute("UPDATE wellness_log SET updated_at = created_at WHERE id = :id", [{"id": row[0]} for row in rows])
+
+    ops.backfill("wellness_log.updated_at", select_batch, update_batch)
+    ops.create_index("ix_wellness_log_updated_at", "wellness_log", ["updated_at"])
+
+
+MIGRATIONS = [
+    Migration(1, "initial_schema", initial_schema),
+    Migration(2, "document_extraction_columns", document_extraction_columns),
+    Migration(3, "listing_indexes", listing_indexes),
+    Migration(4, "hot_path_indexes", hot_path_indexes),
+    Migration(5, "clinic_full_text_search", clinic_full_text_search),
+    Migration(6, "document_content_hashes", document_content_hashes),
+    Migration(7, "stat_counters", stat_counters),
+    Migration(8, "export_watermarks", export_watermarks),
+    Migration(9, "patient_dashboard_generations", patient_dashboard_generations),
+    Migration(10, "wellness_log_updated_at", wellness_log_updated_at),
+    Migration(11, "wellness_log_export_watermark", wellness_log_export_watermark),
+]
+
+
+# --- Runner ---
+
+def applied_versions(connection):
+    schema_version.create(connection, checkfirst=True)
+    return set(connection.execute(select(schema_version.c.version)).scalars())
+
+
+def pending_migrations():
+    """Migrations not yet applied to the app's database. Needs an app context."""
+    with db.engine.connect() as connection:
+        applied = applied_versions(connection)
+        connection.commit()
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def upgrade(target=None):
+    """Applies pending migrations in order, up to `target`. Returns the versions applied. Needs an app context."""
+    done = []
+    with db.engine.connect() as connection:
+        applied = applied_versions(connection)
+        connection.commit()
+        for migration in MIGRATIONS:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            logging.info(f"Applying migration {migration.version}: {migration.name}")
+            start = time.perf_counter()
+            migration.upgrade(Operations(connection))
+            connection.execute(insert(schema_version).values(
+                version=migration.version, name=migration.name, applied_at=datetime.now(timezone.utc)
+            ))
+            connection.commit()
+            logging.info(f"Migration {migration.version} done in {time.perf_counter() - start:.2f}s")
+            done.append(migration.version)
+    return done
+
+
+def reset():
+    """Drops every table and re-applies all migrations. Development only."""
+    with db.engine.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.execute(text("DROP TABLE IF EXISTS clinic_fts"))
+        schema_version.drop(connection, checkfirst=True)
+        connection.commit()
+    db.drop_all()
+    return upgrade()
+
+
+def create_app():
+    """A bare app bound to the same database as main.app, without main's startup work."""
+    from flask import Flask
+    app = Flask("main", root_path=os.path.dirname(os.path.abspath(__file__)))
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url()
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(database_url())
+    db.init_app(app)
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(message)s')
+    parser = argparse.ArgumentParser(description="Versioned database migrations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, help="stop after this version")
+    commands.add_parser("status", help="list applied and pending migrations")
+    reset_parser = commands.add_parser("reset", help="drop all tables and re-create them (development only)")
+    reset_parser.add_argument("--yes", action="store_true", help="confirm dropping all data")
+    args = parser.parse_args()
+
+    with create_app().app_context():
+        if args.command == "upgrade":
+            applied = upgrade(args.to)
+            print(f"Applied migrations: {applied}" if applied else "Database is up to date")
+        elif args.command == "status":
+            pending = {m.version for m in pending_migrations()}
+            for m in MIGRATIONS:
+                print(f"{m.version:>4}  {'pending' if m.version in pending else 'applied':<8} {m.name}")
+        elif args.command == "reset":
+            if not args.yes:
+                sys.exit("This drops every table. Re-run with --yes to confirm.")
+            print(f"Re-created database, applied migrations: {reset()}")
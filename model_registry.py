@@ -0,0 +1,120 @@
+# model_registry.py
+import os
+import json
+import time
+import logging
+import threading
+from collections import namedtuple
+
+import joblib
+
+MODEL_DIR = "models"
+IVF_MODEL_FILE = os.path.join(MODEL_DIR, "ivf_success_model.pkl")
+IVF_META_FILE = os.path.join(MODEL_DIR, "ivf_model_metadata.json")
+
+# One loaded artifact: the (mtime, size) key it was loaded under, plus the objects themselves
+_Entry = namedtuple("_Entry", ["key", "model", "meta", "version", "loaded_at"])
+
+
+class ModelRegistry:
+    """
+    Holds a loaded estimator and its metadata for the lifetime of the process.
+    The artifact is reloaded only when the files on disk change (mtime/size),
+    and the new entry is swapped in atomically so readers never see a half-loaded model.
+    """
+
+    def __init__(self, model_file, meta_file=None):
+        self.model_file = model_file
+        self.meta_file = meta_file
+        self._entry = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.last_load_seconds = None
+        self.total_load_seconds = 0.0
+
+    def _file_key(self):
+        """Returns a key identifying the current version of the files on disk."""
+        paths = [self.model_file] + ([self.meta_file] if self.meta_file else [])
+        key = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                raise FileNotFoundError("Model or metadata files not found. Run train_model.py first.")
+            key.append((st.st_mtime_ns, st.st_size))
+        return tuple(key)
+
+    def _load(self, key):
+        start = time.perf_counter()
+        model = joblib.load(self.model_file)
+        meta = {}
+        if self.meta_file:
+            with open(self.meta_file, "r") as f:
+                meta = json.load(f)
+        elapsed = time.perf_counter() - start
+
+        version = meta.get("version") or "-".join(str(mtime) for mtime, _ in key)
+        with self._stats_lock:
+            self.loads += 1
+            self.last_load_seconds = elapsed
+            self.total_load_seconds += elapsed
+        logging.info(f"Loaded model {self.model_file} (version {version}) in {elapsed * 1000:.1f} ms")
+        return _Entry(key, model, meta, version, time.time())
+
+    def get(self):
+        """Returns (model, meta), reloading from disk only if the artifact changed."""
+        key = self._file_key()
+        entry = self._entry
+        if entry is None or entry.key != key:
+            with self._lock:
+                # Another thread may have reloaded while we waited for the lock
+                entry = self._entry
+                if entry is None or entry.key != key:
+                    entry = self._load(key)
+                    self._entry = entry
+                    return entry.model, entry.meta
+        with self._stats_lock:
+            self.hits += 1
+        return entry.model, entry.meta
+
+    def stats(self):
+        """Returns load-time and hit counters for monitoring."""
+        entry = self._entry
+        with self._stats_lock:
+            return {
+                "model_file": self.model_file,
+                "version": entry.version if entry else None,
+                "loaded_at": entry.loaded_at if entry else None,
+                "hits": self.hits,
+                "loads": self.loads,
+                "last_load_ms": round(self.last_load_seconds * 1000, 2) if self.last_load_seconds is not None else None,
+                "total_load_ms": round(self.total_load_seconds * 1000, 2),
+            }
+
+
+# Process-wide registries, keyed by model file path
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_file, meta_file=None):
+    """Returns the shared registry for a model file, creating it on first use."""
+    with _registries_lock:
+        registry = _registries.get(model_file)
+        if registry is None:
+            registry = ModelRegistry(model_file, meta_file)
+            _registries[model_file] = registry
+        return registry
+
+
+def all_stats():
+    """Returns the counters of every registry in this process."""
+    with _registries_lock:
+        registries = list(_registries.values())
+    return [r.stats() for r in registries]
+
+
+# The IVF success model shared by main.py and predict.py
+ivf_registry = get_registry(IVF_MODEL_FILE, IVF_META_FILE)
@@ -33,6 +33,12 @@ class User(db.Model):
     # Use timezone-aware object for modern stability (FIX)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # Serve the newest-first admin user list and the doctor dashboard's per-clinic patient list
+    __table_args__ = (
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+        db.Index('ix_user_clinic_patients', 'clinic_id', 'user_type', 'last_name', 'first_name', 'id'),
+    )
+
     # Relationships (one-to-many/one-to-one)
     patient_data = db.relationship('PatientData', backref='owner', uselist=False, cascade="all, delete-orphan")
     ivf_cycles = db.relationship('IVFCycle', backref='patient', lazy='dynamic', cascade="all, delete-orphan")
@@ -41,6 +47,8 @@ class User(db.Model):
     predictions = db.relationship('Prediction', backref='user', lazy='dynamic', cascade="all, delete-orphan")
     chat_messages = db.relationship('ChatMessage', backref='user', lazy='dynamic', cascade="all, delete-orphan")
     medical_documents = db.relationship('MedicalDocument', backref='user', lazy='dynamic', cascade="all, delete-orphan") 
+    daily_tips = db.relationship('DailyTip', backref='user', lazy='dynamic', cascade="all, delete-orphan")
+    dashboard = db.relationship('PatientDashboard', uselist=False, cascade="all, delete-orphan")
     
     def set_password(self, password):
         """Hashes the password for secure storage."""
@@ -142,6 +150,9 @@ class Clinic(db.Model):
     # Relationship to doctors working at this clinic
     doctors = db.relationship('User', backref='clinic', lazy='dynamic') # References 'user' table via clinic_id foreign key
 
+    # Serves the (state, city, name) ordered, keyset-paginated clinic listings
+    __table_args__ = (db.Index('ix_clinic_state_city_name_id', 'state', 'city', 'name', 'id'),)
+
     def __repr__(self):
         return f'<Clinic {self.name}>'
 
@@ -175,6 +186,12 @@ class IVFCycle(db.Model):
     # Relationship to doctor's notes
     doctor_notes = db.relationship('CycleNote', backref='cycle', lazy='dynamic', cascade="all, delete-orphan")
 
+    # A patient's cycles, newest first; rows created since the last data export
+    __table_args__ = (
+        db.Index('ix_ivf_cycle_patient_id_start_date', 'patient_id', 'start_date'),
+        db.Index('ix_ivf_cycle_created_at', 'created_at'),
+    )
+
     def __repr__(self):
         return f'<IVFCycle {self.id} for Patient {self.patient_id} ({self.protocol})>'
 
@@ -191,6 +208,12 @@ class CycleNote(db.Model):
     # Relationship to the doctor who wrote the note
     doctor = db.relationship('User', backref=db.backref('authored_notes', lazy='dynamic'))
 
+    # A doctor's notes newest first (my_notes), and the notes on a cycle
+    __table_args__ = (
+        db.Index('ix_cycle_note_doctor_id_created_at', 'doctor_id', 'created_at'),
+        db.Index('ix_cycle_note_cycle_id', 'cycle_id'),
+    )
+
     def __repr__(self):
         return f'<CycleNote {self.id} for Cycle {self.cycle_id} by Doctor {self.doctor_id}>'
 
@@ -236,8 +259,17 @@ class WellnessLog(db.Model):
     # AI-detected emotion from mood_notes
     detected_emotion = db.Column(db.String(50))
 
-    # Ensures a user can only log one entry per day
-    __table_args__ = (db.UniqueConstraint('user_id', 'date', name='_user_date_uc'),)
+    # NULL for logs saved before these columns existed
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    # Ensures a user can only log one entry per day; its index also serves a user's logs by date.
+    # updated_at finds the logs saved or edited since the last data export
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'date', name='_user_date_uc'),
+        db.Index('ix_wellness_log_created_at', 'created_at'),
+        db.Index('ix_wellness_log_updated_at', 'updated_at'),
+    )
 
     def __repr__(self):
         return f'<WellnessLog {self.date} for User {self.user_id}>'
@@ -261,6 +293,9 @@ class MedicationReminder(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # A user's active medications in time-of-day order
+    __table_args__ = (db.Index('ix_medication_reminder_user_active_time', 'user_id', 'is_active', 'time_of_day'),)
+
     def __repr__(self):
         return f'<MedicationReminder {self.medication_name} for User {self.user_id}>'
 
@@ -295,8 +330,13 @@ class MedicalDocument(db.Model):
     file_size = db.Column(db.Integer) # Size in bytes
     description = db.Column(db.Text)
     extracted_text = db.Column(db.Text) # Extracted text from OCR/PDF processing
+    extractor_version = db.Column(db.String(20)) # document_extraction.EXTRACTOR_VERSION that produced extracted_text
+    content_hash = db.Column(db.String(64), index=True) # SHA-256 of the file contents
     uploaded_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
+    # A user's documents, newest first
+    __table_args__ = (db.Index('ix_medical_document_user_id_uploaded_at', 'user_id', 'uploaded_at'),)
+
     def __repr__(self):
         return f'<MedicalDocument {self.filename} for User {self.user_id}>'
 
@@ -323,6 +363,12 @@ class Prediction(db.Model):
     # Metadata for the prediction (e.g., features used, model version)
     model_metadata = db.Column(db.Text)
 
+    # A user's predictions, latest first; predictions made since the last data export
+    __table_args__ = (
+        db.Index('ix_prediction_user_id_date', 'user_id', 'prediction_date'),
+        db.Index('ix_prediction_date', 'prediction_date'),
+    )
+
     def __repr__(self):
         return f'<Prediction {self.id} ({self.success_probability:.2f}) for User {self.user_id}>'
 
@@ -344,5 +390,180 @@ class MedicalActivity(db.Model):
     # Relationship to patient
     patient = db.relationship('User', backref='medical_activities')
 
+    # Recent activities across patients, and a patient's latest activity
+    __table_args__ = (
+        db.Index('ix_medical_activity_performed_date', 'performed_date'),
+        db.Index('ix_medical_activity_patient_id_performed_date', 'patient_id', 'performed_date'),
+    )
+
     def __repr__(self):
         return f'<MedicalActivity {self.activity_type}: {self.activity_name} for Patient {self.patient_id}>'
+
+
+class DailyTip(db.Model):
+    """
+    Cached AI wellness tip for a patient, one per (user, day, profile version).
+    Filled in the background so the dashboard never waits on the LLM.
+    """
+    __tablename__ = 'daily_tip'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    tip_date = db.Column(db.Date, nullable=False)
+    profile_hash = db.Column(db.String(64), nullable=False) # Hash of the profile fields used in the prompt
+    tip = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'tip_date', 'profile_hash', name='_user_tip_date_profile_uc'),)
+
+    def __repr__(self):
+        return f'<DailyTip {self.tip_date} for User {self.user_id}>'
+
+
+class AIResponseCache(db.Model):
+    """
+    Persistent cache of AI-generated JSON responses (nutrition plans, yoga routines),
+    keyed by a hash of the profile fields that go into the prompt.
+    """
+    __tablename__ = 'ai_response_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(96), unique=True, index=True, nullable=False) # "<kind>:<profile hash>"
+    kind = db.Column(db.String(32), nullable=False) # nutrition_plan, yoga_routine
+    payload = db.Column(db.Text, nullable=False) # JSON-encoded response
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+    def __repr__(self):
+        return f'<AIResponseCache {self.cache_key}>'
+
+
+class ExtractionJob(db.Model):
+    """
+    Background text-extraction (OCR/PDF) job for an uploaded document.
+    Picked up by extraction_jobs.py worker processes; status moves queued -> running -> done/failed.
+    """
+    __tablename__ = 'extraction_job'
+    id = db.Column(db.Integer, primary_key=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('medical_document.id'), nullable=False, index=True)
+
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True) # queued, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    worker = db.Column(db.String(64)) # Name of the worker process that claimed the job
+    error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    document = db.relationship('MedicalDocument', backref=db.backref('extraction_jobs', lazy='dynamic', cascade="all, delete-orphan"))
+
+    def __repr__(self):
+        return f'<ExtractionJob {self.id} for Document {self.document_id} ({self.status})>'
+
+
+class ExtractionCache(db.Model):
+    """
+    Extracted text keyed by file content (SHA-256) and extractor version,
+    so the same file is never OCR'd twice, even when uploaded again.
+    """
+    __tablename__ = 'extraction_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    extractor_version = db.Column(db.String(20), nullable=False)
+    extracted_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (db.UniqueConstraint('content_hash', 'extractor_version', name='_hash_extractor_version_uc'),)
+
+    def __repr__(self):
+        return f'<ExtractionCache {self.content_hash[:12]} v{self.extractor_version}>'
+
+
+class UploadSession(db.Model):
+    """
+    A resumable, chunked document upload in progress.
+    Chunks are written into a .part file at their offsets until received_bytes reaches
+    total_size, then the file is moved into place and a MedicalDocument is created.
+    Sessions idle for UPLOAD_SESSION_TTL_HOURS are deleted with their .part file.
+    """
+    __tablename__ = 'upload_session'
+    id = db.Column(db.String(32), primary_key=True) # Random hex id handed to the client
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    original_filename = db.Column(db.String(255), nullable=False)
+    file_type = db.Column(db.String(100)) # MIME type
+    description = db.Column(db.Text)
+    total_size = db.Column(db.BigInteger, nullable=False) # Declared size in bytes
+    received_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+
+    document_id = db.Column(db.Integer, db.ForeignKey('medical_document.id')) # Set once the upload completes
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} ({self.received_bytes}/{self.total_size}) for User {self.user_id}>'
+
+
+class PatientDashboard(db.Model):
+    """
+    Precomputed patient dashboard data: latest cycle and prediction, active medications,
+    recent wellness logs and today's tips, so the dashboard renders from a single query.
+    Cleared (and its generation bumped) whenever any of those change, and rebuilt on the
+    next dashboard visit.
+    """
+    __tablename__ = 'patient_dashboard'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    summary = db.Column(db.Text) # JSON, see dashboard_service.build_patient_summary; NULL until rebuilt
+    generation = db.Column(db.Integer, default=0, nullable=False) # Bumped by every change to the sources
+    built_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<PatientDashboard for User {self.user_id} built {self.built_at}>'
+
+
+class GazetteerPlace(db.Model):
+    """
+    A locality from the bundled gazetteer (india_gazetteer.csv), used to geocode clinics.
+    Looked up by normalized name (optionally within a state) or by PIN code.
+    """
+    __tablename__ = 'gazetteer_place'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    normalized_name = db.Column(db.String(100), nullable=False, index=True) # Lowercase, accent/punctuation-free
+    state = db.Column(db.String(100))
+    pincode = db.Column(db.String(6), index=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<GazetteerPlace {self.name}, {self.state}>'
+
+
+class GeocodeCache(db.Model):
+    """
+    Result of geocoding one (city, state) pair, so imports resolve each place once
+    and always to the same coordinates. Misses are cached too (with NULL coordinates).
+    """
+    __tablename__ = 'geocode_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    query_key = db.Column(db.String(255), unique=True, nullable=False) # normalized "city|state"
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    matched_name = db.Column(db.String(100)) # Gazetteer place the query resolved to
+    method = db.Column(db.String(20)) # pincode, exact, alias, fuzzy or none
+    score = db.Column(db.Float) # Match similarity (1.0 for exact matches)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<GeocodeCache {self.query_key} -> {self.matched_name} ({self.method})>'
+
+
+class StatCounter(db.Model):
+    """
+    A maintained row count for the admin statistics ('users:<user_type>', 'clinics'),
+    kept up to date by database triggers on user and clinic (see admin_stats.py).
+    """
+    __tablename__ = 'stat_counter'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.name}={self.value}>'
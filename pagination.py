@@ -0,0 +1,66 @@
+# pagination.py
+# Keyset ("cursor") pagination helpers.
+#
+# Rather than OFFSET, each page starts strictly after the sort key of the last row
+# of the previous page, so every page is a single index range scan no matter how
+# deep it is. The cursor handed to clients is that sort key, encoded opaquely.
+import json
+import base64
+from datetime import datetime
+
+from sqlalchemy import tuple_, DateTime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parses a ?limit= argument, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    payload = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Turns a cursor back into sort-key values typed like `columns`. Raises InvalidCursor."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("wrong number of values")
+        return [
+            datetime.fromisoformat(v) if v is not None and isinstance(col.type, DateTime) else v
+            for v, col in zip(values, columns)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}") from e
+
+
+def keyset_page(query, columns, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=False):
+    """
+    Returns (rows, next_cursor) for one page of `query`, ordered by `columns`
+    (which must end in a unique column such as the primary key).
+    next_cursor is None on the last page.
+    """
+    key = tuple_(*columns)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key < after if descending else key > after)
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, c.key) for c in columns])
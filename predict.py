@@ -1,23 +1,38 @@
 # predict.py
-import os
-import joblib
 import json
 import numpy as np
 from datetime import datetime, timezone
 
 from main import app  # Use the existing app instance
 from models import db, PatientData, WellnessLog, Prediction, User
-
-MODEL_DIR = "models"
-MODEL_FILE = os.path.join(MODEL_DIR, "ivf_success_model.pkl")
-META_FILE = os.path.join(MODEL_DIR, "ivf_model_metadata.json")
+from model_registry import ivf_registry
 
 def load_model_and_meta():
-    if not os.path.exists(MODEL_FILE) or not os.path.exists(META_FILE):
-        raise FileNotFoundError("Model or metadata files not found. Run train_model.py first.")
-    model = joblib.load(MODEL_FILE)
-    meta = json.load(open(META_FILE, "r"))
-    return model, meta
+    """Returns the shared (model, meta) pair; only hits the disk when the artifact changes."""
+    return ivf_registry.get()
+
+def _feature_mapping(pat, wl):
+    """
+    Map PatientData and the latest WellnessLog (may be None) to model features.
+    Fallbacks are used for missing values.
+    """
+    # Note: BMI calculation fallback if not directly stored or if height/weight are missing
+    bmi_val = getattr(pat, "bmi", None)
+    if bmi_val is None and getattr(pat, "height", None) and getattr(pat, "weight", None):
+        height_m = pat.height / 100
+        if height_m > 0:
+            bmi_val = pat.weight / (height_m ** 2)
+
+    return {
+        "age": getattr(pat, "age", None) or 30,
+        "bmi": bmi_val or 22.5, # Default BMI
+        "amh": getattr(pat, "amh_level", None) or 2.5,
+        "fsh": getattr(pat, "fsh_level", None) or 6.0,
+        "previous_ivf": getattr(pat, "previous_ivf_cycles", 0) or 0,
+        "stress": wl.stress_level if wl and wl.stress_level is not None else 3,
+        "sleep_hours": wl.sleep_hours if wl and wl.sleep_hours is not None else 7.0,
+        "exercise_min": wl.exercise_minutes if wl and wl.exercise_minutes is not None else 30
+    }
 
 def build_feature_vector(user_id, meta):
     """
@@ -31,30 +46,40 @@ def build_feature_vector(user_id, meta):
         # latest wellness log
         wl = WellnessLog.query.filter_by(user_id=user_id).order_by(WellnessLog.date.desc()).first()
 
-        # Map model features to DB columns with sensible fallbacks
-        # Note: BMI calculation fallback if not directly stored or if height/weight are missing
-        bmi_val = getattr(pat, "bmi", None)
-        if bmi_val is None and getattr(pat, "height", None) and getattr(pat, "weight", None):
-            height_m = pat.height / 100
-            if height_m > 0:
-                bmi_val = pat.weight / (height_m ** 2)
-        
-        mapping = {
-            "age": getattr(pat, "age", None) or 30,
-            "bmi": bmi_val or 22.5, # Default BMI
-            "amh": getattr(pat, "amh_level", None) or 2.5,
-            "fsh": getattr(pat, "fsh_level", None) or 6.0,
-            "previous_ivf": getattr(pat, "previous_ivf_cycles", 0) or 0,
-            "stress": wl.stress_level if wl and wl.stress_level is not None else 3,
-            "sleep_hours": wl.sleep_hours if wl and wl.sleep_hours is not None else 7.0,
-            "exercise_min": wl.exercise_minutes if wl and wl.exercise_minutes is not None else 30
-        }
+        mapping = _feature_mapping(pat, wl)
 
         feat_order = meta["feature_order"]
         # Ensure all values are float for the model
         fv = np.array([[float(mapping.get(f, 0)) for f in feat_order]]) # Use .get with default 0 for safety
         return fv, mapping
 
+def build_feature_matrix(user_ids, meta):
+    """
+    Set-based version of build_feature_vector for many users.
+    Runs two queries (all PatientData rows, and each user's latest WellnessLog)
+    and returns (matrix, mappings, scored_user_ids, missing_user_ids).
+    """
+    user_ids = list(dict.fromkeys(int(u) for u in user_ids))  # de-dupe, keep order
+    with app.app_context():
+        patients = {p.user_id: p for p in PatientData.query.filter(PatientData.user_id.in_(user_ids)).all()}
+
+        # Latest wellness log per user: join against MAX(date) grouped by user
+        latest = db.session.query(
+            WellnessLog.user_id, db.func.max(WellnessLog.date).label("max_date")
+        ).filter(WellnessLog.user_id.in_(list(patients))).group_by(WellnessLog.user_id).subquery()
+        logs = WellnessLog.query.join(
+            latest, db.and_(WellnessLog.user_id == latest.c.user_id, WellnessLog.date == latest.c.max_date)
+        ).all()
+        wellness = {wl.user_id: wl for wl in logs}
+
+        scored_ids = [u for u in user_ids if u in patients]
+        missing_ids = [u for u in user_ids if u not in patients]
+        mappings = [_feature_mapping(patients[u], wellness.get(u)) for u in scored_ids]
+
+    feat_order = meta["feature_order"]
+    fm = np.array([[float(m.get(f, 0)) for f in feat_order] for m in mappings], dtype=float).reshape(len(mappings), len(feat_order))
+    return fm, mappings, scored_ids, missing_ids
+
 def predict_and_store(user_id):
     model, meta = load_model_and_meta()
     fv, mapping = build_feature_vector(user_id, meta)
@@ -75,6 +100,48 @@ def predict_and_store(user_id):
         db.session.commit()
         return {"prediction": pred, "probability": float(proba[1]) if proba is not None else None, "prediction_id": p.id}
 
+def predict_many(user_ids):
+    """
+    Score many patients with a single predict_proba call and store all
+    Prediction rows in one transaction.
+    Returns {"results": [...], "missing_user_ids": [...]}.
+    """
+    model, meta = load_model_and_meta()
+    fm, mappings, scored_ids, missing_ids = build_feature_matrix(user_ids, meta)
+    if not scored_ids:
+        return {"results": [], "missing_user_ids": missing_ids}
+
+    proba = model.predict_proba(fm)[:, 1] if hasattr(model, "predict_proba") else None
+    preds = model.predict(fm).astype(int)
+
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        meta_json = json.dumps(meta)
+        rows = [
+            Prediction(
+                user_id=uid,
+                prediction_date=now,
+                success_probability=float(proba[i]) if proba is not None else float(preds[i]),
+                protocol_recommendation=None,
+                llm_analysis=json.dumps({"model_features": mappings[i]}),
+                model_metadata=meta_json
+            )
+            for i, uid in enumerate(scored_ids)
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+
+        results = [
+            {
+                "user_id": uid,
+                "prediction": int(preds[i]),
+                "probability": float(proba[i]) if proba is not None else None,
+                "prediction_id": rows[i].id
+            }
+            for i, uid in enumerate(scored_ids)
+        ]
+    return {"results": results, "missing_user_ids": missing_ids}
+
 def predict_from_features(features_dict, meta):
     """
     Predict IVF success from a dictionary of features.
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 def calculate_ivf_success_prediction(patient_data):
     """Calculate IVF success prediction based on multiple factors"""
@@ -297,3 +298,142 @@ def get_success_rate_interpretation(rate):
         return "Moderate prospects - consider optimization strategies"
     else:
         return "Challenging case - discuss alternative approaches with your doctor"
+
+# --- Columnar (cohort) variants ---
+# Same rules as the scalar functions above, applied to whole columns at once.
+# Thresholds are expressed as bucket edges + lookup tables so each rule is a
+# single np.searchsorted instead of an if/elif chain per patient.
+
+COHORT_COLUMNS = ("age", "bmi", "amh_level", "fsh_level", "previous_ivf_cycles",
+                  "partner_age", "diagnosis", "lifestyle_factors")
+
+# side='left' buckets: value <= edge[i] falls in bucket i
+SUCCESS_AGE_EDGES = np.array([30, 35, 37, 40])
+SUCCESS_AGE_ADJ = np.array([15, 5, -5, -15, -25])
+EMBRYO_AGE_EDGES = np.array([30, 35, 38, 42])
+EMBRYO_AGE_ADJ = np.array([20, 10, 0, -15, -30])
+# side='right' buckets: value >= edge[i] falls in bucket i + 1
+AMH_EDGES = np.array([1.0, 2.0])
+SUCCESS_AMH_ADJ = np.array([-12, 2, 8])
+EMBRYO_AMH_ADJ = np.array([-10, 5, 10])
+
+PROTOCOL_NAMES = np.array(["Standard Long Protocol", "High-Dose Short Protocol",
+                           "Antagonist Protocol", "Mini-IVF or Natural Cycle"], dtype=object)
+PROTOCOL_STIMULATION_DAYS = np.array(["10-12 days", "8-10 days", "9-11 days", "5-8 days"], dtype=object)
+PROTOCOL_RESPONSES = np.array(["Good", "Moderate", "Good to Moderate", "Low to Moderate"], dtype=object)
+
+def _numeric_column(frame, name):
+    """Returns a float array for a column; None becomes NaN."""
+    return np.asarray(frame[name], dtype=float)
+
+def _text_column(frame, name):
+    """Returns a lowercased object array for a text column; None/NaN become ''."""
+    return np.array([v.lower() if isinstance(v, str) else "" for v in frame[name]], dtype=str)
+
+def _present(values):
+    """Mirrors the scalar code's truthiness check (`if patient_data.x:`): not None/NaN and not 0."""
+    return ~np.isnan(values) & (values != 0)
+
+def _contains(text, needle):
+    return np.char.find(text, needle) >= 0
+
+def _load_cohort(frame):
+    """Reads the PatientData columns used by the rules from a pandas DataFrame or dict of arrays."""
+    cols = {name: _numeric_column(frame, name) for name in COHORT_COLUMNS[:6]}
+    cols["diagnosis"] = _text_column(frame, "diagnosis")
+    cols["lifestyle_factors"] = _text_column(frame, "lifestyle_factors")
+    return cols
+
+def calculate_ivf_success_predictions(frame):
+    """Columnar calculate_ivf_success_prediction: returns success_rate, confidence and interpretation arrays."""
+    c = _load_cohort(frame)
+    age, bmi, amh = c["age"], c["bmi"], c["amh_level"]
+    prev, partner = c["previous_ivf_cycles"], c["partner_age"]
+    has_age, has_bmi, has_amh = _present(age), _present(bmi), _present(amh)
+    has_prev, has_partner = _present(prev), _present(partner)
+    adjustments = np.zeros(len(age))
+
+    adjustments += np.where(has_age, SUCCESS_AGE_ADJ[np.searchsorted(SUCCESS_AGE_EDGES, np.nan_to_num(age), side="left")], 0)
+
+    bmi_adj = np.select([(bmi >= 18.5) & (bmi <= 24.9), (bmi < 18.5) | (bmi >= 30)], [5, -10], default=-3)
+    adjustments += np.where(has_bmi, bmi_adj, 0)
+
+    adjustments += np.where(has_amh, SUCCESS_AMH_ADJ[np.searchsorted(AMH_EDGES, np.nan_to_num(amh), side="right")], 0)
+
+    cycle_adj = np.select([prev == 1, prev >= 2], [-5, -10], default=0)
+    adjustments += np.where(has_prev, cycle_adj, 3)  # No previous cycles: first attempt bonus
+
+    partner_adj = np.select([partner <= 35, partner >= 45], [3, -5], default=0)
+    adjustments += np.where(has_partner, partner_adj, 0)
+
+    final_rate = np.clip(35.0 + adjustments, 5, 85)
+
+    data_points = (has_age.astype(int) + has_bmi + has_amh + _present(c["fsh_level"]) + has_partner)
+    confidence = np.minimum(95, 60 + data_points * 7)
+
+    interpretation = np.select(
+        [final_rate >= 60, final_rate >= 45, final_rate >= 30],
+        ["Excellent prospects - above average success rate",
+         "Good prospects - average to above-average success rate",
+         "Moderate prospects - consider optimization strategies"],
+        default="Challenging case - discuss alternative approaches with your doctor")
+
+    return {
+        "success_rate": np.round(final_rate, 1),
+        "confidence": confidence,
+        "interpretation": interpretation
+    }
+
+def calculate_embryo_quality_scores(frame):
+    """Columnar calculate_embryo_quality_score: returns quality_score, grade and probability arrays."""
+    c = _load_cohort(frame)
+    age, amh, lifestyle = c["age"], c["amh_level"], c["lifestyle_factors"]
+    adjustments = np.zeros(len(age))
+
+    adjustments += np.where(_present(age), EMBRYO_AGE_ADJ[np.searchsorted(EMBRYO_AGE_EDGES, np.nan_to_num(age), side="left")], 0)
+    adjustments += np.where(_present(amh), EMBRYO_AMH_ADJ[np.searchsorted(AMH_EDGES, np.nan_to_num(amh), side="right")], 0)
+
+    # Empty strings never contain the keywords, so no separate presence check is needed
+    adjustments += np.where(_contains(lifestyle, "non-smoker") | _contains(lifestyle, "no smoking"), 5, 0)
+    adjustments += np.where(_contains(lifestyle, "exercise") | _contains(lifestyle, "active"), 3, 0)
+    adjustments += np.where(_contains(lifestyle, "smoking"), -15, 0)
+
+    final_score = np.clip(65.0 + adjustments, 10, 95)
+    grade = np.select([final_score >= 80, final_score >= 65, final_score >= 45],
+                      ["A (Excellent)", "B (Good)", "C (Fair)"], default="D (Poor)")
+
+    return {
+        "quality_score": np.round(final_score, 1),
+        "grade": grade,
+        "development_probability": np.round(np.minimum(90, final_score * 0.9), 1),
+        "implantation_potential": np.round(np.minimum(85, final_score * 0.8), 1)
+    }
+
+def generate_personalized_protocols(frame):
+    """Columnar generate_personalized_protocol: returns protocol_name, expected_response, stimulation days and personalization_score arrays."""
+    c = _load_cohort(frame)
+    # Same `x or default` fallbacks as the scalar version
+    age = np.where(_present(c["age"]), c["age"], 35)
+    amh = np.where(_present(c["amh_level"]), c["amh_level"], 1.5)
+
+    choice = np.select([(age <= 35) & (amh >= 2.0), (age <= 35) & (amh < 1.0), (age > 35) & (amh >= 1.5)],
+                       [0, 1, 2], default=3)
+
+    data_points = (_present(c["age"]).astype(int) + _present(c["amh_level"]) + _present(c["bmi"])
+                   + _present(c["fsh_level"]) + ~np.isnan(c["previous_ivf_cycles"])
+                   + (c["diagnosis"] != "") + (c["lifestyle_factors"] != ""))
+
+    return {
+        "protocol_name": PROTOCOL_NAMES[choice],
+        "expected_response": PROTOCOL_RESPONSES[choice],
+        "stimulation_duration": PROTOCOL_STIMULATION_DAYS[choice],
+        "personalization_score": np.minimum(100, (data_points / 7) * 100)
+    }
+
+def score_cohort(frame):
+    """Runs all three columnar rule sets and merges their outputs into one dict of arrays."""
+    return {
+        **calculate_ivf_success_predictions(frame),
+        **calculate_embryo_quality_scores(frame),
+        **generate_personalized_protocols(frame)
+    }
@@ -0,0 +1,142 @@
+# read_replicas.py
+# Routes read-only work to read replicas.
+#
+# Set DATABASE_REPLICA_URLS to a comma-separated list of replica URLs. Routes marked
+# with @replica_reads then send their SELECTs to a replica; each request picks one
+# (round-robin over the healthy ones) and reads everything from it, so its queries see
+# one consistent state and it holds a connection on one replica only;
+# everything else, every write, and every read after a write stays on the primary:
+# - a session that has flushed a change reads from the primary for the rest of the request;
+# - a browser session that wrote something reads from the primary for the next
+#   READ_AFTER_WRITE_SECONDS, so a redirect after a POST sees its own change.
+# A replica that is unreachable or lags more than MAX_REPLICA_LAG_SECONDS behind is
+# skipped (and re-checked after REPLICA_CHECK_SECONDS); with none usable, reads go to
+# the primary.
+import os
+import time
+import logging
+import threading
+from functools import wraps
+
+from flask import g, session as flask_session, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import Select
+
+MAX_REPLICA_LAG_SECONDS = float(os.environ.get("MAX_REPLICA_LAG_SECONDS", 5))
+REPLICA_CHECK_SECONDS = float(os.environ.get("REPLICA_CHECK_SECONDS", 10))
+READ_AFTER_WRITE_SECONDS = float(os.environ.get("READ_AFTER_WRITE_SECONDS", 5))
+PRIMARY_UNTIL_KEY = "db_primary_until"  # Flask session key for read-after-write stickiness
+
+POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END"
+)
+
+
+def replica_urls():
+    return [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+
+def replica_binds(urls, options_for):
+    """SQLALCHEMY_BINDS entries ("replica_0", ...) for the replica URLs, with options_for(url) engine options."""
+    return {f"replica_{i}": {"url": url, **options_for(url)} for i, url in enumerate(urls)}
+
+
+class ReplicaRouter:
+    """Round-robin choice among the healthy replicas, with cached health/lag checks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0
+        self._health = {}  # bind key -> (checked_at, usable)
+        self.reads = {}  # bind key (None = primary) -> routed statements
+
+    def _measure_lag(self, engine):
+        with engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                return float(connection.execute(POSTGRES_LAG_SQL).scalar() or 0)
+            connection.execute(text("SELECT 1"))  # Other databases: reachable means usable
+            return 0.0
+
+    def _usable(self, key, engine):
+        checked_at, usable = self._health.get(key, (None, False))
+        now = time.monotonic()
+        if checked_at is not None and now - checked_at < REPLICA_CHECK_SECONDS:
+            return usable
+        try:
+            lag = self._measure_lag(engine)
+            usable = lag <= MAX_REPLICA_LAG_SECONDS
+            if not usable:
+                logging.warning(f"Read replica {key} is {lag:.1f}s behind; reading from the primary")
+        except DBAPIError as e:
+            usable = False
+            logging.warning(f"Read replica {key} is unavailable: {e}")
+        self._health[key] = (now, usable)
+        return usable
+
+    def choose(self, engines):
+        """Bind key of the next usable replica in `engines`, or None to use the primary."""
+        # Rotating over the usable keys only, so a skipped replica's turns are spread evenly
+        keys = sorted(k for k in engines if k and k.startswith("replica_"))
+        usable = [k for k in keys if self._usable(k, engines[k])]
+        if not usable:
+            return None
+        with self._lock:
+            turn = self._next
+            self._next += 1
+        return usable[turn % len(usable)]
+
+    def count(self, key):
+        with self._lock:
+            self.reads[key] = self.reads.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "reads": {key or "primary": n for key, n in self.reads.items()},
+                "replicas": {key: usable for key, (_, usable) in self._health.items()},
+            }
+
+
+replica_router = ReplicaRouter()
+
+
+def replica_reads(f):
+    """Route decorator: the view's reads may be served by a read replica."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.replica_reads = True
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def _primary_required(db_session, clause):
+    if not has_request_context() or not g.get("replica_reads"):
+        return True
+    if db_session._flushing or db_session.info.get("wrote") or not isinstance(clause, Select):
+        return True
+    return flask_session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    """db.session class that sends replica-eligible SELECTs to a read replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not _primary_required(self, clause):
+            if "replica_key" not in g:
+                # Chosen once per request (None: the primary), for every replica-eligible read
+                g.replica_key = replica_router.choose(self._db.engines)
+            key = g.replica_key
+            replica_router.count(key)
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _note_write(db_session, flush_context):
+    db_session.info["wrote"] = True
+    if has_request_context() and any(key and key.startswith("replica_") for key in db_session._db.engines):
+        flask_session[PRIMARY_UNTIL_KEY] = time.time() + READ_AFTER_WRITE_SECONDS
@@ -181,6 +181,73 @@ document.getElementById('patientSearch')?.addEventListener('input', function() {
     });
 });
 
+// Further pages of the patient table
+function renderPatientRow(p) {
+    const esc = IVFTracker.escapeHtml;
+    const cycle = p.cycle_id
+        ? `<span class="badge bg-info">Cycle ${p.cycle_id}</span>
+           <br><small class="text-muted">${esc(p.cycle_protocol || 'Standard')}</small>`
+        : '<span class="badge bg-secondary">No Active Cycle</span>';
+    const success = p.success_probability !== null
+        ? `<div class="progress" style="height: 8px;">
+               <div class="progress-bar" style="inline-size: ${p.success_probability * 100}%"></div>
+           </div>
+           <small>${(p.success_probability * 100).toFixed(1)}%</small>`
+        : '<span class="text-muted">Pending</span>';
+    let status = '<span class="badge bg-secondary">Not Started</span>';
+    if (p.cycle_id) {
+        const cycleStatus = (p.cycle_status || '').replace(/\b\w/g, c => c.toUpperCase());
+        status = p.cycle_outcome === 'BFP' ? '<span class="badge bg-success">Successful</span>'
+            : p.cycle_outcome === 'BFN' ? '<span class="badge bg-danger">Unsuccessful</span>'
+            : `<span class="badge bg-primary">${esc(cycleStatus)}</span>`;
+    }
+    let lastLog = 'No logs';
+    if (p.last_log_date) {
+        const [year, month, day] = p.last_log_date.split('-');
+        lastLog = `${month}/${day}/${year}`;
+    }
+    const analysis = p.cycle_id
+        ? `<div class="mb-1"><span class="badge bg-info">AI Risk: Low</span></div>
+           <div class="small text-muted"><i class="fas fa-brain"></i> Protocol optimized</div>`
+        : '<span class="text-muted small">No active analysis</span>';
+    return `
+        <tr>
+            <td>
+                <div class="d-flex align-items-center">
+                    <div class="patient-avatar bg-primary text-white rounded-circle me-2">
+                        ${esc(p.first_name.charAt(0))}${esc(p.last_name.charAt(0))}
+                    </div>
+                    <div>
+                        <strong>${esc(p.first_name)} ${esc(p.last_name)}</strong>
+                        <br><small class="text-muted">${esc(p.email)}</small>
+                    </div>
+                </div>
+            </td>
+            <td>${p.age || 'N/A'}</td>
+            <td>${cycle}</td>
+            <td>${success}</td>
+            <td>${status}</td>
+            <td>${lastLog}</td>
+            <td><div class="ai-analysis-summary">${analysis}</div></td>
+            <td>
+                <div class="btn-group btn-group-sm">
+                    <button class="btn btn-outline-primary" onclick="viewPatientDetails(${p.id})">
+                        <i class="fas fa-eye"></i> View
+                    </button>
+                    <button class="btn btn-outline-success" onclick="openNotesModal(${p.cycle_id || 'null'})">
+                        <i class="fas fa-notes-medical"></i> Note
+                    </button>
+                    <input type="hidden" id="cycleId_${p.id}" value="${p.cycle_id || ''}">
+                    <button class="btn btn-outline-warning" onclick="generateAIRecommendations(${p.id})">
+                        <i class="fas fa-robot"></i>
+                    </button>
+                </div>
+            </td>
+        </tr>`;
+}
+
+IVFTracker.initializeLoadMore('load-more-patients', 'patient-rows', 'patients', renderPatientRow);
+
 // Quick Actions
 function createNewCycle() {
     const modal = new bootstrap.Modal(document.getElementById('newCycleModal'));
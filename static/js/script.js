@@ -696,6 +696,52 @@ function createWellnessChart(canvasId, data) {
     });
 }
 
+/**
+ * Escape text for insertion into HTML built in JavaScript
+ */
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
+}
+
+/**
+ * Keyset pagination: each click on the "Load more" link fetches the next page from
+ * its data-url endpoint (starting at data-cursor) and appends the rendered items.
+ * Without JavaScript the link simply opens the next page.
+ */
+function initializeLoadMore(linkId, containerId, itemsKey, renderItem) {
+    const link = document.getElementById(linkId);
+    const container = document.getElementById(containerId);
+    if (!link || !container) {
+        return;
+    }
+
+    link.addEventListener('click', async function(e) {
+        e.preventDefault();
+        link.classList.add('disabled');
+        try {
+            const url = new URL(link.dataset.url, window.location.origin);
+            url.searchParams.set('cursor', link.dataset.cursor);
+            const response = await fetch(url);
+            const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || 'Request failed');
+            }
+            container.insertAdjacentHTML('beforeend', data[itemsKey].map(renderItem).join(''));
+            if (data.next_cursor) {
+                link.dataset.cursor = data.next_cursor;
+                link.classList.remove('disabled');
+            } else {
+                link.remove();
+            }
+        } catch (err) {
+            link.classList.remove('disabled');
+            showToast('Could not load more rows.', 'error');
+        }
+    });
+}
+
 /**
  * Error handling
  */
@@ -727,5 +773,7 @@ window.IVFTracker = {
     apiRequest,
     initializeChart,
     createWellnessChart,
-    submitFormWithLoading
+    submitFormWithLoading,
+    escapeHtml,
+    initializeLoadMore
 };
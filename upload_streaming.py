@@ -0,0 +1,132 @@
+# upload_streaming.py
+# Streams uploads to disk in fixed-size chunks, computing size and SHA-256 in the same pass.
+# Also backs resumable chunked uploads: the client PUTs consecutive byte ranges to
+# /api/uploads/<upload_id> and can ask for the current offset to resume after a failure.
+import os
+import time
+import hashlib
+import threading
+
+from document_extraction import file_sha256
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # bytes read from the request per iteration
+CLIENT_CHUNK_SIZE = 8 * 1024 * 1024  # suggested size of each PUT in a resumable upload
+PARTIAL_DIR = ".partial"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def stream_to_file(stream, file_path, max_bytes=None, hasher=None, offset=None):
+    """
+    Copies a readable stream to file_path chunk by chunk, or, with an offset, into the
+    existing file_path starting at that byte.
+    Returns (bytes_written, hasher); the hasher (SHA-256 by default) is updated as data is written.
+    Raises UploadTooLarge if more than max_bytes arrive. A new file is removed if the copy
+    fails for any reason.
+    """
+    hasher = hasher or hashlib.sha256()
+    written = 0
+    try:
+        with open(file_path, "wb" if offset is None else "r+b") as out:
+            if offset is not None:
+                out.seek(offset)
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        if offset is None and os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return written, hasher
+
+
+def partial_path(upload_dir, upload_id):
+    """Where the bytes of an in-progress resumable upload are kept."""
+    part_dir = os.path.join(upload_dir, PARTIAL_DIR)
+    os.makedirs(part_dir, exist_ok=True)
+    return os.path.join(part_dir, f"{upload_id}.part")
+
+
+# In-process running hashes for resumable uploads, so finishing one doesn't need
+# another pass over the file. Keyed by partial file path -> (offset, hasher). If a chunk lands
+# on another worker process the entry goes stale and the hash is recomputed at the end.
+_running_hashes = {}
+_upload_locks = {}
+_registry_lock = threading.Lock()
+
+
+def upload_lock(upload_id):
+    """Serializes chunk writes for one upload within this process."""
+    with _registry_lock:
+        return _upload_locks.setdefault(upload_id, threading.Lock())
+
+
+def append_chunk(stream, path, offset, max_bytes):
+    """
+    Writes one chunk at `offset` (which must equal the bytes already stored)
+    and returns the number of bytes written. Bytes past the stored ones belong to
+    no chunk yet, so a chunk that failed or lost a race is simply overwritten by the next.
+    """
+    entry = _running_hashes.pop(path, None)
+    if offset == 0:
+        hasher = hashlib.sha256()
+    elif entry and entry[0] == offset:
+        hasher = entry[1]
+    else:
+        hasher = None  # Earlier chunks went to another process; hash at the end instead
+
+    written, _ = stream_to_file(stream, path, max_bytes=max_bytes, hasher=hasher, offset=offset)
+    if hasher is not None:
+        _running_hashes[path] = (offset + written, hasher)
+    return written
+
+
+def finish_hash(path, size):
+    """SHA-256 of a completed resumable upload, from the running hash when possible."""
+    entry = _running_hashes.pop(path, None)
+    if entry and entry[0] == size:
+        return entry[1].hexdigest()
+    return file_sha256(path)
+
+
+def drop_running_hash(path):
+    """Forgets the running hash of a partial file whose stored bytes it may no longer match."""
+    _running_hashes.pop(path, None)
+
+
+def forget_upload(upload_id, path):
+    drop_running_hash(path)
+    with _registry_lock:
+        _upload_locks.pop(upload_id, None)
+
+
+def discard_partial(upload_dir, upload_id):
+    """Removes an abandoned upload's partial file and in-process state."""
+    path = partial_path(upload_dir, upload_id)
+    if os.path.exists(path):
+        os.remove(path)
+    forget_upload(upload_id, path)
+
+
+def stale_partials(upload_dir, max_age_seconds):
+    """Upload ids of partial files that haven't been written to for max_age_seconds."""
+    part_dir = os.path.join(upload_dir, PARTIAL_DIR)
+    if not os.path.isdir(part_dir):
+        return []
+    cutoff = time.time() - max_age_seconds
+    stale = []
+    for entry in os.scandir(part_dir):
+        try:
+            if entry.name.endswith(".part") and entry.stat().st_mtime < cutoff:
+                stale.append(entry.name[:-len(".part")])
+        except FileNotFoundError:
+            pass  # Finished or discarded meanwhile
+    return stale
@@ -0,0 +1,221 @@
+# wellness_analytics.py
+# Trends over a patient's wellness logs for /api/wellness/analytics.
+#
+# One columnar query fetches (date, metric...) for the range, padded with window - 1
+# earlier days so the first rolling value covers a full window. The rows are laid
+# out on a day-by-day NumPy grid (NaN for days without a log), and every statistic is
+# vectorized from there: rolling means and variances over calendar-day windows from
+# cumulative sums, per-metric summaries, pairwise Pearson correlations over the days
+# both metrics were logged, and logging streaks.
+#
+# Results are cached in-process per (user, range, window, metrics) for
+# ANALYTICS_CACHE_TTL_SECONDS, together with a stamp of the user's logs (their count
+# and latest updated_at). A cached result is only served while the stamp in the
+# database still matches, so logs saved, edited or deleted through any worker process
+# are seen at once; saving a wellness log here also drops the user's entries.
+import os
+import time
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import numpy as np
+
+from sqlalchemy import func
+
+from database import db
+from models import WellnessLog
+
+DEFAULT_RANGE_DAYS = 90
+MAX_RANGE_DAYS = 730
+DEFAULT_WINDOW_DAYS = 7
+MAX_WINDOW_DAYS = 90
+ANALYTICS_CACHE_TTL_SECONDS = float(os.environ.get("ANALYTICS_CACHE_TTL_SECONDS", 300))
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYTICS_CACHE_MAX_ENTRIES", 2000))
+
+# Metric name -> column. The 1-5 ratings are saved as 0 when left blank, so 0 means "not logged"
+METRICS = {
+    'mood': WellnessLog.mood_rating,
+    'stress': WellnessLog.stress_level,
+    'sleep_hours': WellnessLog.sleep_hours,
+    'sleep_quality': WellnessLog.sleep_quality,
+    'energy': WellnessLog.energy_level,
+    'nutrition': WellnessLog.nutrition_score,
+    'exercise_minutes': WellnessLog.exercise_minutes,
+    'meditation_minutes': WellnessLog.meditation_minutes,
+    'water_intake': WellnessLog.water_intake,
+}
+RATING_METRICS = {'mood', 'stress', 'sleep_quality', 'energy', 'nutrition'}
+DEFAULT_METRICS = ('mood', 'stress', 'sleep_hours', 'sleep_quality', 'energy')
+
+
+class InvalidAnalyticsRequest(ValueError):
+    pass
+
+
+def parse_request(args, today=None):
+    """(start, end, window, metrics) from ?start=&end=&window=&metrics= query arguments."""
+    today = today or date.today()
+    try:
+        end = date.fromisoformat(args.get('end')) if args.get('end') else today
+        start = date.fromisoformat(args.get('start')) if args.get('start') else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+        window = int(args.get('window') or DEFAULT_WINDOW_DAYS)
+    except ValueError:
+        raise InvalidAnalyticsRequest("start/end must be YYYY-MM-DD dates and window a number of days")
+    except OverflowError:
+        raise InvalidAnalyticsRequest("The range starts before the earliest supported date")
+    if start > end:
+        raise InvalidAnalyticsRequest("start must not be after end")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise InvalidAnalyticsRequest(f"The range can span at most {MAX_RANGE_DAYS} days")
+    if not 1 <= window <= MAX_WINDOW_DAYS:
+        raise InvalidAnalyticsRequest(f"window must be between 1 and {MAX_WINDOW_DAYS} days")
+    try:
+        start - timedelta(days=window - 1)  # The first rolling window reaches back this far
+    except OverflowError:
+        raise InvalidAnalyticsRequest("The range starts before the earliest supported date")
+
+    metrics = [m.strip() for m in (args.get('metrics') or '').split(',') if m.strip()] or list(DEFAULT_METRICS)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise InvalidAnalyticsRequest(f"Unknown metrics: {', '.join(unknown)} (choose from {', '.join(METRICS)})")
+    return start, end, window, list(dict.fromkeys(metrics))
+
+
+def _daily_grid(user_id, first_day, end, metrics):
+    """(logged, values): a bool per day and a days x metrics float array (NaN = not logged)."""
+    days = (end - first_day).days + 1
+    rows = db.session.query(WellnessLog.date, *(METRICS[m] for m in metrics)).filter(
+        WellnessLog.user_id == user_id, WellnessLog.date.between(first_day, end)).all()
+    values = np.full((days, len(metrics)), np.nan)
+    logged = np.zeros(days, dtype=bool)
+    if rows:
+        offsets = np.fromiter(((row[0] - first_day).days for row in rows), dtype=np.int64, count=len(rows))
+        fetched = np.array([row[1:] for row in rows], dtype=float)  # None becomes NaN
+        values[offsets] = fetched
+        logged[offsets] = True
+    ratings = [i for i, m in enumerate(metrics) if m in RATING_METRICS]
+    rating_values = values[:, ratings]
+    rating_values[rating_values < 1] = np.nan
+    values[:, ratings] = rating_values
+    return logged, values
+
+
+def _rolling(values, window):
+    """Rolling mean and (population) variance over the trailing `window` days, ignoring NaNs."""
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+
+    def window_sums(a):
+        cumulative = np.vstack([np.zeros((1, a.shape[1])), np.cumsum(a, axis=0)])
+        return cumulative[window:] - cumulative[:-window]
+
+    counts = window_sums(present.astype(float))
+    sums, squares = window_sums(filled), window_sums(filled ** 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+        variances = np.where(counts > 1, np.maximum(squares / counts - means ** 2, 0.0), np.nan)
+    return means, variances
+
+
+def _correlations(values, metrics):
+    """{metric: {other: Pearson r}} over the days both were logged (None with fewer than 3 such days)."""
+    result = {m: {} for m in metrics}
+    for i, a in enumerate(metrics):
+        result[a][a] = 1.0 if np.count_nonzero(~np.isnan(values[:, i])) >= 3 else None
+        for j in range(i + 1, len(metrics)):
+            both = ~np.isnan(values[:, i]) & ~np.isnan(values[:, j])
+            r = None
+            if both.sum() >= 3:
+                x, y = values[both, i], values[both, j]
+                if x.std() > 0 and y.std() > 0:
+                    r = float(np.corrcoef(x, y)[0, 1])
+            result[a][metrics[j]] = result[metrics[j]][a] = r
+    return result
+
+
+def _streaks(logged):
+    """Longest run of consecutive logged days, and the run ending on the last day of the range."""
+    padded = np.concatenate([[0], logged.astype(np.int8), [0]])
+    edges = np.diff(padded)
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    runs = ends - starts
+    longest = int(runs.max()) if runs.size else 0
+    current = int(runs[-1]) if runs.size and ends[-1] == len(logged) else 0
+    return {'current': current, 'longest': longest}
+
+
+def _rounded(array):
+    return [None if np.isnan(v) else round(float(v), 3) for v in array]
+
+
+def compute_wellness_analytics(user_id, start, end, window, metrics):
+    first_day = start - timedelta(days=window - 1)
+    logged, values = _daily_grid(user_id, first_day, end, metrics)
+    means, variances = _rolling(values, window)  # One row per day from start to end
+    in_range = values[window - 1:]
+
+    summary = {}
+    for i, metric in enumerate(metrics):
+        column = in_range[:, i]
+        present = column[~np.isnan(column)]
+        summary[metric] = {
+            'count': int(present.size),
+            'mean': round(float(present.mean()), 3) if present.size else None,
+            'variance': round(float(present.var()), 3) if present.size > 1 else None,
+            'min': float(present.min()) if present.size else None,
+            'max': float(present.max()) if present.size else None,
+        }
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'window': window,
+        'metrics': metrics,
+        'dates': [(start + timedelta(days=d)).isoformat() for d in range(len(in_range))],
+        'days_logged': int(logged[window - 1:].sum()),
+        'rolling_mean': {m: _rounded(means[:, i]) for i, m in enumerate(metrics)},
+        'rolling_variance': {m: _rounded(variances[:, i]) for i, m in enumerate(metrics)},
+        'summary': summary,
+        'correlations': _correlations(in_range, metrics),
+        'streaks': _streaks(logged[window - 1:]),
+    }
+
+
+# --- Cache ---
+
+_cache = OrderedDict()  # (user_id, start, end, window, metrics) -> (expires_at, stamp, result)
+_cache_lock = threading.Lock()
+
+
+def logs_stamp(user_id):
+    """(count, latest updated_at) of a user's wellness logs: changes whenever one is added, edited or deleted."""
+    return tuple(db.session.query(func.count(WellnessLog.id), func.max(WellnessLog.updated_at)).filter(
+        WellnessLog.user_id == user_id).one())
+
+
+def wellness_analytics(user_id, start, end, window, metrics):
+    """compute_wellness_analytics, cached per user and range while the user's logs are unchanged."""
+    key = (user_id, start, end, window, tuple(metrics))
+    now = time.monotonic()
+    # Read before computing: a log saved meanwhile makes the stored stamp outdated, not the result
+    stamp = logs_stamp(user_id)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now and entry[1] == stamp:
+            _cache.move_to_end(key)
+            return entry[2]
+    result = compute_wellness_analytics(user_id, start, end, window, metrics)
+    with _cache_lock:
+        _cache[key] = (now + ANALYTICS_CACHE_TTL_SECONDS, stamp, result)
+        _cache.move_to_end(key)
+        while len(_cache) > ANALYTICS_CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return result
+
+
+def invalidate_wellness_analytics(user_id):
+    """Drops a user's cached analytics; call after saving one of their wellness logs."""
+    with _cache_lock:
+        for key in [k for k in _cache if k[0] == user_id]:
+            del _cache[key]